@@ -0,0 +1,92 @@
+"""
+Benchmark the direct CDP connection (cdp_client) against the chromedriver path.
+One headless Chrome is started as for the cdp engine, so both paths drive the same browser: the
+chromedriver tab through Selenium, the CDP tab over its DevTools websocket. The script reports the
+round trip of a trivial script call, a DOM query like the extraction fallbacks make, and page load
+plus HTML of real pages (without the ToS settle wait).
+
+Usage:
+    python benchmark_cdp.py                                   # round trips + the Haraj home page
+    python benchmark_cdp.py https://haraj.com.sa/11173528712/x/ --calls 500 --delay 3
+"""
+
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from haraj_scraper_selenium import HarajScraperSelenium
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+DEFAULT_URLS = ['https://haraj.com.sa/']
+LINKS_XPATH = "//a[contains(@href, '/users/')]"
+
+
+def _timed(fn, runs: int):
+    """Per-call times in ms of fn over runs calls."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def _report(name: str, driver_ms, cdp_ms):
+    d, c = statistics.median(driver_ms), statistics.median(cdp_ms)
+    print(f"{name:22s} chromedriver {d:8.2f} ms   cdp {c:8.2f} ms   x{d / c if c else float('inf'):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare chromedriver and direct CDP call overhead')
+    parser.add_argument('urls', nargs='*', help=f'Pages to load both ways (default: {DEFAULT_URLS[0]})')
+    parser.add_argument('--calls', type=int, default=200, help='Calls per round-trip measurement')
+    parser.add_argument('--delay', type=float, default=2.0, help='Seconds between page loads (site pacing)')
+    parser.add_argument('--no-headless', action='store_true', help='Show the browser')
+    args = parser.parse_args()
+
+    scraper = HarajScraperSelenium(download_images=False, headless=not args.no_headless, engine='cdp',
+                                   contacts='off', persist_session=False)
+    driver, cdp = scraper.driver, scraper.cdp
+    try:
+        urls = args.urls or DEFAULT_URLS
+        driver.get('about:blank')
+        cdp.navigate('about:blank', timeout=10)
+        print(f"{args.calls} calls per round-trip measurement, {len(urls)} page(s)\n")
+        _report('script round trip', _timed(lambda: driver.execute_script("return 1;"), args.calls),
+                _timed(lambda: cdp.evaluate("1"), args.calls))
+
+        loads_driver, loads_cdp, queries_driver, queries_cdp = [], [], [], []
+        for url in urls:
+            start = time.perf_counter()
+            scraper._load(url)
+            html = driver.page_source
+            loads_driver.append((time.perf_counter() - start) * 1000)
+            queries_driver += _timed(lambda: driver.find_elements(By.XPATH, LINKS_XPATH), 20)
+            time.sleep(args.delay)
+
+            start = time.perf_counter()
+            cdp.navigate(url, timeout=scraper.page_load_timeout)
+            cdp_html = cdp.html()
+            loads_cdp.append((time.perf_counter() - start) * 1000)
+            queries_cdp += _timed(lambda: cdp.evaluate(
+                f"document.evaluate({json.dumps(LINKS_XPATH)}, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, "
+                f"null).snapshotLength"), 20)
+            print(f"  {url}: {len(html) / 1024:.0f} KiB via chromedriver, {len(cdp_html) / 1024:.0f} KiB via CDP")
+            time.sleep(args.delay)
+
+        _report('XPath query', queries_driver, queries_cdp)
+        _report('page load + HTML', loads_driver, loads_cdp)
+        print("\nPage loads depend on the network; run several URLs and compare medians.")
+    finally:
+        scraper.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark the HTML parser backends on saved Haraj listing pages.
+Each page is parsed and extracted with every backend (see html_parsing.PARSER_BACKENDS); the script
+reports time per page and whether the extracted fields agree with the html.parser baseline.
+
+Usage:
+    python benchmark_parsers.py                       # fixture pages in test_pages/
+    python benchmark_parsers.py saved_pages/*.html --repeat 20
+"""
+
+import argparse
+import glob
+import io
+import sys
+import time
+from pathlib import Path
+
+from haraj_scraper import parse_listing_html
+from html_parsing import PARSER_BACKENDS
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+FIXTURE_DIR = Path(__file__).parent / 'test_pages'
+PAGE_URL = 'https://haraj.com.sa/11173528712/saved_page/'
+
+
+def _fields(listing):
+    return {k: v for k, v in listing.items() if k != 'raw_html'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare HTML parser backends on saved pages')
+    parser.add_argument('pages', nargs='*', help='Saved listing pages (.html); default: test_pages/*.html')
+    parser.add_argument('--repeat', type=int, default=10, help='Parses per page and backend')
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob(str(FIXTURE_DIR / '*.html')))
+    if not paths:
+        print("No pages to benchmark")
+        return
+    pages = [Path(p).read_bytes() for p in paths]
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / 1024:.0f} KiB, {args.repeat} runs each\n")
+
+    baseline = [_fields(parse_listing_html(html, PAGE_URL, 'html.parser')) for html in pages]
+    timings = {}
+    for backend in PARSER_BACKENDS:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = [parse_listing_html(html, PAGE_URL, backend) for html in pages]
+        timings[backend] = (time.perf_counter() - start) / (args.repeat * len(pages))
+        mismatches = sum(_fields(r) != b for r, b in zip(results, baseline))
+        print(f"{backend:12s} {timings[backend] * 1000:8.2f} ms/page   "
+              f"{'same fields as html.parser' if not mismatches else f'{mismatches} page(s) differ'}")
+
+    slowest = max(timings.values())
+    print("\nSpeed-up vs slowest: " + ", ".join(f"{b} x{slowest / t:.1f}" for b, t in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Warm Selenium browsers shared by the scrape jobs of one process.
+Starting HarajScraperSelenium (chromedriver lookup, Chrome launch, login) takes seconds before the
+first request. The pool keeps up to HARAJ_WARM_BROWSERS idle browsers: a finished job hands its
+browser back, the next job with the same launch options gets it after a reset (tabs, cookies and
+per-job settings) instead of a relaunch, and warm() starts them ahead of the first job.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+WARM_BROWSERS = int(os.environ.get('HARAJ_WARM_BROWSERS', '0') or 0)
+
+# Options fixed when Chrome starts; jobs with other values cannot share the browser
+LAUNCH_OPTIONS = ('output_dir', 'download_images', 'headless', 'username', 'password', 'parser', 'engine',
+                  'session_dir', 'persist_session', 'prefetch_tabs')
+
+
+def _new_scraper(**options):
+    from haraj_scraper_selenium import HarajScraperSelenium
+    return HarajScraperSelenium(**options)
+
+
+def _launch_key(options: Dict) -> Tuple:
+    return tuple((name, str(options[name])) for name in LAUNCH_OPTIONS if name in options)
+
+
+class BrowserPool:
+    """Idle warm browsers by launch options; acquire() resets one for the job or starts a new one."""
+
+    def __init__(self, max_idle: int = WARM_BROWSERS, factory: Callable = _new_scraper):
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle: List[Tuple[Tuple, object]] = []
+        self._keys: Dict[int, Tuple] = {}
+        self._lock = threading.Lock()
+
+    def _take_idle(self, key: Tuple):
+        with self._lock:
+            for i, (idle_key, scraper) in enumerate(self._idle):
+                if idle_key == key:
+                    del self._idle[i]
+                    return scraper
+        return None
+
+    def acquire(self, cancel_token=None, rate_budget=None, profile=None, contacts=None, contact_db=None,
+                **launch):
+        """A browser for one job: a warm one reset for it if available, otherwise a newly started one."""
+        key = _launch_key(launch)
+        scraper = self._take_idle(key)
+        while scraper is not None:
+            try:
+                scraper.reset(cancel_token=cancel_token, rate_budget=rate_budget, profile=profile,
+                              contacts=contacts, contact_db=contact_db)
+                print("Browser pool: reusing a warm browser")
+                break
+            except Exception as e:
+                print(f"Browser pool: warm browser unusable ({e}), discarding it")
+                self._close(scraper)
+                scraper = self._take_idle(key)
+        if scraper is None:
+            job_options = {'cancel_token': cancel_token, 'rate_budget': rate_budget, 'profile': profile,
+                           'contacts': contacts, 'contact_db': contact_db}
+            scraper = self.factory(**launch, **{k: v for k, v in job_options.items() if v is not None})
+        with self._lock:
+            self._keys[id(scraper)] = key
+        return scraper
+
+    def release(self, scraper):
+        """Hand a browser back after its job: kept warm while there is room, closed otherwise."""
+        with self._lock:
+            key = self._keys.pop(id(scraper), None)
+            keep = key is not None and len(self._idle) < self.max_idle
+            if keep:
+                self._idle.append((key, scraper))
+        if not keep:
+            self._close(scraper)
+
+    def warm(self, **launch) -> threading.Thread:
+        """Start browsers in the background until max_idle are waiting with these launch options."""
+        def _fill():
+            key = _launch_key(launch)
+            while True:
+                with self._lock:
+                    if sum(1 for k, _ in self._idle if k == key) >= self.max_idle:
+                        return
+                try:
+                    scraper = self.factory(**launch)
+                except Exception as e:
+                    print(f"Browser pool: could not start a warm browser: {e}")
+                    return
+                with self._lock:
+                    self._idle.append((key, scraper))
+                print("Browser pool: warm browser ready")
+
+        thread = threading.Thread(target=_fill, name='browser-pool-warm', daemon=True)
+        thread.start()
+        return thread
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, scraper in idle:
+            self._close(scraper)
+
+    @staticmethod
+    def _close(scraper):
+        try:
+            scraper.close()
+        except Exception:
+            pass
@@ -0,0 +1,172 @@
+"""
+Browser state kept across runs: the login session, the Chrome profile and the chromedriver path.
+The login cookies are saved to a per-account cookie jar after a successful login and restored on
+the next start, so the UI login flow (about 10s of clicks and waits) only runs when the saved session
+has expired. Each Chrome instance also gets a reusable --user-data-dir (with its HTTP disk cache)
+under the session dir; profile slots are locked per process because Chrome cannot share one
+profile between running instances. The chromedriver path found by the (slow) probing of install
+locations is remembered in the session dir too (owner-only, like the cookies), so later browsers
+start without probing or a test launch.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SESSION_DIR = os.environ.get('HARAJ_SESSION_DIR', '')
+# Chrome profiles kept per session dir (one per concurrently running browser)
+MAX_PROFILE_SLOTS = 8
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+DRIVER_PATH_FILE = "chromedriver_path"
+# Fields Network.setCookies accepts (CookieParam) besides expires
+COOKIE_PARAM_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')
+
+
+class CookieJar:
+    """Saved browser cookies of one account (JSON file readable only by the owner)."""
+
+    def __init__(self, session_dir, username: str):
+        key = hashlib.sha1((username or '').encode('utf-8')).hexdigest()[:16]
+        self.path = Path(session_dir) / f"cookies_{key}.json"
+
+    def load(self) -> List[Dict]:
+        """Saved cookies that have not expired (empty if none were saved or all expired)."""
+        try:
+            cookies = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return []
+        now = time.time()
+        return [c for c in cookies if isinstance(c, dict) and c.get('name') and (c.get('expiry') or now + 1) > now]
+
+    def save(self, cookies: List[Dict]):
+        # Each save has its own temp file: browsers of the same account may save at the same time
+        _write_private(self.path, json.dumps(cookies))
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def cdp_cookie_params(cookies: List[Dict]) -> List[Dict]:
+    """
+    Network.setCookies parameters from CDP Network.getAllCookies or WebDriver cookies: read-only fields
+    (size, session, priority, partitionKey...) dropped, WebDriver 'expiry' mapped to 'expires'.
+    """
+    params = []
+    for cookie in cookies:
+        param = {k: cookie[k] for k in COOKIE_PARAM_FIELDS if cookie.get(k) is not None}
+        expires = cookie.get('expires', cookie.get('expiry'))
+        if not cookie.get('session') and expires is not None and expires > 0:
+            param['expires'] = expires
+        params.append(param)
+    return params
+
+
+class ProfileSlot:
+    """A Chrome user-data-dir reserved for this process until release()."""
+
+    def __init__(self, path: Path, lock_file):
+        self.path = path
+        self._lock_file = lock_file
+
+    def chrome_arguments(self) -> List[str]:
+        return [f'--user-data-dir={self.path}', f'--disk-cache-size={DISK_CACHE_BYTES}']
+
+    def release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # closing the file drops the lock
+            self._lock_file = None
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def claim_profile(session_dir, max_slots: int = MAX_PROFILE_SLOTS) -> Optional[ProfileSlot]:
+    """First Chrome profile slot not in use by another running browser; None if all are taken."""
+    for index in range(max_slots):
+        path = Path(session_dir) / f"chrome_profile_{index}"
+        path.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path / "slot.lock", 'a+')
+        if _try_lock(lock_file):
+            # Left behind by a Chrome that crashed; nothing else can be using this profile now
+            for name in ('SingletonLock', 'SingletonSocket', 'SingletonCookie'):
+                try:
+                    os.unlink(str(path / name))
+                except OSError:
+                    pass
+            return ProfileSlot(path, lock_file)
+        lock_file.close()
+    return None
+
+
+def _write_private(path: Path, text: str):
+    """Replace path with text through a temp file of its own, readable only by the owner."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')  # mode 0600
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, str(path))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _is_private(path: Path) -> bool:
+    """True if path belongs to this user and nobody else can write it."""
+    st = path.stat()
+    if hasattr(os, 'geteuid') and st.st_uid != os.geteuid():
+        return False
+    return not st.st_mode & 0o022
+
+
+def cached_driver_path(session_dir) -> Optional[str]:
+    """
+    chromedriver path that started a browser before, if it is still there and executable. The cache
+    picks the binary that gets launched, so it is ignored unless it is this user's and not writable by others.
+    """
+    cache = Path(session_dir) / DRIVER_PATH_FILE
+    try:
+        if not _is_private(cache):
+            return None
+        path = cache.read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+    return path if path and os.access(path, os.X_OK) else None
+
+
+def remember_driver_path(session_dir, path: str):
+    try:
+        _write_private(Path(session_dir) / DRIVER_PATH_FILE, path)
+    except OSError:
+        pass
+
+
+def forget_driver_path(session_dir):
+    try:
+        (Path(session_dir) / DRIVER_PATH_FILE).unlink()
+    except OSError:
+        pass
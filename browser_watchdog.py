@@ -0,0 +1,184 @@
+"""
+Memory watchdog for long Selenium runs.
+One Chrome instance keeps growing over hundreds of listings (modals, caches, detached DOM) until it
+slows down or the container OOM-kills it. The watchdog samples Chrome's memory — JS heap and DOM
+counters from CDP Performance.getMetrics, resident memory of the chromedriver/Chrome process tree
+from /proc where available — and tells the scraper to recycle the driver after a number of pages or
+once memory crosses a threshold. HangSupervisor guards the per-listing deadline against a driver
+call that never returns.
+"""
+
+import os
+import signal
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+RECYCLE_AFTER_PAGES = int(os.environ.get('HARAJ_RECYCLE_PAGES', '200') or 0)
+RECYCLE_ABOVE_MB = float(os.environ.get('HARAJ_RECYCLE_MB', '1500') or 0)
+# Pages between memory samples (a sample is one CDP call plus a /proc scan)
+SAMPLE_EVERY = 10
+# Seconds past a listing's deadline before a still-blocked driver call counts as hung
+HANG_GRACE = 15
+
+
+def _process_table():
+    """({ppid: [pids]}, {pid: resident pages}) from /proc."""
+    children = {}
+    rss_pages = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read().decode('ascii', 'replace')
+            with open(f'/proc/{entry}/statm', 'rb') as f:
+                statm = f.read().split()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state, ppid, ...
+        ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+        rss_pages[int(entry)] = int(statm[1])
+    return children, rss_pages
+
+
+def _descendants(root_pid: int, children: Dict[int, List[int]]) -> List[int]:
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def process_tree_rss(root_pid: int) -> Optional[int]:
+    """Resident memory in bytes of a process and all its descendants (Linux /proc); None elsewhere."""
+    if not root_pid or not os.path.isdir('/proc'):
+        return None
+    children, rss_pages = _process_table()
+    if root_pid not in rss_pages:
+        return None
+    return sum(rss_pages.get(pid, 0) for pid in _descendants(root_pid, children)) * os.sysconf('SC_PAGE_SIZE')
+
+
+def kill_process_tree(root_pid: int) -> int:
+    """Kill a process and its descendants (only the process itself without /proc). Returns how many."""
+    children = _process_table()[0] if os.path.isdir('/proc') else {}
+    killed = 0
+    for pid in _descendants(root_pid, children):
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+def cdp_metrics(driver) -> Dict[str, float]:
+    """Performance.getMetrics of the current tab as {name: value} (empty if CDP is unavailable)."""
+    try:
+        result = driver.execute_cdp_cmd('Performance.getMetrics', {})
+    except Exception:
+        return {}
+    return {m['name']: m['value'] for m in result.get('metrics', [])}
+
+
+class MemoryWatchdog:
+    """Counts page loads, samples memory every SAMPLE_EVERY pages and decides when to recycle."""
+
+    def __init__(self, recycle_after_pages: int = RECYCLE_AFTER_PAGES, recycle_above_mb: float = RECYCLE_ABOVE_MB,
+                 sample_every: int = SAMPLE_EVERY):
+        self.recycle_after_pages = recycle_after_pages
+        self.recycle_above_mb = recycle_above_mb
+        self.sample_every = max(1, sample_every)
+        self.pages = 0
+        self.total_pages = 0
+        self.recycles = 0
+        self.peak_mb = 0.0
+        self.samples = deque(maxlen=100)
+
+    def page_loaded(self):
+        self.pages += 1
+        self.total_pages += 1
+
+    def sample(self, driver, driver_pid: Optional[int] = None) -> Dict:
+        """One memory sample: Chrome tree RSS (if readable), JS heap, DOM nodes/documents, pages since launch."""
+        metrics = cdp_metrics(driver)
+        rss = process_tree_rss(driver_pid) if driver_pid else None
+        sample = {
+            'time': time.time(),
+            'pages': self.pages,
+            'rss_mb': round(rss / 1048576, 1) if rss is not None else None,
+            'js_heap_mb': round(metrics.get('JSHeapUsedSize', 0) / 1048576, 1),
+            'js_heap_total_mb': round(metrics.get('JSHeapTotalSize', 0) / 1048576, 1),
+            'nodes': int(metrics.get('Nodes', 0)),
+            'documents': int(metrics.get('Documents', 0)),
+        }
+        self.peak_mb = max(self.peak_mb, sample['rss_mb'] or sample['js_heap_total_mb'])
+        self.samples.append(sample)
+        return sample
+
+    def recycle_reason(self, driver, driver_pid: Optional[int] = None) -> Optional[str]:
+        """Why the driver should be restarted now, or None. Samples memory every sample_every pages."""
+        if self.recycle_after_pages and self.pages >= self.recycle_after_pages:
+            return f"{self.pages} pages since launch"
+        if not self.pages or self.pages % self.sample_every:
+            return None
+        sample = self.sample(driver, driver_pid)
+        # RSS covers every Chrome process; without /proc the tab's JS heap is the best signal
+        memory_mb = sample['rss_mb'] if sample['rss_mb'] is not None else sample['js_heap_total_mb']
+        if self.recycle_above_mb and memory_mb > self.recycle_above_mb:
+            return f"{memory_mb:.0f} MB in use (limit {self.recycle_above_mb:.0f} MB)"
+        return None
+
+    def recycled(self):
+        self.pages = 0
+        self.recycles += 1
+
+    def stats(self) -> Dict:
+        """Latest sample plus totals, for status output."""
+        return {
+            'pages_since_launch': self.pages,
+            'pages': self.total_pages,
+            'recycles': self.recycles,
+            'peak_mb': self.peak_mb,
+            'latest': self.samples[-1] if self.samples else None,
+        }
+
+
+class HangSupervisor:
+    """
+    Watches one listing at a time from a timer thread. Page-load and script timeouts do not help when
+    the renderer hangs and chromedriver never answers; if the listing is still running `grace` seconds
+    after its deadline, on_hang runs (the scraper kills the browser so the blocked call fails).
+    """
+
+    def __init__(self, on_hang: Callable[[], None], grace: float = HANG_GRACE):
+        self.on_hang = on_hang
+        self.grace = grace
+        self.fired = False
+        self.hangs = 0
+        self._timer = None
+
+    def arm(self, seconds: float):
+        self.disarm()
+        self.fired = False
+        self._timer = threading.Timer(seconds + self.grace, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def disarm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _fire(self):
+        self.fired = True
+        self.hangs += 1
+        print(f"  [Watchdog] Listing still blocked {self.grace:.0f}s past its deadline, killing the browser")
+        try:
+            self.on_hang()
+        except Exception as e:
+            print(f"  [Watchdog] Could not kill the browser: {e}")
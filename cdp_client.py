@@ -0,0 +1,196 @@
+"""
+Chrome DevTools Protocol client for one tab, talking to Chrome over the tab's websocket.
+Selenium calls go Python -> chromedriver (HTTP) -> CDP -> Chrome; here each call is one websocket
+round trip, and page readiness (Page.loadEventFired) and network activity arrive as events instead
+of being polled. Used by the 'cdp' engine of HarajScraperSelenium (Chrome is still started and
+logged in through chromedriver, this client opens its own tab in it) and by benchmark_cdp.py.
+"""
+
+import json
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import requests
+import websocket
+
+from cancellation import CancelToken, ScrapeCancelled
+
+# Events kept between navigations (a listing page sends a few hundred Network events)
+MAX_EVENTS = 5000
+# Slice of a blocking wait after which the cancel token is checked
+POLL_INTERVAL = 0.25
+
+# Center of the first element matching an XPath, scrolled into view (null if there is none)
+_ELEMENT_CENTER_JS = """
+(() => {
+    const el = document.evaluate(%s, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!el) return null;
+    el.scrollIntoView({block: 'center'});
+    const r = el.getBoundingClientRect();
+    return [r.left + r.width / 2, r.top + r.height / 2];
+})()
+"""
+
+
+class CdpError(Exception):
+    """A CDP command failed (protocol error, script exception or failed navigation)."""
+
+
+class CdpTab:
+    """One page target: commands (send) with their replies matched by id, events buffered in order."""
+
+    def __init__(self, ws, target_id: Optional[str] = None, http_base: Optional[str] = None,
+                 cancel_token: Optional[CancelToken] = None):
+        self.ws = ws
+        self.target_id = target_id
+        self.http_base = http_base
+        self.cancel_token = cancel_token or CancelToken()
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._next_id = 0
+
+    @classmethod
+    def open(cls, debugger_address: str, cancel_token: Optional[CancelToken] = None,
+             timeout: float = 30) -> 'CdpTab':
+        """New tab in the Chrome listening on debugger_address (host:port), with Page and Network events on."""
+        http_base = f"http://{debugger_address}"
+        # Chrome 111+ wants PUT for /json/new, older versions GET
+        response = requests.put(f"{http_base}/json/new?about:blank", timeout=timeout)
+        if response.status_code == 405:
+            response = requests.get(f"{http_base}/json/new?about:blank", timeout=timeout)
+        response.raise_for_status()
+        target = response.json()
+        # Without an Origin header Chrome accepts the connection without --remote-allow-origins
+        ws = websocket.create_connection(target['webSocketDebuggerUrl'], timeout=timeout, suppress_origin=True)
+        tab = cls(ws, target_id=target.get('id'), http_base=http_base, cancel_token=cancel_token)
+        tab.send('Page.enable')
+        tab.send('Network.enable')
+        return tab
+
+    def _recv(self, timeout: float) -> Optional[Dict]:
+        self.ws.settimeout(timeout)
+        try:
+            return json.loads(self.ws.recv())
+        except websocket.WebSocketTimeoutException:
+            return None
+
+    def send(self, method: str, params: Optional[Dict] = None, timeout: float = 30) -> Dict:
+        """Run one command and return its result; events received meanwhile are buffered."""
+        self._next_id += 1
+        message_id = self._next_id
+        self.ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise CdpError(f"{method}: no reply after {timeout:.0f}s")
+            message = self._recv(min(remaining, POLL_INTERVAL))
+            if message is None:
+                self.cancel_token.raise_if_cancelled()
+                continue
+            if message.get('id') == message_id:
+                if 'error' in message:
+                    raise CdpError(f"{method}: {message['error'].get('message')}")
+                return message.get('result', {})
+            if 'method' in message:
+                self.events.append(message)
+
+    def wait_event(self, method: str, timeout: float, predicate: Optional[Callable[[Dict], bool]] = None) -> Optional[Dict]:
+        """
+        Params of the first buffered or incoming event named method (and matching predicate), removed from
+        the buffer; None after timeout. A stop request stops the page and raises ScrapeCancelled.
+        """
+        for event in list(self.events):
+            if event['method'] == method and (predicate is None or predicate(event['params'])):
+                self.events.remove(event)
+                return event['params']
+        deadline = time.time() + timeout
+        while True:
+            if self.cancel_token.cancelled:
+                self.stop()
+                raise ScrapeCancelled()
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            message = self._recv(min(remaining, POLL_INTERVAL))
+            if message is None or 'method' not in message:
+                continue
+            if message['method'] == method and (predicate is None or predicate(message.get('params', {}))):
+                return message.get('params', {})
+            self.events.append(message)
+
+    def navigate(self, url: str, timeout: float) -> Optional[Dict]:
+        """
+        Load url and wait for its load event. Returns the main document's response (url, status,
+        mimeType) once loaded, {} if it loaded without a response event, None on timeout.
+        """
+        self.events.clear()
+        result = self.send('Page.navigate', {'url': url}, timeout=timeout)
+        if result.get('errorText'):
+            raise CdpError(f"Navigation to {url} failed: {result['errorText']}")
+        if self.wait_event('Page.loadEventFired', timeout) is None:
+            return None
+        return self.document_response(result.get('frameId')) or {}
+
+    def document_response(self, frame_id: Optional[str] = None) -> Optional[Dict]:
+        """Response of the latest Document request (of frame_id) among the buffered Network events."""
+        for event in reversed(self.events):
+            params = event.get('params', {})
+            if (event['method'] == 'Network.responseReceived' and params.get('type') == 'Document'
+                    and (frame_id is None or params.get('frameId') == frame_id)):
+                return params.get('response')
+        return None
+
+    def evaluate(self, expression: str, timeout: float = 30):
+        """Value of a JavaScript expression in the page (returned by value, promises awaited)."""
+        result = self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True,
+                                                'awaitPromise': True}, timeout=timeout)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CdpError(details.get('exception', {}).get('description') or details.get('text', 'script error'))
+        return result.get('result', {}).get('value')
+
+    def html(self) -> str:
+        return self.evaluate("document.documentElement.outerHTML") or ''
+
+    def click(self, xpath: str) -> bool:
+        """Real mouse click (Input events, like a user's) on the first element matching xpath; False if none."""
+        center = self.evaluate(_ELEMENT_CENTER_JS % json.dumps(xpath))
+        if not center:
+            return False
+        x, y = center
+        for event_type in ('mousePressed', 'mouseReleased'):
+            self.send('Input.dispatchMouseEvent', {'type': event_type, 'x': x, 'y': y, 'button': 'left',
+                                                   'clickCount': 1})
+        return True
+
+    def requests_made(self, resource_types=('XHR', 'Fetch')) -> List[Dict]:
+        """Requests of these types since the last navigation (url, method, headers), like http_session.capture_api_calls."""
+        return [{'url': p['request'].get('url', ''), 'method': p['request'].get('method', 'GET'),
+                 'headers': p['request'].get('headers', {})}
+                for p in (e['params'] for e in self.events if e['method'] == 'Network.requestWillBeSent')
+                if p.get('type') in resource_types]
+
+    def cookies(self) -> List[Dict]:
+        return self.send('Network.getAllCookies').get('cookies', [])
+
+    def set_cookies(self, cookies: List[Dict]):
+        self.send('Network.setCookies', {'cookies': cookies})
+
+    def stop(self):
+        try:
+            self.send('Page.stopLoading', timeout=5)
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the websocket and the tab (if this client opened it)."""
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        if self.target_id and self.http_base:
+            try:
+                requests.get(f"{self.http_base}/json/close/{self.target_id}", timeout=5)
+            except requests.RequestException:
+                pass
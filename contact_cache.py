@@ -0,0 +1,105 @@
+"""
+Seller-level contact cache for the contact-reveal stage.
+Revealing a phone number means clicking the listing's contact button and waiting for the modal, which
+costs seconds per listing. Dealers post many listings under the same seller page, so the revealed
+contact is kept per seller_url in the listings DB and reused; only listings whose seller is not yet
+known need the click, either right away or later in a batch (reveal_pending_contacts).
+"""
+
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from listing_store import connect
+
+CONTACT_MODES = ('inline', 'deferred', 'off')
+# inline: reveal while scraping (cache hits skip the click); deferred: only mark listings as pending;
+# off: never reveal
+DEFAULT_CONTACT_MODE = os.environ.get('HARAJ_CONTACTS') if os.environ.get('HARAJ_CONTACTS') in CONTACT_MODES else 'inline'
+
+# contact_info keys that belong to the seller rather than to one listing
+SELLER_CONTACT_KEYS = ('phone_numbers', 'seller_phone', 'contact_extracted', 'whatsapp_available', 'whatsapp_link')
+
+
+def needs_contact(listing: Dict) -> bool:
+    """True if the listing's contact is still to be revealed (pending, or a button whose number was not read)."""
+    contact = listing.get('contact_info') or {}
+    if contact.get('phone_numbers'):
+        return False
+    return bool(contact.get('contact_pending') or (contact.get('has_contact_button') and contact.get('login_required')))
+
+
+class SellerContactCache:
+    """Revealed contacts per seller_url, in the listings DB (shared by every run and process using it)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.hits = 0
+        conn = connect(db_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seller_contacts (
+                    seller_url TEXT PRIMARY KEY,
+                    contact TEXT NOT NULL,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, seller_url: str) -> Optional[Dict]:
+        if not seller_url:
+            return None
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute("SELECT contact FROM seller_contacts WHERE seller_url = ?", (seller_url,)).fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        try:
+            return json.loads(row[0]) if row else None
+        except (ValueError, TypeError):
+            return None
+
+    def put(self, seller_url: str, contact_info: Dict) -> bool:
+        """Remember a seller's revealed contact; only contacts with a phone number are kept."""
+        contact = {k: contact_info[k] for k in SELLER_CONTACT_KEYS if contact_info.get(k)}
+        if not seller_url or not contact.get('phone_numbers'):
+            return False
+        conn = connect(self.db_path)
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO seller_contacts (seller_url, contact, updated_at) VALUES (?, ?, datetime('now'))",
+                (seller_url, json.dumps(contact, ensure_ascii=False))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+
+    def apply(self, listing: Dict) -> bool:
+        """Fill the listing's contact_info from its seller's cached contact; False if the seller is unknown."""
+        contact = self.get(listing.get('seller_url') or '')
+        if contact is None:
+            return False
+        info = listing.setdefault('contact_info', {})
+        info.pop('contact_pending', None)
+        info.pop('login_required', None)
+        info.update(contact)
+        info['has_contact_button'] = True
+        info['from_seller_cache'] = True
+        self.hits += 1
+        return True
+
+
+def pending_by_seller(listings: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """Listings still needing a contact, grouped by seller_url (listings without one each form their own group)."""
+    groups = OrderedDict()
+    for listing in listings:
+        if needs_contact(listing):
+            groups.setdefault(listing.get('seller_url') or listing.get('url') or '', []).append(listing)
+    return groups
@@ -0,0 +1,267 @@
+"""
+Durable crawl frontier for Haraj scrape jobs.
+Each discovered listing URL is stored per job with its state (pending / in_progress / done / failed),
+attempt count and timestamps, so a job killed mid-run resumes where it stopped instead of
+repeating discovery and scraping from zero.
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from listing_store import connect
+
+
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+# Seconds before the first end-of-job retry round; doubles with every further round
+RETRY_BACKOFF = 5.0
+
+
+def init_frontier_db(db_path):
+    """Create frontier tables if they do not exist."""
+    conn = connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier_jobs (
+                job_name TEXT PRIMARY KEY,
+                seed_url TEXT,
+                discovered INTEGER DEFAULT 0,
+                created_at TEXT DEFAULT (datetime('now')),
+                updated_at TEXT DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                job_name TEXT NOT NULL,
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                added_at TEXT DEFAULT (datetime('now')),
+                updated_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (job_name, url)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (job_name, state, position)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_url ON frontier (url)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class CrawlFrontier:
+    """
+    Persistent URL queue for one named crawl job.
+    With dedup_prefix, the job is one partition of a fan-out crawl: URLs already claimed by any other
+    job whose name starts with the prefix are skipped (marked done) instead of being scraped twice.
+    """
+
+    def __init__(self, db_path, job_name: str, max_attempts: int = 3, dedup_prefix: Optional[str] = None):
+        self.db_path = db_path
+        self.job_name = job_name
+        self.max_attempts = max_attempts
+        self.dedup_prefix = dedup_prefix
+        self.skipped = 0
+        init_frontier_db(db_path)
+        conn = connect(self.db_path)
+        try:
+            conn.execute("INSERT OR IGNORE INTO frontier_jobs (job_name) VALUES (?)", (job_name,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        conn = connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _update(self, sql: str, params=()) -> int:
+        conn = connect(self.db_path)
+        try:
+            cur = conn.execute(sql, params)
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def is_discovered(self) -> bool:
+        """True once URL discovery for this job finished (URLs can be reused without re-crawling)."""
+        rows = self._query("SELECT discovered FROM frontier_jobs WHERE job_name = ?", (self.job_name,))
+        return bool(rows and rows[0][0])
+
+    def mark_discovered(self, seed_url: str = ''):
+        self._update(
+            "UPDATE frontier_jobs SET discovered = 1, seed_url = ?, updated_at = datetime('now') WHERE job_name = ?",
+            (seed_url, self.job_name)
+        )
+
+    def add_urls(self, urls: Iterable[str]) -> int:
+        """Add newly discovered URLs as pending (existing ones are kept as-is). Returns number added."""
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute("SELECT COALESCE(MAX(position), 0) FROM frontier WHERE job_name = ?",
+                               (self.job_name,)).fetchone()
+            position = row[0]
+            added = 0
+            for url in urls:
+                position += 1
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO frontier (job_name, url, position) VALUES (?, ?, ?)",
+                    (self.job_name, url, position)
+                )
+                added += cur.rowcount
+            conn.commit()
+            return added
+        finally:
+            conn.close()
+
+    def urls(self, state: Optional[str] = None) -> List[str]:
+        """All URLs of the job in discovery order, optionally filtered by state."""
+        if state:
+            rows = self._query(
+                "SELECT url FROM frontier WHERE job_name = ? AND state = ? ORDER BY position", (self.job_name, state)
+            )
+        else:
+            rows = self._query("SELECT url FROM frontier WHERE job_name = ? ORDER BY position", (self.job_name,))
+        return [r[0] for r in rows]
+
+    def recover(self) -> int:
+        """
+        Prepare a (re)started run: URLs left in_progress by a dead process and failed URLs that still
+        have attempts left go back to pending. Returns number of URLs requeued.
+        """
+        return self._update(
+            "UPDATE frontier SET state = ?, updated_at = datetime('now') "
+            "WHERE job_name = ? AND (state = ? OR (state = ? AND attempts < ?))",
+            (PENDING, self.job_name, IN_PROGRESS, FAILED, self.max_attempts)
+        )
+
+    def requeue_failed(self) -> int:
+        """Failed URLs that still have attempts left go back to pending. Returns how many."""
+        return self._update(
+            "UPDATE frontier SET state = ?, updated_at = datetime('now') WHERE job_name = ? AND state = ? AND attempts < ?",
+            (PENDING, self.job_name, FAILED, self.max_attempts)
+        )
+
+    def claim_next(self) -> Optional[str]:
+        """Atomically move the next pending URL to in_progress and return it (None when drained)."""
+        conn = connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                row = conn.execute(
+                    "SELECT url FROM frontier WHERE job_name = ? AND state = ? ORDER BY position LIMIT 1",
+                    (self.job_name, PENDING)
+                ).fetchone()
+                if not row:
+                    conn.commit()
+                    return None
+                if not self.dedup_prefix or not self._claimed_by_sibling(conn, row[0]):
+                    break
+                conn.execute(
+                    "UPDATE frontier SET state = ?, last_error = 'duplicate of another partition', "
+                    "updated_at = datetime('now') WHERE job_name = ? AND url = ?",
+                    (DONE, self.job_name, row[0])
+                )
+                self.skipped += 1
+            conn.execute(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, updated_at = datetime('now') "
+                "WHERE job_name = ? AND url = ?",
+                (IN_PROGRESS, self.job_name, row[0])
+            )
+            conn.commit()
+            return row[0]
+        finally:
+            conn.close()
+
+    def peek_pending(self, limit: int) -> List[str]:
+        """The next pending URLs in claim order, without claiming them (for prefetching)."""
+        if limit <= 0:
+            return []
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT url FROM frontier WHERE job_name = ? AND state = ? ORDER BY position LIMIT ?",
+                (self.job_name, PENDING, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [r[0] for r in rows]
+
+    def _claimed_by_sibling(self, conn, url: str) -> bool:
+        prefix = self.dedup_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        row = conn.execute(
+            "SELECT 1 FROM frontier WHERE url = ? AND job_name != ? AND job_name LIKE ? ESCAPE '\\' "
+            "AND state IN (?, ?) LIMIT 1",
+            (url, self.job_name, prefix + '%', IN_PROGRESS, DONE)
+        ).fetchone()
+        return row is not None
+
+    def mark_done(self, url: str):
+        self._update(
+            "UPDATE frontier SET state = ?, last_error = NULL, updated_at = datetime('now') WHERE job_name = ? AND url = ?",
+            (DONE, self.job_name, url)
+        )
+
+    def mark_failed(self, url: str, error: str = ''):
+        self._update(
+            "UPDATE frontier SET state = ?, last_error = ?, updated_at = datetime('now') WHERE job_name = ? AND url = ?",
+            (FAILED, (error or '')[:1000], self.job_name, url)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of URLs per state."""
+        counts = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0}
+        rows = self._query(
+            "SELECT state, COUNT(*) FROM frontier WHERE job_name = ? GROUP BY state", (self.job_name,)
+        )
+        for state, n in rows:
+            counts[state] = n
+        return counts
+
+    def is_complete(self) -> bool:
+        """True when discovery finished and nothing is left to scrape (or retry)."""
+        if not self.is_discovered():
+            return False
+        c = self.counts()
+        if c[PENDING] or c[IN_PROGRESS]:
+            return False
+        retryable = self._query(
+            "SELECT COUNT(*) FROM frontier WHERE job_name = ? AND state = ? AND attempts < ?",
+            (self.job_name, FAILED, self.max_attempts)
+        )[0][0]
+        return not retryable
+
+    def reset(self):
+        """Forget all URLs of this job so the next run starts with fresh discovery."""
+        self._update("DELETE FROM frontier WHERE job_name = ?", (self.job_name,))
+        self._update(
+            "UPDATE frontier_jobs SET discovered = 0, updated_at = datetime('now') WHERE job_name = ?", (self.job_name,)
+        )
+
+
+def claim_with_retries(frontier: CrawlFrontier, sleep: Callable[[float], None],
+                       backoff: float = RETRY_BACKOFF) -> Iterator[Tuple[str, int]]:
+    """
+    Claim URLs until the frontier is drained, then retry the failed ones in rounds with exponential
+    backoff (backoff, 2*backoff, ...) until none has attempts left. Yields (url, retry round; 0 = first pass),
+    so a failing listing never blocks the main pass.
+    """
+    retry_round = 0
+    while True:
+        url = frontier.claim_next()
+        if url:
+            yield url, retry_round
+            continue
+        requeued = frontier.requeue_failed()
+        if not requeued:
+            return
+        retry_round += 1
+        delay = backoff * 2 ** (retry_round - 1)
+        print(f"Retry round {retry_round}: {requeued} failed URLs, starting in {delay:.0f}s")
+        sleep(delay)
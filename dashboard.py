@@ -7,10 +7,9 @@ import json
 import os
 import re
 from pathlib import Path
-import csv
 import io
-import threading
 import time
+import uuid
 import subprocess
 import sys
 from urllib.parse import quote
@@ -20,6 +19,14 @@ try:
 except ImportError:
     requests = None
 
+import listing_store
+from crawl_frontier import CrawlFrontier, claim_with_retries
+from rate_limit import shared_budget_from_env
+from cancellation import CancelToken, ScrapeCancelled
+from job_queue import JobQueue, JobStatus, JobDispatcher, job_to_status, CANCELLED, COMPLETED, FAILED
+from extraction_profiles import DEFAULT_PROFILE, PROFILES
+from browser_pool import BrowserPool
+
 # Get the directory where this script is located
 _script_dir = Path(__file__).parent.absolute()
 BASE_DIR = _script_dir
@@ -34,7 +41,10 @@ _config_env = os.environ.get("HARAJ_CONFIG_FILE") or os.environ.get("CONFIG_FILE
 DATA_DIR = Path(_data_dir_env) if _data_dir_env else (BASE_DIR / "scraped_data")
 CONFIG_FILE = Path(_config_env) if _config_env else (BASE_DIR / "scraper_config.json")
 SAVED_LISTINGS_FILE = DATA_DIR / "saved_listings.json"
+SAVED_LISTINGS_CSV_FILE = DATA_DIR / "saved_listings.csv"
 LISTINGS_DB = DATA_DIR / "listings.db"
+# Saved login cookies and reusable Chrome profiles (kept on the data volume so redeploys keep them)
+BROWSER_SESSION_DIR = Path(os.environ.get("HARAJ_SESSION_DIR") or DATA_DIR / "browser_session")
 
 # Haraj.com.sa – scrape leads from https://haraj.com.sa/ (exact tag names from site)
 HARAJ_SITE = "https://haraj.com.sa"
@@ -64,6 +74,12 @@ HARAJ_CATEGORIES = [
     {"id": "other", "name_ar": "قسم غير مصنف", "name_en": "More", "tag": "قسم غير مصنف"},
 ]
 
+# Major cities for splitting a fan-out crawl further by Haraj /city/ pages
+HARAJ_CITIES = [
+    "الرياض", "جدة", "مكة", "المدينة", "الدمام", "الخبر", "الاحساء", "الطائف",
+    "تبوك", "بريدة", "خميس مشيط", "ابها", "حائل", "جازان", "نجران", "القصيم",
+]
+
 
 def get_categories_with_urls():
     """Return categories with full Haraj tag URLs (tag part URL-encoded)."""
@@ -79,14 +95,20 @@ try:
 except:
     pass  # Continue even if directory creation fails
 
-# Scraping status
-scraping_status = {
-    'is_running': False,
-    'progress': 0,
-    'total': 0,
-    'current_listing': '',
-    'error': None
-}
+# Scrape jobs are queued in the listings DB so status is shared by all gunicorn workers
+try:
+    SCRAPE_CONCURRENCY = max(1, int(os.environ.get("HARAJ_SCRAPE_CONCURRENCY", "1") or 1))
+except ValueError:
+    SCRAPE_CONCURRENCY = 1
+job_queue = JobQueue(LISTINGS_DB, max_concurrency=SCRAPE_CONCURRENCY)
+# Warm Chrome instances reused across the jobs this process runs (HARAJ_WARM_BROWSERS, default none)
+browser_pool = BrowserPool()
+# Requests per minute shared by every scraper process on this host (HARAJ_RATE_PER_MINUTE, unset = unlimited);
+# parallel jobs may burst one request each unless HARAJ_RATE_BURST says otherwise
+rate_budget = shared_budget_from_env(default_burst=SCRAPE_CONCURRENCY)
+# "inline": web workers run jobs in threads; "worker": jobs only run in scrape_worker.py processes
+SCRAPE_MODE = (os.environ.get("HARAJ_SCRAPE_MODE") or "inline").strip().lower()
+
 
 def load_config():
     """Load scraper configuration. OpenAI API key is stored until user adds or changes it in Settings."""
@@ -194,66 +216,29 @@ def load_listings():
 
 def _init_listings_db():
     """Create SQLite DB and table if not exists."""
-    import sqlite3
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(LISTINGS_DB))
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS listings (
-            listing_id TEXT PRIMARY KEY,
-            url TEXT,
-            data TEXT NOT NULL,
-            updated_at TEXT DEFAULT (datetime('now'))
-        )
-    """)
-    conn.commit()
-    conn.close()
+    listing_store.init_db(LISTINGS_DB)
 
 
 def _load_saved_listings_from_db():
     """Load all listings from SQLite. Returns list of dicts or empty list."""
-    import sqlite3
-    if not LISTINGS_DB.exists():
-        return []
-    try:
-        conn = sqlite3.connect(str(LISTINGS_DB))
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT data FROM listings ORDER BY updated_at ASC").fetchall()
-        conn.close()
-        listings = []
-        for row in rows:
-            try:
-                listings.append(json.loads(row[0]))
-            except (json.JSONDecodeError, TypeError):
-                continue
-        return listings
-    except Exception:
-        return []
+    return listing_store.load_all_listings(LISTINGS_DB)
 
 
 def _save_saved_listings_to_db(listings):
-    """Upsert all listings into SQLite."""
-    import sqlite3
-    import re
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    _init_listings_db()
-    conn = sqlite3.connect(str(LISTINGS_DB))
-    for L in listings:
-        lid = (str(L.get('listing_id') or '')).strip()
-        url = (L.get('url') or '').strip()[:2000]
-        pk = lid if lid else ('url_' + re.sub(r'[^\w\-.]', '_', (url or '')[:120]))
-        data = json.dumps(L, ensure_ascii=False)
-        conn.execute(
-            "INSERT OR REPLACE INTO listings (listing_id, url, data, updated_at) VALUES (?, ?, ?, datetime('now'))",
-            (pk, url or None, data)
-        )
-    conn.commit()
-    conn.close()
+    """Upsert the given listings into SQLite. Returns number of rows written."""
+    return listing_store.upsert_listings(LISTINGS_DB, listings)
 
 
 def load_saved_listings():
-    """Load saved listings from DB first; if empty, load from JSON and migrate to DB."""
+    """
+    Load saved listings from the DB. saved_listings.json is imported once into an empty DB (installs
+    from before the DB); after that it is only a snapshot of the DB and never read back.
+    """
     _init_listings_db()
     listings = _load_saved_listings_from_db()
+    migrated = listing_store.get_meta(LISTINGS_DB, 'json_imported') == '1'
+    if listings and not migrated:
+        listing_store.set_meta(LISTINGS_DB, 'json_imported', '1')
     if listings:
         for L in listings:
             if L.get('title'):
@@ -263,7 +248,8 @@ def load_saved_listings():
             if L.get('posted_time'):
                 L['posted_time'] = _sanitize_posted_time(L['posted_time'])
         return listings
-    if SAVED_LISTINGS_FILE.exists():
+    if not migrated and SAVED_LISTINGS_FILE.exists():
+        listing_store.set_meta(LISTINGS_DB, 'json_imported', '1')
         try:
             with open(SAVED_LISTINGS_FILE, 'r', encoding='utf-8') as f:
                 listings = json.load(f)
@@ -281,33 +267,14 @@ def load_saved_listings():
     return load_listings()
 
 
-def save_saved_listings(listings):
-    """Persist saved listings to SQLite DB and to JSON (sync for production and backup)."""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    _save_saved_listings_to_db(listings)
-    with open(SAVED_LISTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(listings, f, ensure_ascii=False, indent=2)
-
-
-def merge_saved_listings(new_listings):
-    """Merge new listings into saved; skip duplicates by listing_id (and url). Returns (merged_list, added_count, skipped_count)."""
-    saved = load_saved_listings()
-    seen_ids = {str(L.get('listing_id')) for L in saved if L.get('listing_id')}
-    seen_urls = {L.get('url', '').strip().rstrip('/') for L in saved if L.get('url')}
-    added = 0
-    skipped = 0
-    for L in new_listings:
-        lid = str(L.get('listing_id') or '')
-        url = (L.get('url') or '').strip().rstrip('/')
-        if lid in seen_ids or url in seen_urls:
-            skipped += 1
-            continue
-        seen_ids.add(lid)
-        if url:
-            seen_urls.add(url)
-        saved.append(L)
-        added += 1
-    return saved, added, skipped
+# JSON/CSV exports are derived from the DB and rebuilt only when it changed since the last export
+snapshot_exporter = listing_store.SnapshotExporter(
+    LISTINGS_DB, SAVED_LISTINGS_FILE, SAVED_LISTINGS_CSV_FILE, loader=load_saved_listings
+)
+try:
+    snapshot_exporter.start(float(os.environ.get("HARAJ_SNAPSHOT_INTERVAL", "0") or 0))
+except ValueError:
+    pass
 
 
 def get_listings_stats(listings):
@@ -483,10 +450,10 @@ def api_stats():
 
 @app.route('/api/save-listings', methods=['POST'])
 def api_save_listings():
-    """Explicitly save all current listings to DB and JSON (for production sync)."""
+    """Explicitly regenerate the JSON/CSV snapshots from the DB (for production sync)."""
     try:
         listings = load_saved_listings()
-        save_saved_listings(listings)
+        snapshot_exporter.export(force=True)
         return jsonify({
             'success': True,
             'message': f'تم حفظ {len(listings)} إعلان في قاعدة البيانات',
@@ -548,7 +515,11 @@ def view_listing(listing_id):
 
 @app.route('/download/json')
 def download_json():
-    """Download saved listings as JSON"""
+    """Download saved listings as JSON (snapshot regenerated from the DB if stale)"""
+    try:
+        snapshot_exporter.export()
+    except Exception as e:
+        print(f"Warning: Could not refresh JSON snapshot: {e}")
     if SAVED_LISTINGS_FILE.exists():
         return send_file(str(SAVED_LISTINGS_FILE), as_attachment=True, download_name='haraj_saved_listings.json')
     json_file = DATA_DIR / "listings.json"
@@ -558,213 +529,289 @@ def download_json():
 
 @app.route('/download/csv')
 def download_csv():
-    """Download saved listings as CSV with contact information"""
-    import re
-    listings = load_saved_listings()
-    if not listings:
+    """Download saved listings as CSV with contact information (snapshot regenerated from the DB if stale)"""
+    try:
+        snapshot_exporter.export()
+    except Exception as e:
+        print(f"Warning: Could not refresh CSV snapshot: {e}")
+    if not listing_store.count_listings(LISTINGS_DB) or not SAVED_LISTINGS_CSV_FILE.exists():
         return "No listings found", 404
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    fieldnames = [
-        'listing_id', 'title', 'description', 'price', 'city', 'location',
-        'posted_time', 'seller_name', 'seller_url', 'category',
-        'url', 'image_count', 'tags', 'phone_number', 'whatsapp_number', 'email'
-    ]
-    
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    
-    for listing in listings:
-        contact_info = listing.get('contact_info', {})
-        phone_numbers = contact_info.get('phone_numbers', [])
-        phone_number = ', '.join(phone_numbers) if phone_numbers else ''
-        
-        # Extract WhatsApp number from link
-        whatsapp_number = ''
-        whatsapp_link = contact_info.get('whatsapp_link', '')
-        if whatsapp_link:
-            # Extract phone from WhatsApp link
-            whatsapp_match = re.search(r'(?:wa\.me/|whatsapp.*phone=)(\d+)', whatsapp_link)
-            if whatsapp_match:
-                whatsapp_number = whatsapp_match.group(1)
-                # Remove country code if present
-                if whatsapp_number.startswith('966') and len(whatsapp_number) > 9:
-                    whatsapp_number = whatsapp_number[3:]
-        
-        # Extract email
-        emails = contact_info.get('emails', [])
-        email = ', '.join(emails) if emails else ''
-        
-        row = {
-            'listing_id': listing.get('listing_id', ''),
-            'title': listing.get('title', ''),
-            'description': listing.get('description', ''),
-            'price': listing.get('price', ''),
-            'city': listing.get('city', ''),
-            'location': listing.get('location', ''),
-            'posted_time': listing.get('posted_time', ''),
-            'seller_name': listing.get('seller_name', ''),
-            'seller_url': listing.get('seller_url', ''),
-            'category': listing.get('category', ''),
-            'url': listing.get('url', ''),
-            'image_count': len(listing.get('images', [])),
-            'tags': ', '.join(listing.get('tags', [])),
-            'phone_number': phone_number,
-            'whatsapp_number': whatsapp_number,
-            'email': email
-        }
-        writer.writerow(row)
-    
-    # Create response
-    output.seek(0)
-    mem = io.BytesIO()
-    mem.write(output.getvalue().encode('utf-8-sig'))
-    mem.seek(0)
-    
     return send_file(
-        mem,
+        str(SAVED_LISTINGS_CSV_FILE),
         mimetype='text/csv',
         as_attachment=True,
         download_name='haraj_listings.csv'
     )
 
-def run_scraper(max_listings, category_url):
-    """Run the scraper in background"""
-    global scraping_status
-    scraping_status['is_running'] = True
-    scraping_status['progress'] = 0
-    scraping_status['total'] = max_listings
-    scraping_status['current_listing'] = 'Starting...'
-    scraping_status['error'] = None
+def _publish(status, event, data):
+    """Send a live event for queued jobs (plain-dict runs have no subscribers)."""
+    if isinstance(status, JobStatus):
+        try:
+            status.publish(event, data)
+        except Exception as e:
+            print(f"Could not publish {event} event: {e}")
+
+
+def _lead_summary(listing):
+    """Fields of a freshly saved listing pushed to the dashboard as a new lead."""
+    contact_info = listing.get('contact_info') or {}
+    phones = contact_info.get('phone_numbers') or []
+    return {
+        'listing_id': listing.get('listing_id'),
+        'title': listing.get('title'),
+        'price': listing.get('price'),
+        'city': listing.get('city'),
+        'url': listing.get('url'),
+        'phone_number': ', '.join(phones) or contact_info.get('seller_phone') or None,
+    }
+
+
+def _stop_requested(status):
+    """True when the user asked to stop this run (shared job flag, or is_running cleared on a plain dict)."""
+    if isinstance(status, JobStatus):
+        return status.cancel_requested()
+    return not status.get('is_running', True)
+
+
+def _browser_launch_options(username=None, password=None):
+    """Options every dashboard browser starts with (jobs differ only in the per-job settings)."""
+    return dict(output_dir="scraped_data", download_images=False, headless=True,
+                username=username, password=password, session_dir=BROWSER_SESSION_DIR)
+
+
+def warm_browsers():
+    """Start HARAJ_WARM_BROWSERS browsers (logged in with the saved credentials) ahead of the first job."""
+    config = load_config()
+    return browser_pool.warm(**_browser_launch_options(config.get('username', '') or None,
+                                                      config.get('password', '') or None))
+
+
+def run_scraper(max_listings, category_url, job_name=None, status=None, dedup_prefix=None, profile=None):
+    """
+    Run the scraper in background. Runs with the same job_name (default: per category) resume an unfinished crawl.
+    Progress goes to `status` (a JobStatus for queued jobs, so it is shared across processes).
+    dedup_prefix: fan-out partition; skip URLs already claimed by jobs whose name starts with it.
+    profile: extraction profile (leads, catalog, full; default HARAJ_PROFILE or full).
+    """
+    if status is None:
+        status = {}
+    status['is_running'] = True
+    status['progress'] = 0
+    status['total'] = max_listings
+    status['current_listing'] = 'Starting...'
+    status['saved'] = 0
+    status['error'] = None
+    # Stop requests (possibly from another process) interrupt the scraper within ~0.25s
+    cancel_token = CancelToken().watch(lambda: _stop_requested(status))
     
     try:
-        # Import scraper (may fail in Vercel due to Selenium)
-        try:
-            from haraj_scraper_selenium import HarajScraperSelenium
-        except ImportError as e:
-            scraping_status['error'] = f"Selenium scraper not available in this environment: {str(e)}"
-            scraping_status['is_running'] = False
-            return
-        
         # Load credentials from config
         config = load_config()
         username = config.get('username', '') or None
         password = config.get('password', '') or None
         
         try:
-            scraper = HarajScraperSelenium(
-                output_dir="scraped_data",
-                download_images=False,
-                headless=True,
-                username=username,
-                password=password
-            )
+            if os.environ.get('HARAJ_ENGINE') == 'auto':
+                # HTTP first; Chrome only starts for page types that need it (choices kept in the listings DB)
+                from haraj_scraper_auto import HarajScraperAuto
+                scraper = HarajScraperAuto(
+                    output_dir="scraped_data",
+                    download_images=False,
+                    headless=True,
+                    username=username,
+                    password=password,
+                    rate_budget=rate_budget,
+                    cancel_token=cancel_token,
+                    db_path=LISTINGS_DB,
+                    profile=profile or DEFAULT_PROFILE,
+                    session_dir=BROWSER_SESSION_DIR
+                )
+            else:
+                # Import scraper (may fail in Vercel due to Selenium; the auto engine starts it only if needed)
+                try:
+                    import haraj_scraper_selenium  # noqa: F401
+                except ImportError as e:
+                    status['error'] = f"Selenium scraper not available in this environment: {str(e)}"
+                    status['is_running'] = False
+                    return
+                scraper = browser_pool.acquire(
+                    rate_budget=rate_budget,
+                    cancel_token=cancel_token,
+                    contact_db=LISTINGS_DB,
+                    profile=profile or DEFAULT_PROFILE,
+                    **_browser_launch_options(username, password)
+                )
+        except ScrapeCancelled:
+            return
         except Exception as e:
             error_msg = str(e)
             # Provide more helpful error message for ChromeDriver issues
             if "Status code was: 127" in error_msg or "chromedriver" in error_msg.lower():
-                scraping_status['error'] = f"ChromeDriver initialization failed: {error_msg}\n\n" \
+                status['error'] = f"ChromeDriver initialization failed: {error_msg}\n\n" \
                     "This usually means Chrome/ChromeDriver is not installed on the server.\n" \
                     "Please check Railway build logs to ensure Chrome and ChromeDriver are installed."
             else:
-                scraping_status['error'] = f"Failed to initialize scraper: {error_msg}"
-            scraping_status['is_running'] = False
+                status['error'] = f"Failed to initialize scraper: {error_msg}"
+            status['is_running'] = False
             return
         
         try:
+            # Durable frontier: a run of the same job resumes where a crashed or stopped run left off
+            frontier = CrawlFrontier(LISTINGS_DB, job_name or f'dashboard:{category_url}', dedup_prefix=dedup_prefix)
+            if frontier.is_complete():
+                frontier.reset()
+            frontier.recover()
+
             # Find listing URLs: request exact target so we scrape the requested count
             max_pages = max(5, (max_listings + 19) // 20)
-            scraping_status['current_listing'] = 'Finding listings...'
+            status['current_listing'] = 'Finding listings...'
             try:
                 listing_urls = scraper.find_listing_urls(
-                    category_url, max_pages=max_pages, target_count=max_listings
+                    category_url, max_pages=max_pages, target_count=max_listings, frontier=frontier
                 )
                 listing_urls = listing_urls[:max_listings]
+            except ScrapeCancelled:
+                return
             except Exception as e:
-                scraping_status['error'] = f"Failed to find listings: {str(e)}"
-                scraping_status['is_running'] = False
-                try:
-                    scraper.close()
-                except:
-                    pass
+                status['error'] = f"Failed to find listings: {str(e)}"
+                status['is_running'] = False
                 return
-            
-            scraping_status['total'] = len(listing_urls)
-            scraping_status['current_listing'] = f'Found {len(listing_urls)} listings. Starting to scrape...'
 
-            # Load saved listings for duplicate check
-            saved = load_saved_listings()
-            existing_ids = {str(L.get('listing_id')) for L in saved if L.get('listing_id')}
-            existing_urls = {(L.get('url') or '').strip().rstrip('/') for L in saved if L.get('url')}
+            counts = frontier.counts()
+            total = sum(counts.values())
+            status['total'] = total
+            status['progress'] = total - counts['pending']
+            status['current_listing'] = f'Found {total} listings ({counts["pending"]} left). Starting to scrape...'
+
+            # Load only ids/urls of saved listings for duplicate check (not the full dataset)
+            _init_listings_db()
+            existing_ids, existing_urls = listing_store.known_listing_keys(LISTINGS_DB)
 
-            all_listings = []
+            # Stream each new listing into the DB as it is scraped (batched commits), so leads show
+            # up live and a stop or crash keeps everything scraped so far. Frontier URLs are marked
+            # done only after their listing was committed.
             skipped_dupes = 0
-            for idx, url in enumerate(listing_urls, 1):
-                if not scraping_status['is_running']:
-                    break
-                scraping_status['progress'] = idx
-                scraping_status['current_listing'] = f'Scraping listing {idx}/{len(listing_urls)}...'
-
-                listing_data = scraper.scrape_listing(url)
-                # Retry once if no data (page load or selector timing)
-                if (not listing_data or (not listing_data.get('listing_id') and not listing_data.get('url'))):
-                    time.sleep(1.5)
-                    listing_data = scraper.scrape_listing(url)
-                if not listing_data or (not listing_data.get('listing_id') and not listing_data.get('url')):
-                    print(f"  Skipping listing - no data extracted: {url}")
-                    continue
-                lid = str(listing_data.get('listing_id') or '')
-                url_norm = (listing_data.get('url') or '').strip().rstrip('/')
-                if lid in existing_ids or url_norm in existing_urls:
-                    skipped_dupes += 1
-                    continue
-                all_listings.append(listing_data)
-                if lid:
-                    existing_ids.add(lid)
-                if url_norm:
-                    existing_urls.add(url_norm)
-
-            if all_listings or skipped_dupes:
-                scraping_status['current_listing'] = 'Saving to saved listings...'
+            sink = listing_store.SQLiteListingSink(LISTINGS_DB, batch_size=5, flush_interval=2.0)
+
+            def _mark_flushed_done(batch):
+                for L in batch:
+                    frontier.mark_done(L['url'])
+                    _publish(status, 'lead', _lead_summary(L))
+
+            sink.on_flush = _mark_flushed_done
+
+            def _retry_wait(delay):
+                status['current_listing'] = f'Retrying failed listings in {delay:.0f}s...'
+                cancel_token.sleep(delay)
+
+            try:
+                # Failed listings do not hold up the main pass: they are retried at the end of the job,
+                # in rounds with exponential backoff, until they run out of attempts
+                for url, retry_round in claim_with_retries(frontier, _retry_wait):
+                    if _stop_requested(status):
+                        break
+                    if retry_round:
+                        idx = status['progress']
+                        status['current_listing'] = f'Retrying failed listing (round {retry_round})...'
+                    else:
+                        status['progress'] += 1
+                        idx = status['progress']
+                        status['current_listing'] = f'Scraping listing {idx}/{total}...'
+
+                    if hasattr(scraper, 'prefetch'):
+                        # Next listings load in background tabs while this one is extracted
+                        scraper.prefetch(frontier.peek_pending(scraper.prefetch_tabs - 1))
+                    error = None
+                    try:
+                        listing_data = scraper.scrape_listing(url)
+                    except Exception as e:
+                        # One broken listing (or browser) fails this URL, not the job; it is retried later
+                        listing_data, error = {}, str(e) or type(e).__name__
+                    if not retry_round and idx % 10 == 0 and hasattr(scraper, 'browser_metrics'):
+                        _publish(status, 'browser', scraper.browser_metrics())
+                    if not listing_data or (not listing_data.get('listing_id') and not listing_data.get('url')):
+                        error = error or getattr(scraper, 'last_error', None) or 'no data extracted'
+                        print(f"  Skipping listing for now - {error}: {url}")
+                        frontier.mark_failed(url, error)
+                        _publish(status, 'listing', {'url': url, 'result': 'failed', 'progress': idx, 'total': total})
+                        continue
+                    listing_data['url'] = url
+                    lid = str(listing_data.get('listing_id') or '')
+                    url_norm = url.strip().rstrip('/')
+                    if lid in existing_ids or url_norm in existing_urls:
+                        skipped_dupes += 1
+                        frontier.mark_done(url)
+                        _publish(status, 'listing', {'url': url, 'listing_id': lid, 'result': 'duplicate',
+                                                     'progress': idx, 'total': total})
+                        continue
+                    sink.write(listing_data)
+                    _publish(status, 'listing', {'url': url, 'listing_id': lid, 'result': 'new',
+                                                 'progress': idx, 'total': total})
+                    status['saved'] = sink.count
+                    if lid:
+                        existing_ids.add(lid)
+                    if url_norm:
+                        existing_urls.add(url_norm)
+            except ScrapeCancelled:
+                # The interrupted URL stays in_progress; the next run of this job requeues it
+                print("Scraping stopped: flushing listings scraped so far")
+            finally:
                 try:
-                    merged, added, skipped_merge = merge_saved_listings(all_listings)
-                    save_saved_listings(merged)
-                    scraper.save_to_json(merged, "listings.json")
-                    scraper.save_to_csv(merged, "listings.csv")
-                    scraping_status['current_listing'] = f'Completed! New: {added}, duplicates skipped: {skipped_dupes + skipped_merge}'
+                    sink.close()
                 except Exception as e:
-                    scraping_status['error'] = f"Failed to save data: {str(e)}"
-                scraping_status['progress'] = len(listing_urls)
+                    status['error'] = f"Failed to save data: {str(e)}"
+
+            skipped_dupes += frontier.skipped  # already scraped by another partition of a fan-out crawl
+            if sink.count or skipped_dupes:
+                status['current_listing'] = f'Completed! New: {sink.count}, duplicates skipped: {skipped_dupes}'
+                status['progress'] = total
             else:
                 if listing_urls:
-                    scraping_status['error'] = f"Found {len(listing_urls)} listing URLs but no new data saved (duplicates or no match)."
+                    status['error'] = f"Found {len(listing_urls)} listing URLs but no new data saved (duplicates or no match)."
                 else:
-                    scraping_status['error'] = f"No listing URLs found. The website structure may have changed or the category URL is invalid: {category_url}"
+                    status['error'] = f"No listing URLs found. The website structure may have changed or the category URL is invalid: {category_url}"
         finally:
-            try:
-                scraper.close()
-            except:
-                pass
+            # Warm browsers go back to the pool for the next job (closed if the pool is full or disabled)
+            browser_pool.release(scraper)
             
     except Exception as e:
-        scraping_status['error'] = str(e)
+        status['error'] = str(e)
         import traceback
         error_trace = traceback.format_exc()
-        scraping_status['error'] = error_trace[:1000]  # Limit error length but show more
+        status['error'] = error_trace[:1000]  # Limit error length but show more
         print(f"Scraping error: {error_trace}")
     finally:
-        scraping_status['is_running'] = False
-        scraping_status['current_listing'] = 'Finished'
+        cancel_token.close()
+        status['is_running'] = False
+        status['current_listing'] = 'Finished'
+
+def _run_queued_job(job, shutdown=None):
+    """Run one claimed job from the queue and record its terminal state (requeued if the worker shuts down)."""
+    status = JobStatus(job_queue, job['job_id'], stop_event=shutdown)
+    options = json.loads(job.get('options') or '{}')
+    run_scraper(job['max_listings'], job['category_url'], job_name=job['job_name'], status=status,
+                dedup_prefix=options.get('dedup_prefix'), profile=options.get('profile'))
+    if shutdown is not None and shutdown.is_set() and not job_queue.is_cancel_requested(job['job_id']):
+        job_queue.requeue(job['job_id'], 'Requeued: worker shutting down')
+    elif status.cancel_requested():
+        job_queue.finish(job['job_id'], CANCELLED, "Scraping stopped by user.")
+    elif status.get('error') and not status.get('saved'):
+        job_queue.finish(job['job_id'], FAILED)
+    else:
+        job_queue.finish(job['job_id'], COMPLETED)
+
+
+job_dispatcher = JobDispatcher(job_queue, _run_queued_job)
+
+# Live progress stream: DB check interval, max stream length before the client reconnects, client retry delay
+SSE_POLL_SECONDS = 0.5
+SSE_STREAM_SECONDS = int(os.environ.get('HARAJ_SSE_STREAM_SECONDS', '55') or 55)
+SSE_RETRY_MS = 2000
+
 
 @app.route('/api/start-scraping', methods=['POST'])
 def start_scraping():
-    """Start scraping listings. When prompt is provided, resolve best category from prompt (OpenAI or keyword fallback)."""
-    global scraping_status
-    
-    if scraping_status['is_running']:
-        return jsonify({'error': 'Scraping is already running'}), 400
-    
+    """Queue a scrape job; up to HARAJ_SCRAPE_CONCURRENCY jobs run at once (across all workers)."""
     try:
         data = request.get_json() or {}
         max_listings = int(data.get('max_listings', 10))
@@ -773,18 +820,121 @@ def start_scraping():
             category_url = HARAJ_BASE + quote('حراج السيارات')
         if max_listings < 1 or max_listings > 500:
             return jsonify({'error': 'Number of listings must be between 1 and 500'}), 400
-
-        thread = threading.Thread(target=run_scraper, args=(max_listings, category_url))
-        thread.daemon = True
-        thread.start()
-        return jsonify({
+        profile = data.get('profile') or DEFAULT_PROFILE
+        if profile not in PROFILES:
+            return jsonify({'error': f"Unknown profile (choose from {', '.join(PROFILES)})"}), 400
+        job_name = (data.get('job_name') or '').strip() or f'dashboard:{category_url}'
+        job = job_queue.enqueue(category_url, max_listings, job_name=job_name, options=json.dumps({'profile': profile}),
+                                unique=True)
+        if job is None:
+            return jsonify({'error': 'Scraping is already running for this category'}), 400
+        response = {
             'status': 'started',
+            'job_id': job['job_id'],
             'message': f'Scraping started for {max_listings} listings from Haraj',
             'category_used': category_url,
-        })
+        }
+        if SCRAPE_MODE == 'worker':
+            if not job_queue.live_workers():
+                response['warning'] = 'No scrape worker is running; the job will start when one connects (python scrape_worker.py).'
+        else:
+            job_dispatcher.start()
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': f'Failed to start scraping: {str(e)}'}), 500
 
+def plan_fanout(category_ids=None, cities=None, include_categories=True):
+    """
+    Partitions of a fan-out crawl: one per category (all of HARAJ_CATEGORIES by default) and,
+    optionally, one per city page. Returns [{'partition', 'url'}]; categories sharing a tag are merged.
+    """
+    partitions = []
+    seen_urls = set()
+    if include_categories:
+        for c in get_categories_with_urls():
+            if category_ids and c['id'] not in category_ids:
+                continue
+            if c['url'] not in seen_urls:
+                seen_urls.add(c['url'])
+                partitions.append({'partition': c['id'], 'url': c['url']})
+    for city in cities or []:
+        url = f"{HARAJ_SITE}/city/{quote(city)}"
+        if url not in seen_urls:
+            seen_urls.add(url)
+            partitions.append({'partition': f'city-{city}', 'url': url})
+    return partitions
+
+
+def _fanout_status(group_id):
+    """Aggregate status of all partition jobs of one fan-out crawl."""
+    statuses = [job_to_status(j) for j in job_queue.jobs_with_prefix(f'fanout:{group_id}/')]
+    return {
+        'group_id': group_id,
+        'is_running': any(s['is_running'] for s in statuses),
+        'partitions': len(statuses),
+        'progress': sum(s['progress'] for s in statuses),
+        'total': sum(s['total'] for s in statuses),
+        'saved': sum(s['saved'] for s in statuses),
+        'states': {state: sum(1 for s in statuses if s['state'] == state) for state in {s['state'] for s in statuses}},
+        'jobs': statuses,
+    }
+
+
+@app.route('/api/start-fanout', methods=['POST'])
+def start_fanout():
+    """
+    Queue a full-site refresh split into partitions (categories, optionally cities) that run in parallel
+    up to HARAJ_SCRAPE_CONCURRENCY browsers, within the shared HARAJ_RATE_PER_MINUTE budget.
+    Body: {"categories": [ids] (default all), "cities": [names] or true for HARAJ_CITIES,
+           "cities_only": bool, "per_partition": listings quota per partition (default 20),
+           "profile": extraction profile (default HARAJ_PROFILE or full)}.
+    Listings found in several partitions are scraped once.
+    """
+    try:
+        data = request.get_json() or {}
+        per_partition = int(data.get('per_partition', 20))
+        if per_partition < 1 or per_partition > 500:
+            return jsonify({'error': 'per_partition must be between 1 and 500'}), 400
+        profile = data.get('profile') or DEFAULT_PROFILE
+        if profile not in PROFILES:
+            return jsonify({'error': f"Unknown profile (choose from {', '.join(PROFILES)})"}), 400
+        cities = data.get('cities') or []
+        if cities is True:
+            cities = HARAJ_CITIES
+        partitions = plan_fanout(data.get('categories') or None, cities, include_categories=not data.get('cities_only'))
+        if not partitions:
+            return jsonify({'error': 'No partitions selected'}), 400
+
+        group_id = uuid.uuid4().hex[:8]
+        prefix = f'fanout:{group_id}/'
+        options = json.dumps({'group': group_id, 'dedup_prefix': prefix, 'profile': profile})
+        jobs = [
+            job_queue.enqueue(p['url'], per_partition, job_name=prefix + p['partition'], options=options)
+            for p in partitions
+        ]
+        if SCRAPE_MODE != 'worker':
+            job_dispatcher.start()
+        return jsonify({
+            'status': 'started',
+            'group_id': group_id,
+            'partitions': len(jobs),
+            'parallel': SCRAPE_CONCURRENCY,
+            'job_ids': [j['job_id'] for j in jobs],
+            'message': f'Fan-out crawl queued: {len(jobs)} partitions x {per_partition} listings',
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to start fan-out crawl: {str(e)}'}), 500
+
+
+@app.route('/api/fanout/<group_id>')
+def fanout_status_api(group_id):
+    """Combined progress of a fan-out crawl"""
+    status = _fanout_status(group_id)
+    if not status['partitions']:
+        return jsonify({'error': 'Fan-out crawl not found'}), 404
+    return jsonify(status)
+
+
 @app.route('/api/estimate-time', methods=['GET'])
 def estimate_time_api():
     """Estimate scrape time for given max_listings and login state (for big batches: 200, 300, 500)."""
@@ -819,17 +969,108 @@ def estimate_time_api():
 
 @app.route('/api/scraping-status')
 def scraping_status_api():
-    """Get current scraping status"""
-    return jsonify(scraping_status)
+    """Get status of one job (?job_id=) or, by default, of the most relevant job plus all active jobs"""
+    # Pick up jobs left queued by a restarted worker
+    if SCRAPE_MODE != 'worker':
+        job_dispatcher.start()
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = job_queue.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job_to_status(job))
+    active = job_queue.list_jobs(limit=50, states=('running', 'queued'))
+    latest = active[0] if active else next(iter(job_queue.list_jobs(limit=1)), None)
+    status = job_to_status(latest)
+    status['jobs'] = [job_to_status(j) for j in active]
+    return jsonify(status)
+
+def _sse(event, data, event_id=None):
+    """Format one Server-Sent Event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+@app.route('/api/scraping-events')
+def scraping_events_api():
+    """
+    Server-Sent Events stream of job progress, per-listing results and new leads (?job_id= for one job).
+    Resumes after the Last-Event-ID header (or ?last_event_id=). Streams are closed after
+    SSE_STREAM_SECONDS so sync gunicorn workers are not held; EventSource reconnects and resumes.
+    """
+    if SCRAPE_MODE != 'worker':
+        job_dispatcher.start()
+    job_id = request.args.get('job_id') or None
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id not in (None, '') else None
+    except ValueError:
+        last_id = None
+
+    def _snapshot():
+        job = job_queue.get(job_id) if job_id else None
+        if job is None and not job_id:
+            active = job_queue.list_jobs(limit=1, states=('running', 'queued'))
+            job = active[0] if active else next(iter(job_queue.list_jobs(limit=1)), None)
+        return job_to_status(job)
+
+    def _stream():
+        nonlocal last_id
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        oldest = job_queue.events_since(0, limit=1)
+        # New client, or resuming from before the retained history: start from the current state
+        if last_id is None or (oldest and oldest[0]['event_id'] > last_id + 1):
+            last_id = job_queue.last_event_id()
+            snapshot = _snapshot()
+            yield _sse('snapshot', snapshot, last_id)
+            if job_id and snapshot.get('state') in (COMPLETED, FAILED, CANCELLED):
+                return
+        deadline = time.time() + SSE_STREAM_SECONDS
+        last_sent = time.time()
+        while time.time() < deadline:
+            events = job_queue.events_since(last_id, job_id)
+            for ev in events:
+                last_id = ev['event_id']
+                data = ev['data']
+                data.setdefault('job_id', ev['job_id'])
+                yield _sse(ev['event'], data, last_id)
+            if events:
+                last_sent = time.time()
+                if job_id and events[-1]['event'] == 'job' and events[-1]['data'].get('state') in (
+                        COMPLETED, FAILED, CANCELLED):
+                    return
+            elif time.time() - last_sent > 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            time.sleep(SSE_POLL_SECONDS)
+
+    response = app.response_class(_stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/jobs')
+def api_jobs():
+    """Recent scrape jobs with their status"""
+    limit = max(1, min(200, int(request.args.get('limit', 20))))
+    return jsonify([job_to_status(j) for j in job_queue.list_jobs(limit=limit)])
+
+@app.route('/api/workers')
+def api_workers():
+    """Scraping worker processes with a recent heartbeat"""
+    return jsonify({'mode': SCRAPE_MODE, 'workers': job_queue.live_workers()})
 
 @app.route('/api/stop-scraping', methods=['POST'])
 def stop_scraping():
-    """Stop scraping (if possible)"""
-    global scraping_status
-    # Note: This is a simple implementation. For full control, you'd need process management
-    scraping_status['is_running'] = False
-    scraping_status['error'] = "Scraping stopped by user (may take a moment to fully halt current task)."
-    return jsonify({'message': 'Scraping stop requested', 'status': scraping_status})
+    """Stop one job ({"job_id": ...}) or all active jobs; running jobs halt at their next checkpoint"""
+    data = request.get_json(silent=True) or {}
+    job_id = data.get('job_id') or request.args.get('job_id')
+    job_queue.request_cancel(job_id)
+    status = job_to_status(job_queue.get(job_id)) if job_id else {'is_running': False}
+    status['error'] = "Scraping stopped by user (may take a moment to fully halt current task)."
+    return jsonify({'message': 'Scraping stop requested', 'status': status})
 
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
@@ -892,5 +1133,8 @@ if __name__ == '__main__':
     print("\nMake sure you have scraped some listings first!")
     print("Run: python haraj_scraper_selenium.py --category <URL> --max-listings 20")
     print("=" * 70 + "\n")
+    if SCRAPE_MODE != 'worker' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Only in the reloader's serving process, not in the file watcher
+        warm_browsers()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
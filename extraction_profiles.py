@@ -0,0 +1,46 @@
+"""
+Extraction profiles: which listing fields a scrape extracts.
+Each step below is one extraction step of the scrapers (its DOM/driver lookups and waits, the contact
+modal, image downloads). A profile names the steps a job needs; the others are skipped and their
+fields left empty, so narrow jobs (lead export) do not pay for images, tags or posted time.
+"""
+
+import os
+from typing import Dict, FrozenSet
+
+EXTRACTION_STEPS = ('title', 'description', 'price', 'city', 'posted_time', 'seller', 'tags', 'images', 'contact')
+
+PROFILES = {
+    # Lead export: who sells what for how much, and their phone (seller_url keys the contact cache)
+    'leads': ('title', 'price', 'city', 'seller', 'contact'),
+    # Listing catalog without the contact modal
+    'catalog': ('title', 'description', 'price', 'city', 'posted_time', 'seller', 'tags', 'images'),
+    'full': EXTRACTION_STEPS,
+}
+DEFAULT_PROFILE = os.environ.get('HARAJ_PROFILE') if os.environ.get('HARAJ_PROFILE') in PROFILES else 'full'
+
+# Listing fields filled by each step (steps not listed fill the field of the same name)
+STEP_FIELDS = {
+    'city': ('city', 'location'),
+    'seller': ('seller_name', 'seller_url'),
+    'tags': ('tags', 'category'),
+    'contact': ('contact_info',),
+}
+
+
+def profile_steps(profile: str) -> FrozenSet[str]:
+    """Extraction steps of a profile; ValueError for unknown names."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown extraction profile {profile!r} (choose from {', '.join(PROFILES)})")
+    return frozenset(PROFILES[profile])
+
+
+def trim_listing(listing: Dict, steps: FrozenSet[str]) -> Dict:
+    """Empty the fields of steps outside the profile (keys stay, so exports keep their columns)."""
+    for step in EXTRACTION_STEPS:
+        if step in steps:
+            continue
+        for field in STEP_FIELDS.get(step, (step,)):
+            if field in listing:
+                listing[field] = type(listing[field])() if isinstance(listing[field], (list, dict)) else ''
+    return listing
@@ -4,7 +4,7 @@ Extracts listing data including description, details, contact info, and images
 """
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString
 import json
 import os
 import re
@@ -13,20 +13,308 @@ import time
 from typing import Dict, List, Optional
 import csv
 from pathlib import Path
+from listing_store import ListingSink, SINK_TYPES, open_sinks
+from cancellation import CancelToken, ScrapeCancelled
+from rate_limit import AdaptiveRateController, looks_like_challenge, shared_budget_from_env
+from listing_pipeline import ListingPipeline
+from html_parsing import (DEFAULT_PARSER, PAGE_ENCODING, PARSER_BACKENDS, all_strings, check_backend,
+                          make_soup, make_tree, node_text, page_text)
+from structured_data import apply_structured_fields, script_from_tag, scripts_from_tree, structured_listing_fields
+from extraction_profiles import DEFAULT_PROFILE, PROFILES, profile_steps, trim_listing
+import functools
 import random
+import signal
 import sys
 
 
+BASE_URL = "https://haraj.com.sa"
+
+
+def extract_listing_id(url: str) -> Optional[str]:
+    """Extract listing ID from URL"""
+    # URL format: https://haraj.com.sa/11173528712/هيلكس_غمارتين/
+    match = re.search(r'/(\d+)/', url)
+    return match.group(1) if match else None
+
+
+PRICE_PATTERNS = (
+    re.compile(r'\d+.*ريال|ريال.*\d+', re.IGNORECASE),
+    re.compile(r'\d+.*ر\.س|ر\.س.*\d+', re.IGNORECASE),
+)
+TIME_PATTERN = re.compile(r'الآن|منذ|ago|قبل', re.IGNORECASE)
+CONTACT_PATTERN = re.compile(r'تواصل|اتصل|مراسلة|contact', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'(\+966|05|5)[\d\s-]{8,}')
+IMAGE_EXCLUDES = ('icon', 'logo', 'badge', 'avatar')
+CITY_HREF = re.compile(r'/city/')
+SELLER_HREF = re.compile(r'/users/')
+TAG_HREF = re.compile(r'/tags/')
+# String types get_text() keeps (not comments, doctype, script/style/template text)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+
+def extract_listing_details(soup: BeautifulSoup, url: str, base_url: str = BASE_URL) -> Dict:
+    """
+    Extract all details from a listing page.
+    One walk over the tree: each element and string is visited once and dispatched to the precompiled
+    matchers above; the text of the elements a field needs (h1, article, city/seller/tag links) is
+    collected on the way instead of searching the tree again per field.
+    Fields found in the page's JSON-LD / app state (see structured_data) replace the DOM values.
+    """
+    listing_data = {
+        'url': url,
+        'listing_id': extract_listing_id(url),
+        'title': '',
+        'description': '',
+        'price': '',
+        'location': '',
+        'city': '',
+        'posted_time': '',
+        'seller_name': '',
+        'seller_url': '',
+        'category': '',
+        'tags': [],
+        'images': [],
+        'contact_info': {},
+        'raw_html': str(soup) if soup else ''
+    }
+    
+    if not soup:
+        return listing_data
+    
+    title = description = city = seller = None  # text parts of the first h1/article/city link/seller link
+    seller_href = ''
+    tags = []
+    images = []
+    prices = [None] * len(PRICE_PATTERNS)  # first string matching each price pattern
+    posted_time = None
+    has_contact = False
+    page_text = []
+    scripts = []
+    
+    collecting = []  # text-part lists of the open elements whose text is needed
+    stack = [(iter(soup.contents), 0)]
+    while stack:
+        node = next(stack[-1][0], None)
+        if node is None:
+            del collecting[stack.pop()[1]:]
+            continue
+        
+        if isinstance(node, NavigableString):
+            # soup.find(string=...) matched any kind of string, get_text() keeps plain text only
+            if type(node) in TEXT_STRING_TYPES:
+                page_text.append(node)
+                piece = node.strip()
+                if piece:
+                    for parts in collecting:
+                        parts.append(piece)
+            for i, pattern in enumerate(PRICE_PATTERNS):
+                if prices[i] is None and pattern.search(node):
+                    prices[i] = node
+            if posted_time is None and TIME_PATTERN.search(node):
+                posted_time = node
+            if not has_contact and CONTACT_PATTERN.search(node):
+                has_contact = True
+            continue
+        
+        depth = len(collecting)
+        name = node.name
+        if name == 'h1' and title is None:
+            title = []
+            collecting.append(title)
+        elif name == 'article' and description is None:
+            description = []
+            collecting.append(description)
+        elif name == 'a':
+            href = node.get('href')
+            if href is not None:
+                if city is None and CITY_HREF.search(href):
+                    city = []
+                    collecting.append(city)
+                if seller is None and SELLER_HREF.search(href):
+                    seller = []
+                    seller_href = href
+                    collecting.append(seller)
+                if TAG_HREF.search(href):
+                    tags.append([])
+                    collecting.append(tags[-1])
+        elif name == 'img':
+            src = node.get('src') or node.get('data-src') or node.get('data-lazy-src')
+            # Filter out icons, logos, and small images
+            if src and not any(exclude in src.lower() for exclude in IMAGE_EXCLUDES):
+                images.append(urljoin(base_url, src))
+        elif name == 'script':
+            scripts.append(script_from_tag(node))
+        stack.append((iter(node.contents), depth))
+    
+    if title is not None:
+        listing_data['title'] = ''.join(title)
+    if description is not None:
+        listing_data['description'] = ''.join(description)
+    
+    # Price: first string with an amount in ريال, else in ر.س
+    for price_text in prices:
+        if price_text:
+            listing_data['price'] = price_text.strip()
+            break
+    
+    if city is not None:
+        listing_data['city'] = ''.join(city)
+        listing_data['location'] = listing_data['city']
+    
+    if posted_time is not None:
+        listing_data['posted_time'] = posted_time.strip()
+    
+    if seller is not None:
+        listing_data['seller_name'] = ''.join(seller)
+        listing_data['seller_url'] = urljoin(base_url, seller_href)
+    
+    listing_data['tags'] = [text for text in (''.join(parts) for parts in tags) if text]
+    if listing_data['tags']:
+        listing_data['category'] = listing_data['tags'][0]
+    
+    # Remove duplicates while preserving order
+    listing_data['images'] = list(dict.fromkeys(images))
+    
+    # Contact button and phone numbers in the page text (Saudi format)
+    if has_contact:
+        listing_data['contact_info']['has_contact_button'] = True
+    phone_matches = PHONE_PATTERN.findall(''.join(page_text))
+    if phone_matches:
+        listing_data['contact_info']['phone_numbers'] = list(set(phone_matches))
+    
+    return apply_structured_fields(listing_data, structured_listing_fields(scripts, listing_data['listing_id'], base_url))
+
+
+def _first_match(pattern, strings: List[str]) -> Optional[str]:
+    return next((s for s in strings if pattern.search(s)), None)
+
+
+def extract_listing_details_lxml(tree, url: str, base_url: str = BASE_URL, raw_html: str = '') -> Dict:
+    """
+    extract_listing_details on an lxml tree (see html_parsing.make_tree), using XPath instead of
+    BeautifulSoup searches. Same fields and rules (structured data included); raw_html is the decoded
+    page as fetched.
+    """
+    listing_data = {
+        'url': url,
+        'listing_id': extract_listing_id(url),
+        'title': '',
+        'description': '',
+        'price': '',
+        'location': '',
+        'city': '',
+        'posted_time': '',
+        'seller_name': '',
+        'seller_url': '',
+        'category': '',
+        'tags': [],
+        'images': [],
+        'contact_info': {},
+        'raw_html': raw_html if tree is not None else ''
+    }
+
+    if tree is None:
+        return listing_data
+
+    title_elems = tree.xpath('(//h1)[1]')
+    if title_elems:
+        listing_data['title'] = node_text(title_elems[0])
+
+    articles = tree.xpath('(//article)[1]')
+    if articles:
+        listing_data['description'] = node_text(articles[0])
+
+    strings = all_strings(tree)
+    for pattern in PRICE_PATTERNS:
+        price_text = _first_match(pattern, strings)
+        if price_text:
+            listing_data['price'] = price_text.strip()
+            break
+
+    city_links = tree.xpath("//a[contains(@href, '/city/')]")
+    if city_links:
+        listing_data['city'] = node_text(city_links[0])
+        listing_data['location'] = listing_data['city']
+
+    posted = _first_match(TIME_PATTERN, strings)
+    if posted is not None:
+        listing_data['posted_time'] = posted.strip()
+
+    seller_links = tree.xpath("//a[contains(@href, '/users/')]")
+    if seller_links:
+        listing_data['seller_name'] = node_text(seller_links[0])
+        listing_data['seller_url'] = urljoin(base_url, seller_links[0].get('href', ''))
+
+    tags = [text for text in (node_text(a) for a in tree.xpath("//a[contains(@href, '/tags/')]")) if text]
+    listing_data['tags'] = tags
+    if tags:
+        listing_data['category'] = tags[0]
+
+    images = []
+    for img in tree.xpath('//img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+        if src and not any(exclude in src.lower() for exclude in IMAGE_EXCLUDES):
+            images.append(urljoin(base_url, src))
+    listing_data['images'] = list(dict.fromkeys(images))
+
+    if _first_match(CONTACT_PATTERN, strings) is not None:
+        listing_data['contact_info']['has_contact_button'] = True
+
+    phone_matches = PHONE_PATTERN.findall(page_text(tree))
+    if phone_matches:
+        listing_data['contact_info']['phone_numbers'] = list(set(phone_matches))
+
+    return apply_structured_fields(
+        listing_data, structured_listing_fields(scripts_from_tree(tree), listing_data['listing_id'], base_url)
+    )
+
+
+def parse_listing_html(html: bytes, url: str, backend: str = DEFAULT_PARSER, steps=None,
+                       keep_raw_html: bool = True) -> Dict:
+    """
+    Parse raw page bytes into listing data with the given parser backend (see html_parsing).
+    A top-level function so the parse stage of listing_pipeline can run it in a ProcessPoolExecutor.
+    steps: extraction steps of the profile (extraction_profiles); fields of other steps are left empty.
+    keep_raw_html: False drops the decoded page (raw_html), e.g. so it is not sent back from a worker process.
+    """
+    if check_backend(backend) == 'lxml':
+        raw_html = html.decode(PAGE_ENCODING, 'replace') if keep_raw_html else ''
+        listing_data = extract_listing_details_lxml(make_tree(html), url, raw_html=raw_html)
+    else:
+        listing_data = extract_listing_details(make_soup(html, backend), url)
+    if not keep_raw_html:
+        listing_data.pop('raw_html', None)
+    return trim_listing(listing_data, steps) if steps is not None else listing_data
+
+
 class HarajScraper:
-    def __init__(self, output_dir: str = "scraped_data", download_images: bool = True):
+    def __init__(self, output_dir: str = "scraped_data", download_images: bool = True,
+                 cancel_token: Optional[CancelToken] = None,
+                 rate_controller: Optional[AdaptiveRateController] = None, rate_budget=None,
+                 parser: str = DEFAULT_PARSER, profile: str = DEFAULT_PROFILE):
         """
         Initialize the Haraj scraper
         
         Args:
             output_dir: Directory to save scraped data and images
             download_images: Whether to download images
+            cancel_token: Optional CancelToken; cancelling it interrupts the delays between requests
+            rate_controller: Pacing between requests (default: adaptive 2-30s, ToS minimum of 2s)
+            rate_budget: SharedRateBudget each page request waits on (default: host-wide
+                budget from HARAJ_RATE_PER_MINUTE, if set)
+            parser: HTML parser backend, one of html_parsing.PARSER_BACKENDS (default: HARAJ_PARSER or lxml)
+            profile: Extraction profile (extraction_profiles.PROFILES); e.g. 'leads' skips images and
+                their downloads (default: HARAJ_PROFILE or full)
         """
-        self.base_url = "https://haraj.com.sa"
+        self.base_url = BASE_URL
+        self.parser = check_backend(parser)
+        self.profile = profile
+        self.steps = profile_steps(profile)
+        self.cancel_token = cancel_token or CancelToken()
+        self.rate_budget = rate_budget if rate_budget is not None else shared_budget_from_env()
+        self.rate_controller = rate_controller or AdaptiveRateController(
+            min_delay=2, max_delay=30, initial_delay=3.5, latency_target=5
+        )
         self.output_dir = Path(output_dir)
         self.images_dir = self.output_dir / "images"
         self.download_images = download_images
@@ -53,6 +341,10 @@ class HarajScraper:
         self.listing_count = 0
         self.last_rotation = 0
     
+    def _sleep(self, seconds: float):
+        """Interruptible sleep: raises ScrapeCancelled as soon as the run is stopped."""
+        self.cancel_token.sleep(seconds)
+
     def _update_headers(self):
         """Update session headers with random user agent (ToS compliance)"""
         user_agent = random.choice(self.user_agents)
@@ -84,7 +376,7 @@ class HarajScraper:
             # Extended delay (30-60 seconds) to be respectful
             delay = random.randint(30, 60)
             print(f"  - Extended delay: {delay} seconds")
-            time.sleep(delay)
+            self._sleep(delay)
             
             # Optionally create a new session to clear cookies
             if self.listing_count % 20 == 0:  # Every 20 listings, reset session
@@ -97,127 +389,50 @@ class HarajScraper:
     
     def get_page(self, url: str) -> Optional[BeautifulSoup]:
         """Fetch and parse a page"""
+        html = self.fetch_html(url)
+        return make_soup(html, self.parser) if html is not None else None
+
+    def fetch_html(self, url: str) -> Optional[bytes]:
+        """Fetch a page within the rate budget and report the response to the rate controller; raw bytes or None."""
+        if self.rate_budget is not None:
+            while not self.rate_budget.acquire(timeout=0.25):
+                self.cancel_token.raise_if_cancelled()
+        start = time.time()
+        self.rate_controller.request_started()
         try:
             response = self.session.get(url, timeout=30)
-            response.encoding = 'utf-8'
+        except Exception as e:
+            self.rate_controller.record(latency=time.time() - start, error=True)
+            print(f"Error fetching {url}: {e}")
+            return None
+        try:
+            retry_after = response.headers.get('Retry-After', '')
+            self.rate_controller.record(
+                latency=time.time() - start,
+                status=response.status_code,
+                challenge=response.status_code in (200, 403) and looks_like_challenge(
+                    response.content[:5000].decode('utf-8', 'ignore')),
+                retry_after=float(retry_after) if retry_after.isdigit() else None,
+            )
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return response.content
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             return None
     
     def extract_listing_id(self, url: str) -> Optional[str]:
         """Extract listing ID from URL"""
-        # URL format: https://haraj.com.sa/11173528712/هيلكس_غمارتين/
-        match = re.search(r'/(\d+)/', url)
-        return match.group(1) if match else None
+        return extract_listing_id(url)
     
     def extract_listing_details(self, soup: BeautifulSoup, url: str) -> Dict:
         """Extract all details from a listing page"""
-        listing_data = {
-            'url': url,
-            'listing_id': self.extract_listing_id(url),
-            'title': '',
-            'description': '',
-            'price': '',
-            'location': '',
-            'city': '',
-            'posted_time': '',
-            'seller_name': '',
-            'seller_url': '',
-            'category': '',
-            'tags': [],
-            'images': [],
-            'contact_info': {},
-            'raw_html': str(soup) if soup else ''
-        }
-        
-        if not soup:
-            return listing_data
-        
-        # Extract title
-        title_elem = soup.find('h1')
-        if title_elem:
-            listing_data['title'] = title_elem.get_text(strip=True)
-        
-        # Extract description/article content
-        article = soup.find('article')
-        if article:
-            listing_data['description'] = article.get_text(strip=True)
-        
-        # Extract price (look for price indicators)
-        price_patterns = [
-            soup.find(string=re.compile(r'\d+.*ريال|ريال.*\d+', re.IGNORECASE)),
-            soup.find(string=re.compile(r'\d+.*ر\.س|ر\.س.*\d+', re.IGNORECASE)),
-        ]
-        for pattern in price_patterns:
-            if pattern:
-                price_text = pattern.strip()
-                listing_data['price'] = price_text
-                break
-        
-        # Extract location/city
-        city_links = soup.find_all('a', href=re.compile(r'/city/'))
-        if city_links:
-            listing_data['city'] = city_links[0].get_text(strip=True)
-            listing_data['location'] = listing_data['city']
-        
-        # Extract posted time
-        time_indicators = soup.find_all(string=re.compile(r'الآن|منذ|ago|قبل', re.IGNORECASE))
-        if time_indicators:
-            listing_data['posted_time'] = time_indicators[0].strip()
-        
-        # Extract seller information
-        seller_link = soup.find('a', href=re.compile(r'/users/'))
-        if seller_link:
-            listing_data['seller_name'] = seller_link.get_text(strip=True)
-            listing_data['seller_url'] = urljoin(self.base_url, seller_link.get('href', ''))
-        
-        # Extract category and tags
-        breadcrumb_links = soup.find_all('a', href=re.compile(r'/tags/'))
-        tags = []
-        for link in breadcrumb_links:
-            tag_text = link.get_text(strip=True)
-            if tag_text:
-                tags.append(tag_text)
-        listing_data['tags'] = tags
-        if tags:
-            listing_data['category'] = tags[0] if tags else ''
-        
-        # Extract images
-        images = []
-        img_tags = soup.find_all('img')
-        for img in img_tags:
-            src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-            if src:
-                # Filter out icons, logos, and small images
-                if any(exclude in src.lower() for exclude in ['icon', 'logo', 'badge', 'avatar']):
-                    continue
-                # Make absolute URL
-                img_url = urljoin(self.base_url, src)
-                images.append(img_url)
-        
-        # Remove duplicates while preserving order
-        listing_data['images'] = list(dict.fromkeys(images))
-        
-        # Try to extract contact information
-        # Look for contact buttons or phone number patterns
-        contact_button = soup.find(string=re.compile(r'تواصل|اتصل|مراسلة|contact', re.IGNORECASE))
-        if contact_button:
-            listing_data['contact_info']['has_contact_button'] = True
-        
-        # Look for phone numbers in text (Saudi format)
-        phone_pattern = re.compile(r'(\+966|05|5)[\d\s-]{8,}')
-        phone_matches = phone_pattern.findall(soup.get_text())
-        if phone_matches:
-            listing_data['contact_info']['phone_numbers'] = list(set(phone_matches))
-        
-        return listing_data
+        return extract_listing_details(soup, url, self.base_url)
     
-    def download_image(self, img_url: str, listing_id: str, index: int) -> Optional[str]:
-        """Download an image and return local path"""
+    def download_image(self, img_url: str, listing_id: str, index: int,
+                       session: Optional[requests.Session] = None) -> Optional[str]:
+        """Download an image (over session, default self.session) and return local path"""
         try:
-            response = self.session.get(img_url, timeout=30, stream=True)
+            response = (session or self.session).get(img_url, timeout=30, stream=True)
             response.raise_for_status()
             
             # Determine file extension
@@ -244,44 +459,46 @@ class HarajScraper:
             print(f"Error downloading image {img_url}: {e}")
             return None
     
-    def scrape_listing(self, listing_url: str) -> Dict:
-        """Scrape a single listing"""
+    def fetch_listing(self, listing_url: str) -> Optional[bytes]:
+        """Fetch stage of a listing: ToS measures, adaptive delay, request. Raw HTML bytes or None."""
         # Apply ToS compliance measures every 10 listings
         self._apply_tos_compliance_measures()
         
         print(f"Scraping: {listing_url}")
         
-        # Random delay between 2-5 seconds (ToS compliance)
-        delay = random.uniform(2, 5)
-        time.sleep(delay)
+        # Adaptive delay since the previous request started (never below the 2s ToS minimum; backs off
+        # when the site struggles). Parsing/storing the previous listing already counts towards it.
+        self._sleep(self.rate_controller.time_until_next_request())
         
-        soup = self.get_page(listing_url)
-        if not soup:
-            self.listing_count += 1
-            return {}
-        
-        listing_data = self.extract_listing_details(soup, listing_url)
-        
-        # Download images if enabled
+        html = self.fetch_html(listing_url)
+        self.listing_count += 1
+        return html
+    
+    def download_listing_images(self, listing_data: Dict, session: Optional[requests.Session] = None) -> Dict:
+        """Enrich stage of a listing: download its images if enabled (over session, default self.session)."""
         if self.download_images and listing_data.get('images'):
             downloaded_images = []
             for idx, img_url in enumerate(listing_data['images']):
-                local_path = self.download_image(img_url, listing_data.get('listing_id', 'unknown'), idx)
+                local_path = self.download_image(img_url, listing_data.get('listing_id', 'unknown'), idx, session)
                 if local_path:
                     downloaded_images.append({
                         'url': img_url,
                         'local_path': local_path
                     })
                 # Random delay between image downloads (0.5-1.5 seconds)
-                time.sleep(random.uniform(0.5, 1.5))
+                self._sleep(random.uniform(0.5, 1.5))
             
             listing_data['downloaded_images'] = downloaded_images
-        
-        # Increment counter
-        self.listing_count += 1
-        
         return listing_data
     
+    def scrape_listing(self, listing_url: str) -> Dict:
+        """Scrape a single listing"""
+        html = self.fetch_listing(listing_url)
+        if html is None:
+            return {}
+        listing_data = parse_listing_html(html, listing_url, self.parser, self.steps)
+        return self.download_listing_images(listing_data)
+    
     def find_listing_urls(self, category_url: str, max_pages: int = 10) -> List[str]:
         """Find all listing URLs from a category page"""
         listing_urls = []
@@ -301,8 +518,7 @@ class HarajScraper:
             
             # Apply ToS compliance before fetching page
             if page > 1:
-                delay = random.uniform(3, 6)
-                time.sleep(delay)
+                self._sleep(self.rate_controller.time_until_next_request())
             
             soup = self.get_page(url)
             if not soup:
@@ -326,34 +542,59 @@ class HarajScraper:
             
             listing_urls.extend(page_urls)
             print(f"Found {len(page_urls)} listings on page {page}")
-            
-            # Random delay between pages (2-4 seconds)
-            if page < max_pages:
-                time.sleep(random.uniform(2, 4))
         
         return listing_urls
     
-    def scrape_category(self, category_url: str, max_listings: int = 50, max_pages: int = 10) -> List[Dict]:
-        """Scrape all listings from a category"""
+    def scrape_category(self, category_url: str, max_listings: int = 50, max_pages: int = 10,
+                        sink: Optional[ListingSink] = None, parse_workers: int = 0) -> List[Dict]:
+        """
+        Scrape all listings from a category.
+        With a sink, each listing is persisted as soon as it is scraped and not kept in memory
+        (the returned list is then empty; see sink.count).
+        With parse_workers > 0, listings go through ListingPipeline: the next page is fetched while
+        earlier ones are parsed in that many worker processes and their images downloaded.
+        """
         print(f"Scraping category: {category_url}")
         
-        # Find all listing URLs
-        listing_urls = self.find_listing_urls(category_url, max_pages)
-        listing_urls = listing_urls[:max_listings]  # Limit to max_listings
-        
-        print(f"Found {len(listing_urls)} listings to scrape")
-        
-            # Scrape each listing
         all_listings = []
-        for idx, url in enumerate(listing_urls, 1):
-            print(f"\n[{idx}/{len(listing_urls)}]")
-            listing_data = self.scrape_listing(url)
-            if listing_data:
-                all_listings.append(listing_data)
-            
-            # Additional delay between listings (already handled in scrape_listing, but extra safety)
-            if idx < len(listing_urls):  # Don't delay after last listing
-                time.sleep(random.uniform(1, 3))
+        try:
+            # Find all listing URLs
+            listing_urls = self.find_listing_urls(category_url, max_pages)
+            listing_urls = listing_urls[:max_listings]  # Limit to max_listings
+
+            print(f"Found {len(listing_urls)} listings to scrape")
+
+            if parse_workers > 0:
+                # Images get their own session: the fetch thread resets self.session every 20 listings
+                image_session = requests.Session()
+                image_session.headers.update(self.session.headers)
+                pipeline = ListingPipeline(
+                    fetch=self.fetch_listing,
+                    parse=functools.partial(parse_listing_html, backend=self.parser, steps=self.steps,
+                                            keep_raw_html=False),
+                    enrich=functools.partial(self.download_listing_images, session=image_session),
+                    store=sink.write if sink is not None else all_listings.append,
+                    parse_workers=parse_workers,
+                    cancel_token=self.cancel_token
+                )
+                try:
+                    stats = pipeline.run(listing_urls)
+                finally:
+                    image_session.close()
+                print(f"Pipeline: {stats}")
+                return all_listings
+
+            # Scrape each listing
+            for idx, url in enumerate(listing_urls, 1):
+                print(f"\n[{idx}/{len(listing_urls)}]")
+                listing_data = self.scrape_listing(url)
+                if listing_data:
+                    if sink is not None:
+                        sink.write(listing_data)
+                    else:
+                        all_listings.append(listing_data)
+        except ScrapeCancelled:
+            print("Scraping stopped: returning listings scraped so far")
         
         return all_listings
     
@@ -412,18 +653,43 @@ def main():
     parser.add_argument('--max-pages', type=int, default=10, help='Maximum number of pages to scrape')
     parser.add_argument('--no-images', action='store_true', help='Skip downloading images')
     parser.add_argument('--output-dir', type=str, default='scraped_data', help='Output directory')
+    parser.add_argument('--sink', action='append', choices=sorted(SINK_TYPES),
+                        help='Stream each listing to storage as it is scraped (repeatable: sqlite, jsonl, csv)')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help='HTML parser backend (lxml = direct XPath extraction, fastest)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Parse listings in N worker processes while the next page is fetched (0 = inline)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='Fields to extract: leads (title, price, city, seller, contact), catalog (no contact), full')
     
     args = parser.parse_args()
+
+    # First Ctrl+C stops gracefully (listings scraped so far are saved), a second one aborts
+    cancel_token = CancelToken()
+
+    def _handle_sigint(signum, frame):
+        if cancel_token.cancelled:
+            raise KeyboardInterrupt
+        print("\nStopping... (press Ctrl+C again to abort)")
+        cancel_token.cancel()
+
+    signal.signal(signal.SIGINT, _handle_sigint)
     
     # Initialize scraper
     scraper = HarajScraper(
         output_dir=args.output_dir,
-        download_images=not args.no_images
+        download_images=not args.no_images,
+        cancel_token=cancel_token,
+        parser=args.parser,
+        profile=args.profile
     )
     
     if args.url:
         # Scrape single listing
-        listing_data = scraper.scrape_listing(args.url)
+        try:
+            listing_data = scraper.scrape_listing(args.url)
+        except ScrapeCancelled:
+            listing_data = None
         if listing_data:
             scraper.save_to_json([listing_data], "single_listing.json")
             scraper.save_to_csv([listing_data], "single_listing.csv")
@@ -432,10 +698,23 @@ def main():
     
     elif args.category:
         # Scrape category
+        if args.sink:
+            with open_sinks(args.sink, args.output_dir) as sink:
+                scraper.scrape_category(
+                    args.category,
+                    max_listings=args.max_listings,
+                    max_pages=args.max_pages,
+                    sink=sink,
+                    parse_workers=args.parse_workers
+                )
+            print(f"\nStreamed {sink.count} listings to {', '.join(args.sink)} in {args.output_dir}")
+            return
+        
         listings = scraper.scrape_category(
             args.category,
             max_listings=args.max_listings,
-            max_pages=args.max_pages
+            max_pages=args.max_pages,
+            parse_workers=args.parse_workers
         )
         
         if listings:
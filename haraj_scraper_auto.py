@@ -0,0 +1,337 @@
+"""
+Automatic engine selection between HarajScraper (HTTP) and HarajScraperSelenium (browser).
+Every page type is first tried with the cheap HTTP engine; when the fields a page must yield are
+missing, the page is scraped again in the browser. The outcome is remembered per URL pattern
+(listing pages per category) in the listings DB, so patterns that need JavaScript go straight to the
+browser next time, and the HTTP engine is re-probed now and then in case the site changed.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from cancellation import CancelToken, ScrapeCancelled
+from crawl_frontier import CrawlFrontier, claim_with_retries
+from haraj_scraper import HarajScraper, parse_listing_html
+from contact_cache import DEFAULT_CONTACT_MODE, SellerContactCache
+from extraction_profiles import DEFAULT_PROFILE
+from html_parsing import DEFAULT_PARSER
+from listing_store import ListingSink, connect
+
+HTTP = 'http'
+BROWSER = 'browser'
+
+# Fields a listing page must yield for the HTTP result to count
+REQUIRED_FIELDS = ('title',)
+# HTTP misses (with no successes in between) before a pattern goes straight to the browser
+ESCALATE_AFTER = 2
+# Browser pages of a pattern after which the HTTP engine is tried again
+REPROBE_EVERY = 25
+
+
+def url_pattern(url: str) -> str:
+    """Page type of a Haraj URL: 'listing', 'tags/<tag>', 'city', 'users', 'home' or the first path segment."""
+    parts = [p for p in unquote(urlparse(url).path).split('/') if p]
+    if not parts:
+        return 'home'
+    if re.fullmatch(r'\d+', parts[0]):
+        return 'listing'
+    if parts[0] == 'tags' and len(parts) > 1:
+        return f'tags/{parts[1]}'
+    return parts[0]
+
+
+class EngineChoices:
+    """Per-pattern HTTP/browser outcomes, kept in SQLite so every run and process learns from the others."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = connect(db_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS engine_choices (
+                    pattern TEXT PRIMARY KEY,
+                    http_ok INTEGER NOT NULL DEFAULT 0,
+                    http_missed INTEGER NOT NULL DEFAULT 0,
+                    browser_runs INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _row(self, pattern: str) -> Tuple[int, int, int]:
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute("SELECT http_ok, http_missed, browser_runs FROM engine_choices WHERE pattern = ?",
+                               (pattern,)).fetchone()
+            return row or (0, 0, 0)
+        finally:
+            conn.close()
+
+    def engine_for(self, pattern: str) -> str:
+        """HTTP unless the pattern keeps missing fields over HTTP (then browser, with a periodic HTTP re-probe)."""
+        http_ok, http_missed, browser_runs = self._row(pattern)
+        if http_missed >= ESCALATE_AFTER and browser_runs % REPROBE_EVERY != REPROBE_EVERY - 1:
+            return BROWSER
+        return HTTP
+
+    def record(self, pattern: str, engine: str, ok: bool):
+        """HTTP success resets the miss count (a re-probe that works sends the pattern back to HTTP)."""
+        if engine == HTTP:
+            update = ("http_ok = http_ok + 1, http_missed = 0" if ok
+                      else "http_missed = http_missed + 1, http_ok = 0")
+        else:
+            update = "browser_runs = browser_runs + 1"
+        conn = connect(self.db_path)
+        try:
+            conn.execute("INSERT OR IGNORE INTO engine_choices (pattern) VALUES (?)", (pattern,))
+            conn.execute(f"UPDATE engine_choices SET {update}, updated_at = datetime('now') WHERE pattern = ?",
+                         (pattern,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def summary(self) -> Dict[str, str]:
+        conn = connect(self.db_path)
+        try:
+            patterns = [r[0] for r in conn.execute("SELECT pattern FROM engine_choices ORDER BY pattern")]
+        finally:
+            conn.close()
+        return {p: self.engine_for(p) for p in patterns}
+
+
+class HarajScraperAuto:
+    """
+    Same interface as the two scrapers (find_listing_urls, scrape_listing, scrape_category, close).
+    The browser is only started the first time a page needs it.
+    """
+
+    def __init__(self, output_dir: str = "scraped_data", download_images: bool = True, headless: bool = True,
+                 username: str = None, password: str = None, rate_budget=None,
+                 cancel_token: Optional[CancelToken] = None, parser: str = DEFAULT_PARSER,
+                 db_path=None, required_fields=REQUIRED_FIELDS, contacts: str = DEFAULT_CONTACT_MODE,
+                 profile: str = DEFAULT_PROFILE, session_dir=None, prefetch_tabs: Optional[int] = None):
+        """
+        Args:
+            output_dir, download_images, headless, username, password, rate_budget, cancel_token, parser:
+                as for HarajScraperSelenium (credentials and headless only matter once the browser starts)
+            db_path: SQLite file remembering the engine per URL pattern (default: output_dir/listings.db)
+            required_fields: Listing fields that must be non-empty for an HTTP result to be kept
+            contacts: Contact-reveal mode of both engines (the seller contact cache lives in db_path too); over
+                HTTP a contact button is filled from the cache, marked contact_pending (deferred) or sent to
+                the browser (inline)
+            profile: Extraction profile of both engines (extraction_profiles.PROFILES)
+            session_dir: Saved login and Chrome profiles of the browser (see HarajScraperSelenium)
+            prefetch_tabs: Background tabs of the browser (see HarajScraperSelenium; default HARAJ_PREFETCH_TABS)
+        """
+        self.output_dir = output_dir
+        self.download_images = download_images
+        self.cancel_token = cancel_token or CancelToken()
+        self.required_fields = tuple(required_fields)
+        db_path = db_path or Path(output_dir) / "listings.db"
+        self.choices = EngineChoices(db_path)
+        self.contacts = contacts
+        self.contact_cache = SellerContactCache(db_path) if contacts != 'off' else None
+        self.http = HarajScraper(output_dir=output_dir, download_images=download_images,
+                                 cancel_token=self.cancel_token, rate_budget=rate_budget, parser=parser,
+                                 profile=profile)
+        self._browser_kwargs = dict(output_dir=output_dir, download_images=download_images, headless=headless,
+                                    username=username, password=password, rate_budget=rate_budget,
+                                    cancel_token=self.cancel_token, parser=parser, engine='browser',
+                                    contacts=contacts, contact_db=db_path, profile=profile,
+                                    session_dir=session_dir)
+        if prefetch_tabs is not None:
+            self._browser_kwargs['prefetch_tabs'] = prefetch_tabs
+        self._browser = None
+        self.category_pattern = None
+        self.engine_counts = {HTTP: 0, BROWSER: 0}
+
+    @property
+    def browser(self):
+        """The Selenium scraper, started on first use."""
+        if self._browser is None:
+            from haraj_scraper_selenium import HarajScraperSelenium
+            print("Auto engine: starting the browser")
+            self._browser = HarajScraperSelenium(**self._browser_kwargs)
+        return self._browser
+
+    @property
+    def last_error(self) -> Optional[str]:
+        """Why the browser's last listing returned no data (see HarajScraperSelenium.scrape_listing)."""
+        return self._browser.last_error if self._browser is not None else None
+
+    @property
+    def prefetch_tabs(self) -> int:
+        return self._browser.prefetch_tabs if self._browser is not None else 1
+
+    def prefetch(self, urls: List[str]):
+        """Let the browser preload upcoming listings, once listings of this category go to the browser."""
+        if self._browser is not None and self.choices.engine_for(self._listing_pattern()) == BROWSER:
+            self._browser.prefetch(urls)
+
+    def _listing_pattern(self) -> str:
+        return f'listing@{self.category_pattern}' if self.category_pattern else 'listing'
+
+    def find_listing_urls(self, category_url: str, max_pages: int = 10, target_count: int = None,
+                          frontier: Optional[CrawlFrontier] = None) -> List[str]:
+        """Listing URLs of a category: HTTP pages first, the browser's scrolling crawl if they hold none."""
+        self.category_pattern = url_pattern(category_url)
+        if frontier is not None and frontier.is_discovered():
+            listing_urls = frontier.urls()
+            print(f"Resuming job '{frontier.job_name}': {len(listing_urls)} URLs already discovered")
+            return listing_urls[:target_count] if target_count else listing_urls
+
+        pattern = self.category_pattern
+        if self.choices.engine_for(pattern) == HTTP:
+            pages = min(max_pages, max(1, (target_count + 19) // 20)) if target_count else max_pages
+            listing_urls = self.http.find_listing_urls(category_url, max_pages=pages)
+            self.choices.record(pattern, HTTP, bool(listing_urls))
+            if listing_urls:
+                listing_urls = listing_urls[:target_count] if target_count else listing_urls
+                if frontier is not None:
+                    frontier.add_urls(listing_urls)
+                    frontier.mark_discovered(category_url)
+                return listing_urls
+            print(f"Auto engine: no listings over HTTP for {pattern}, using the browser")
+        listing_urls = self.browser.find_listing_urls(category_url, max_pages=max_pages, target_count=target_count,
+                                                      frontier=frontier)
+        self.choices.record(pattern, BROWSER, bool(listing_urls))
+        return listing_urls
+
+    def _scrape_listing_http(self, listing_url: str, pattern: str) -> Optional[Dict]:
+        """
+        Listing over HTTP, or None when the fetch failed, a required field is missing or its contact
+        needs the browser. Only fetched pages count towards the pattern's HTTP record: a network error,
+        429 or challenge says nothing about whether the page type works without JavaScript.
+        """
+        html = self.http.fetch_listing(listing_url)
+        if html is None:
+            return None
+        listing_data = parse_listing_html(html, listing_url, self.http.parser, self.http.steps, keep_raw_html=False)
+        ok = all(listing_data.get(field) for field in self.required_fields) and self._contact_stage_http(listing_data)
+        self.choices.record(pattern, HTTP, ok)
+        return self.http.download_listing_images(listing_data) if ok else None
+
+    def _contact_stage_http(self, listing_data: Dict) -> bool:
+        """
+        Contact of an HTTP result: the seller's cached contact, else contact_pending for
+        reveal_pending_contacts (deferred). False if the inline reveal needs the browser's click.
+        """
+        if self.contact_cache is None or 'contact' not in self.http.steps:
+            return True
+        info = listing_data.setdefault('contact_info', {})
+        if info.get('phone_numbers') or not info.get('has_contact_button'):
+            return True
+        if self.contact_cache.apply(listing_data):
+            return True
+        if self.contacts == 'deferred':
+            info['contact_pending'] = True
+            return True
+        return False
+
+    def scrape_listing(self, listing_url: str) -> Dict:
+        """Scrape one listing with the engine remembered for its pattern, escalating to the browser if needed."""
+        pattern = self._listing_pattern()
+        if self.choices.engine_for(pattern) == HTTP:
+            listing_data = self._scrape_listing_http(listing_url, pattern)
+            if listing_data is not None:
+                self.engine_counts[HTTP] += 1
+                return listing_data
+            print("  Auto engine: no usable page over HTTP, using the browser")
+        listing_data = self.browser.scrape_listing(listing_url)
+        self.choices.record(pattern, BROWSER, bool(listing_data))
+        self.engine_counts[BROWSER] += 1
+        return listing_data
+
+    def scrape_category(self, category_url: str, max_listings: int = 50, max_pages: int = 10,
+                        sink: Optional[ListingSink] = None, frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """Scrape all listings from a category (sink and frontier as in HarajScraperSelenium.scrape_category)."""
+        print(f"Scraping category: {category_url}")
+        if frontier is not None:
+            all_listings = self._scrape_category_frontier(category_url, max_listings, max_pages, sink, frontier)
+        else:
+            all_listings = []
+            try:
+                listing_urls = self.find_listing_urls(category_url, max_pages=max_pages, target_count=max_listings)
+                listing_urls = listing_urls[:max_listings]
+                print(f"Found {len(listing_urls)} listings to scrape")
+                for idx, url in enumerate(listing_urls, 1):
+                    print(f"\n[{idx}/{len(listing_urls)}]")
+                    listing_data = self.scrape_listing(url)
+                    if listing_data:
+                        if sink is not None:
+                            sink.write(listing_data)
+                        else:
+                            all_listings.append(listing_data)
+            except ScrapeCancelled:
+                print("Scraping stopped: returning listings scraped so far")
+        print(f"Auto engine: {self.engine_counts[HTTP]} listings over HTTP, {self.engine_counts[BROWSER]} in the browser")
+        return all_listings
+
+    def _scrape_category_frontier(self, category_url: str, max_listings: int, max_pages: int,
+                                  sink: Optional[ListingSink], frontier: CrawlFrontier) -> List[Dict]:
+        """Frontier-driven crawl: claim URL, scrape, mark done/failed (done on flush when there is a sink)."""
+        if frontier.is_complete():
+            frontier.reset()
+        requeued = frontier.recover()
+        if requeued:
+            print(f"Resuming job '{frontier.job_name}': {requeued} URLs requeued")
+        if not frontier.is_discovered():
+            try:
+                self.find_listing_urls(category_url, max_pages=max_pages, target_count=max_listings, frontier=frontier)
+            except ScrapeCancelled:
+                print("Scraping stopped during discovery")
+                return []
+
+        all_listings = []
+        if sink is not None:
+            previous_on_flush = sink.on_flush
+
+            def _mark_flushed_done(batch):
+                for L in batch:
+                    if L.get('url'):
+                        frontier.mark_done(L['url'])
+                if previous_on_flush:
+                    previous_on_flush(batch)
+
+            sink.on_flush = _mark_flushed_done
+        try:
+            for url, _ in claim_with_retries(frontier, self.cancel_token.sleep):
+                if self.cancel_token.cancelled:
+                    break
+                self.prefetch(frontier.peek_pending(self.prefetch_tabs - 1))
+                try:
+                    listing_data = self.scrape_listing(url)
+                except Exception as e:
+                    frontier.mark_failed(url, str(e))
+                    continue
+                if not listing_data:
+                    frontier.mark_failed(url, self.last_error or 'no data extracted')
+                    continue
+                listing_data['url'] = url
+                if sink is not None:
+                    sink.write(listing_data)
+                else:
+                    all_listings.append(listing_data)
+                    frontier.mark_done(url)
+        except ScrapeCancelled:
+            print(f"Job '{frontier.job_name}' stopped: progress saved, rerun to resume")
+        return all_listings
+
+    def save_to_json(self, data: List[Dict], filename: str = "listings.json"):
+        self.http.save_to_json(data, filename)
+
+    def save_to_csv(self, data: List[Dict], filename: str = "listings.csv"):
+        """CSV with the contact columns once the browser has been used, the HTTP scraper's columns otherwise."""
+        (self._browser or self.http).save_to_csv(data, filename)
+
+    def reveal_pending_contacts(self, db_path=None, limit: Optional[int] = None) -> int:
+        """Deferred contact stage (see HarajScraperSelenium.reveal_pending_contacts); needs the browser."""
+        return self.browser.reveal_pending_contacts(db_path, limit)
+
+    def close(self):
+        if self._browser is not None:
+            self._browser.close()
@@ -17,11 +17,27 @@ import os
 import re
 from urllib.parse import urljoin, urlparse
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import csv
 from pathlib import Path
+from listing_store import ListingSink, SINK_TYPES, load_all_listings, open_sinks, upsert_listings
+from crawl_frontier import CrawlFrontier, claim_with_retries
+from rate_limit import AdaptiveRateController, looks_like_challenge, shared_budget_from_env
+from cancellation import CancelToken, ListingTimeout, ScrapeCancelled
+from structured_data import apply_structured_fields, scripts_from_soup, structured_listing_fields
+from html_parsing import DEFAULT_PARSER, PARSER_BACKENDS, check_backend, make_soup, soup_features
+from haraj_scraper import HarajScraper, parse_listing_html
+from http_session import capture_api_calls, copy_browser_cookies, pooled_session, token_headers
+from contact_cache import CONTACT_MODES, DEFAULT_CONTACT_MODE, SellerContactCache, pending_by_seller
+from extraction_profiles import DEFAULT_PROFILE, PROFILES, profile_steps, trim_listing
+from browser_watchdog import HangSupervisor, MemoryWatchdog, kill_process_tree
+from cdp_client import CdpError, CdpTab
+from browser_session import (SESSION_DIR, CookieJar, cached_driver_path, cdp_cookie_params, claim_profile,
+                             forget_driver_path, remember_driver_path)
 import requests
+import websocket
 import random
+import signal
 import shutil
 import glob
 
@@ -124,9 +140,36 @@ def _valid_posted_time(s: str, max_len: int = 80) -> bool:
     return True
 
 
+def _category_from_tags(tags: List[str]) -> str:
+    """First listing-specific tag; skip generic "حراج السيارات" if there are others."""
+    generic_car = 'حراج السيارات'
+    non_generic = [t for t in tags if t != generic_car]
+    return non_generic[0] if non_generic else tags[0]
+
+
+ENGINES = ('browser', 'hybrid', 'cdp')
+# HARAJ_ENGINE=auto selects HarajScraperAuto (see haraj_scraper_auto) and renders with 'browser' there
+DEFAULT_ENGINE = os.environ.get('HARAJ_ENGINE') if os.environ.get('HARAJ_ENGINE') in ENGINES else 'browser'
+
+# Shown on every page of a logged-in session
+LOGGED_IN_XPATH = "//*[contains(text(), 'حسابي') or contains(text(), 'تسجيل الخروج')]"
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'expiry', 'secure', 'httpOnly', 'sameSite')
+
+# Seconds one listing may take from its page load to the end of extraction (0 = no limit)
+LISTING_TIMEOUT = float(os.environ.get('HARAJ_LISTING_TIMEOUT', '60') or 0)
+SCRIPT_TIMEOUT = 10
+# Tabs per browser: 1 loads listings one after another; N > 1 loads the next N-1 in background tabs
+PREFETCH_TABS = max(1, int(os.environ.get('HARAJ_PREFETCH_TABS', '1') or 1))
+
+
 class HarajScraperSelenium:
     def __init__(self, output_dir: str = "scraped_data", download_images: bool = True, headless: bool = True, 
-                 username: str = None, password: str = None):
+                 username: str = None, password: str = None, rate_budget=None,
+                 cancel_token: Optional[CancelToken] = None,
+                 rate_controller: Optional[AdaptiveRateController] = None, parser: str = DEFAULT_PARSER,
+                 engine: str = DEFAULT_ENGINE, contacts: str = DEFAULT_CONTACT_MODE, contact_db=None,
+                 profile: str = DEFAULT_PROFILE, session_dir=None, persist_session: bool = True,
+                 prefetch_tabs: int = PREFETCH_TABS):
         """
         Initialize the Haraj scraper with Selenium
         
@@ -134,8 +177,59 @@ class HarajScraperSelenium:
             output_dir: Directory to save scraped data and images
             download_images: Whether to download images
             headless: Run browser in headless mode
+            rate_budget: SharedRateBudget page loads wait on (default: host-wide budget from
+                HARAJ_RATE_PER_MINUTE, if set)
+            cancel_token: Optional CancelToken; cancelling it interrupts sleeps and page loads
+                (ScrapeCancelled is raised, scrape_category returns what it has so far)
+            rate_controller: Pacing between page loads (default: adaptive, see _default_rate_controller)
+            parser: HTML parser backend for page_source (html_parsing.PARSER_BACKENDS; lxml and bs4-lxml
+                both build the soup with lxml, since extraction here also queries the live driver)
+            engine: 'browser' renders every page in Chrome; 'hybrid' uses Chrome to log in and bootstrap
+                cookies/tokens, then fetches listing pages over pooled HTTP and opens a listing in Chrome
+                only for the contact reveal (or when the HTTP page lacks the listing); 'cdp' renders listing
+                pages in a tab driven directly over Chrome's DevTools websocket (cdp_client), without the
+                chromedriver hop per call, and uses chromedriver for login and the contact reveal.
+                Default: HARAJ_ENGINE.
+            contacts: Contact-reveal stage, one of contact_cache.CONTACT_MODES: 'inline' clicks the contact
+                button while scraping, 'deferred' marks listings as pending for reveal_pending_contacts,
+                'off' skips it. Sellers whose phone is already known are filled from the cache without
+                a click. Default: HARAJ_CONTACTS or inline.
+            contact_db: SQLite file of the seller contact cache (default: output_dir/listings.db)
+            profile: Extraction profile (extraction_profiles.PROFILES): steps outside it are skipped with
+                their driver lookups and waits, e.g. 'leads' has no images, tags or posted time and
+                'catalog' no contact modal. Default: HARAJ_PROFILE or full.
+            session_dir: Where the saved login cookies and the reusable Chrome profiles (with their disk
+                cache) live (default: HARAJ_SESSION_DIR or output_dir/browser_session)
+            persist_session: Reuse the saved login and a Chrome profile; False starts a cold browser
+            prefetch_tabs: Tabs used for listing pages. With N > 1, the next N-1 URLs given to prefetch()
+                load in background tabs while the current listing is extracted, and the tabs swap roles
+                (browser engine only; default: HARAJ_PREFETCH_TABS or 1)
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r} (choose from {', '.join(ENGINES)})")
+        if contacts not in CONTACT_MODES:
+            raise ValueError(f"Unknown contact mode {contacts!r} (choose from {', '.join(CONTACT_MODES)})")
+        self.engine = engine
+        self.contacts = contacts
+        self.profile = profile
+        self.steps = profile_steps(profile)
+        self.parser = check_backend(parser)
         self.base_url = "https://haraj.com.sa"
+        self.rate_budget = rate_budget if rate_budget is not None else shared_budget_from_env()
+        self.cancel_token = cancel_token or CancelToken()
+        self.page_load_timeout = 120
+        self.listing_timeout = LISTING_TIMEOUT
+        self.prefetch_tabs = max(1, prefetch_tabs)
+        self._upcoming: List[str] = []
+        # url -> (tab handle, navigation start) of pages loading in background tabs
+        self._prefetched: Dict[str, tuple] = {}
+        self._spare_tabs: List[str] = []
+        self._deadline = None
+        self.cdp = None
+        # Recycle reason whose browser restart failed; retried before the next listing
+        self._restart_pending = None
+        # Why the last scrape_listing returned no data (None when it succeeded)
+        self.last_error = None
         self.output_dir = Path(output_dir)
         self.images_dir = self.output_dir / "images"
         self.download_images = download_images
@@ -144,7 +238,62 @@ class HarajScraperSelenium:
         self.output_dir.mkdir(exist_ok=True)
         if self.download_images:
             self.images_dir.mkdir(exist_ok=True)
+        self.contact_db = contact_db or self.output_dir / "listings.db"
+        self.contact_cache = SellerContactCache(self.contact_db) if contacts != 'off' else None
+        self.session_dir = Path(session_dir or SESSION_DIR or self.output_dir / "browser_session")
+        self.cookie_jar = CookieJar(self.session_dir, username) if persist_session and username else None
+        # Warm profile: cookies and HTTP cache survive the run (None if every slot is in use)
+        self.profile_slot = claim_profile(self.session_dir) if persist_session else None
+        
+        try:
+            user_agent = self._start_driver(headless)
+        except Exception:
+            # Free the profile slot (and its lock file) for the next browser
+            if self.profile_slot is not None:
+                self.profile_slot.release()
+            raise
+        self.watchdog = MemoryWatchdog()
+        self.hang_supervisor = HangSupervisor(self._kill_browser)
+        self._configure_driver()
+        
+        # Session for downloading images
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+        })
         
+        # Counter for ToS compliance (change behavior every 10 listings)
+        self.listing_count = 0
+        
+        # Login credentials (optional)
+        self.username = username
+        self.password = password
+        self.is_logged_in = False
+        # When logged in: apply full ToS delays. When not: minimal delays (no account at risk).
+        self.use_compliance_delays = bool(username and password)
+        self.rate_controller = rate_controller or self._default_rate_controller()
+        
+        # Login if credentials provided (the saved session of a previous run when it is still valid)
+        if self.username and self.password:
+            try:
+                self._resume_session() or self.login()
+            except ScrapeCancelled:
+                self.close()
+                raise
+        
+        self.http = None
+        self.api_calls = []
+        if self.engine == 'hybrid':
+            try:
+                self.bootstrap_http_session(user_agent)
+            except ScrapeCancelled:
+                self.close()
+                raise
+        elif self.engine == 'cdp':
+            self._open_cdp_tab()
+    
+    def _start_driver(self, headless: bool) -> str:
+        """Find chromedriver and Chrome and start the browser (self.driver). Returns the user agent it uses."""
         # Setup Chrome options
         chrome_options = Options()
         if headless:
@@ -158,6 +307,20 @@ class HarajScraperSelenium:
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         chrome_options.add_argument('--lang=ar,en')
+        # driver.get returns immediately; _load waits for the document itself so a stop request
+        # can abort a slow page load instead of blocking until it finishes
+        chrome_options.page_load_strategy = 'none'
+        if self.prefetch_tabs > 1:
+            # Background tabs keep loading at full speed instead of being throttled
+            chrome_options.add_argument('--disable-background-timer-throttling')
+            chrome_options.add_argument('--disable-renderer-backgrounding')
+            chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+        if self.profile_slot is not None:
+            for argument in self.profile_slot.chrome_arguments():
+                chrome_options.add_argument(argument)
+        if self.engine == 'hybrid':
+            # CDP Network events in the performance log: the site's own XHR/fetch calls and their auth headers
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         
         # For Railway/Linux environments, try to use system Chrome if available
         # Check for Chrome/Chromium in standard locations (Dockerfile installs to /usr/bin)
@@ -228,8 +391,12 @@ class HarajScraperSelenium:
         if nix_matches:
             chromedriver_paths.extend(nix_matches)
         
-        driver_found = False
-        driver_path = None
+        # A path that started a browser before skips the probing and test launch below
+        driver_path = cached_driver_path(self.session_dir)
+        driver_found = driver_path is not None
+        if driver_found:
+            chromedriver_paths = []
+            print(f"Using cached ChromeDriver path: {driver_path}")
         
         # Try system chromedriver first
         for path in chromedriver_paths:
@@ -336,7 +503,12 @@ class HarajScraperSelenium:
                 service = Service(driver_path)
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
                 print(f"ChromeDriver initialized successfully at: {driver_path}")
+                remember_driver_path(self.session_dir, driver_path)
+                # Kept to start an identical browser when the watchdog recycles this one
+                self._driver_path = driver_path
+                self._chrome_options = chrome_options
             except Exception as init_error:
+                forget_driver_path(self.session_dir)
                 error_msg = f"Failed to start ChromeDriver at {driver_path}: {str(init_error)}"
                 error_msg += "\nMake sure:"
                 error_msg += "\n1. Chrome/Chromium is installed (check nixpacks.toml)"
@@ -345,28 +517,8 @@ class HarajScraperSelenium:
                 raise Exception(error_msg)
         else:
             raise Exception("ChromeDriver path not found or not initialized")
-        self.driver.implicitly_wait(3)  # Reduced for speed
-        
-        # Session for downloading images
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': user_agent,
-        })
-        
-        # Counter for ToS compliance (change behavior every 10 listings)
-        self.listing_count = 0
-        
-        # Login credentials (optional)
-        self.username = username
-        self.password = password
-        self.is_logged_in = False
-        # When logged in: apply full ToS delays. When not: minimal delays (no account at risk).
-        self.use_compliance_delays = bool(username and password)
-        
-        # Login if credentials provided
-        if self.username and self.password:
-            self.login()
-    
+        return user_agent
+
     def _apply_tos_compliance_measures(self):
         """
         Apply ToS-compliant measures after every 10 listings (only when using login).
@@ -379,7 +531,7 @@ class HarajScraperSelenium:
             # Extended delay 30-60 seconds (per TOS_COMPLIANCE.md) - reduces server load and block risk
             delay = random.randint(30, 60)
             print(f"  - Extended delay: {delay} seconds")
-            time.sleep(delay)
+            self._sleep(delay)
             # Clear cookies every 20 listings
             if self.listing_count % 20 == 0:
                 self.driver.delete_all_cookies()
@@ -394,6 +546,345 @@ class HarajScraperSelenium:
                     pass
             print("  - Continuing scraping...\n")
     
+    def _default_rate_controller(self) -> AdaptiveRateController:
+        """Adaptive pacing: logged in never below the 2s ToS minimum; anonymous starts fast."""
+        if self.use_compliance_delays:
+            return AdaptiveRateController(min_delay=2, max_delay=30, initial_delay=3.5, latency_target=10)
+        return AdaptiveRateController(min_delay=0.15, max_delay=15, initial_delay=0.3, latency_target=10)
+
+    def _sleep(self, seconds: float):
+        """
+        Interruptible sleep: raises ScrapeCancelled as soon as the job is stopped, and ListingTimeout
+        when it would run past the current listing's deadline.
+        """
+        if self._deadline is not None and time.time() + seconds > self._deadline:
+            self.cancel_token.sleep(max(0.0, self._deadline - time.time()))
+            raise ListingTimeout()
+        self.cancel_token.sleep(seconds)
+
+    def _load(self, url: str):
+        """
+        driver.get within the shared rate budget (if any), then wait for the new document to finish
+        loading. A stop request during the load stops the page (window.stop) and raises ScrapeCancelled;
+        so does reaching the listing deadline, with ListingTimeout.
+        """
+        prefetched = self._prefetched.pop(url, None)
+        if prefetched is not None:
+            # Loading (or loaded) in a background tab: it becomes the foreground tab, the old one a spare
+            handle, start = prefetched
+            self._spare_tabs.append(self.driver.current_window_handle)
+            self.driver.switch_to.window(handle)
+        else:
+            if self.rate_budget is not None:
+                while not self.rate_budget.acquire(timeout=0.25):
+                    self.cancel_token.raise_if_cancelled()
+            self.cancel_token.raise_if_cancelled()
+            start = self._navigate(url)
+        deadline = start + self.page_load_timeout
+        if self._deadline is not None:
+            deadline = min(deadline, self._deadline)
+        while True:
+            if self.cancel_token.cancelled:
+                self._stop_page()
+                raise ScrapeCancelled()
+            try:
+                if self.driver.execute_script(
+                        "return !window.__harajPrevDoc && document.readyState === 'complete';"):
+                    # A prefetched page may have finished long ago: use its own load time
+                    self._record_response(self._page_load_time() if prefetched else time.time() - start)
+                    return
+            except Exception:
+                pass  # document is being replaced
+            if time.time() > deadline:
+                self.rate_controller.record(latency=time.time() - start, error=True)
+                if self._deadline is not None and deadline >= self._deadline:
+                    self._stop_page()
+                    raise ListingTimeout()
+                print(f"  Page load timeout after {self.page_load_timeout}s: {url}")
+                return
+            self.cancel_token.wait(0.1)
+
+    def _navigate(self, url: str) -> float:
+        """driver.get in the current tab (returns at once, see page_load_strategy); returns the start time."""
+        try:
+            # Marker on the old document: the load is complete once a new document without it is ready
+            self.driver.execute_script("window.__harajPrevDoc = true;")
+        except Exception:
+            pass
+        start = time.time()
+        self.rate_controller.request_started()
+        try:
+            self.driver.get(url)
+        except Exception:
+            self.rate_controller.record(latency=time.time() - start, error=True)
+            raise
+        self.watchdog.page_loaded()
+        return start
+
+    def _page_load_time(self) -> float:
+        try:
+            return self.driver.execute_script(
+                "const t = performance.timing; return ((t.loadEventEnd || Date.now()) - t.navigationStart) / 1000;")
+        except Exception:
+            return 0.0
+
+    def prefetch(self, urls: List[str]):
+        """
+        The URLs the job will scrape next, in order. With prefetch_tabs > 1, up to prefetch_tabs - 1 of
+        them start loading in background tabs during the next listing's settle wait (only when the rate
+        controller and budget allow a request right then, so pacing is unchanged).
+        """
+        if self.prefetch_tabs < 2 or self.http is not None or self.cdp is not None:
+            return
+        self._upcoming = list(urls)[:self.prefetch_tabs - 1]
+
+    def _start_prefetches(self, until: float):
+        """Navigate background tabs to upcoming URLs while pacing allows before `until`."""
+        # Prefetched pages the job no longer needs next (e.g. failed over to the retry round)
+        for url in [u for u in self._prefetched if u not in self._upcoming]:
+            self._spare_tabs.append(self._prefetched.pop(url)[0])
+        for url in self._upcoming:
+            if url in self._prefetched:
+                continue
+            wait = self.rate_controller.time_until_next_request()
+            if time.time() + wait > until:
+                return
+            self._sleep(wait)
+            if self.rate_budget is not None and not self.rate_budget.acquire(timeout=0):
+                return
+            foreground = self.driver.current_window_handle
+            try:
+                if self._spare_tabs:
+                    self.driver.switch_to.window(self._spare_tabs.pop())
+                else:
+                    self.driver.switch_to.new_window('tab')
+                self._prefetched[url] = (self.driver.current_window_handle, self._navigate(url))
+            except Exception as e:
+                print(f"  Prefetch of {url} failed: {e}")
+            finally:
+                self.driver.switch_to.window(foreground)
+        self._upcoming = []
+
+    def _forget_tabs(self):
+        self._upcoming = []
+        self._prefetched.clear()
+        self._spare_tabs = []
+
+    def _record_response(self, latency: float, signals: Optional[Tuple[Optional[int], str]] = None):
+        """
+        Feed load time, HTTP status and challenge-page detection of the current page to the rate controller.
+        signals: (status, title and text) when already known; read from the driver's current page otherwise.
+        """
+        status, text = None, ''
+        if signals is not None:
+            status, text = signals
+        else:
+            try:
+                status, text = self.driver.execute_script(
+                    "const nav = performance.getEntriesByType('navigation')[0];"
+                    "return [nav && nav.responseStatus ? nav.responseStatus : null,"
+                    " document.title + ' ' + (document.body ? document.body.innerText.slice(0, 3000) : '')];"
+                )
+            except Exception:
+                pass
+        challenge = looks_like_challenge(text)
+        if challenge or status in (429, 503):
+            print(f"  Site under stress (status {status}, challenge page: {challenge}); slowing down")
+        self.rate_controller.record(latency=latency, status=status, challenge=challenge)
+
+    def bootstrap_http_session(self, user_agent: str):
+        """
+        Hybrid engine: copy the browser session (cookies, API auth headers) into a pooled HTTP session
+        that fetches listing pages without rendering them. Shares this scraper's pacing and budget.
+        """
+        if not self.is_logged_in:
+            # Anonymous: one page load gives the site's cookies and its first API calls
+            self._load(self.base_url)
+        self.session = pooled_session(user_agent)
+        cookies = copy_browser_cookies(self.driver, self.session)
+        self.api_calls = capture_api_calls(self.driver, urlparse(self.base_url).netloc)
+        tokens = token_headers(self.api_calls)
+        self.session.headers.update(tokens)
+        self.http = HarajScraper(output_dir=str(self.output_dir), download_images=False,
+                                 cancel_token=self.cancel_token, rate_controller=self.rate_controller,
+                                 rate_budget=self.rate_budget, parser=self.parser)
+        self.http.session = self.session
+        endpoints = sorted({call['url'].split('?')[0] for call in self.api_calls})
+        print(f"Hybrid engine: {cookies} cookies, {len(tokens)} auth headers, "
+              f"{len(endpoints)} API endpoints seen{': ' + ', '.join(endpoints[:5]) if endpoints else ''}")
+
+    def _scrape_listing_http(self, listing_url: str) -> Optional[Dict]:
+        """
+        Hybrid engine: listing fields from the page fetched over HTTP (structured data first, DOM after).
+        None if the fetch failed or the page has no listing without JavaScript (caller uses the browser).
+        """
+        html = self.http.fetch_html(listing_url)
+        if html is None:
+            return None
+        return self._listing_from_html(html, listing_url)
+
+    def _open_cdp_tab(self):
+        """CDP engine: open the tab listing pages are rendered in, on this Chrome's DevTools endpoint."""
+        address = self.driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+        if not address:
+            raise Exception("Chrome reported no DevTools address (goog:chromeOptions.debuggerAddress); "
+                            "the cdp engine needs it")
+        self.cdp = CdpTab.open(address, cancel_token=self.cancel_token)
+        print(f"CDP engine: listing tab on {address}")
+
+    def _close_cdp_tab(self):
+        if self.cdp is not None:
+            self.cdp.close()
+            self.cdp = None
+
+    def _scrape_listing_cdp(self, listing_url: str) -> Optional[Dict]:
+        """
+        CDP engine: the listing loaded in the CDP tab (readiness from the load event, status from the
+        document's Network response) and parsed from its rendered HTML. None if the load failed or the
+        page lacks the listing (caller renders it through chromedriver).
+        """
+        if self.rate_budget is not None:
+            while not self.rate_budget.acquire(timeout=0.25):
+                self.cancel_token.raise_if_cancelled()
+        timeout = self.page_load_timeout
+        if self._deadline is not None:
+            timeout = min(timeout, max(0.1, self._deadline - time.time()))
+        start = time.time()
+        self.rate_controller.request_started()
+        try:
+            response = self.cdp.navigate(listing_url, timeout)
+            latency = time.time() - start
+            self.watchdog.page_loaded()
+            if response is None:
+                self.rate_controller.record(latency=latency, error=True)
+                self.cdp.stop()
+                if self._deadline is not None and time.time() >= self._deadline:
+                    raise ListingTimeout()
+                print(f"  Page load timeout after {timeout:.0f}s: {listing_url}")
+                return None
+            # ToS: 2-4 second wait after page load, as in get_page
+            self._sleep(random.uniform(2, 4))
+            html = self.cdp.html()
+            text = self.cdp.evaluate(
+                "document.title + ' ' + (document.body ? document.body.innerText.slice(0, 3000) : '')")
+        except (CdpError, websocket.WebSocketException, OSError) as e:
+            self.rate_controller.record(latency=time.time() - start, error=True)
+            print(f"  CDP load failed for {listing_url}: {e}")
+            return None
+        self._record_response(latency, (response.get('status'), text or ''))
+        return self._listing_from_html(html, listing_url)
+
+    def _listing_from_html(self, html, listing_url: str) -> Optional[Dict]:
+        """Hybrid and CDP engines: listing fields from page HTML (None without a title), contact stage off-page."""
+        listing_data = parse_listing_html(html, listing_url, self.parser, self.steps)
+        listing_data.pop('raw_html', None)
+        if not listing_data.get('title'):
+            return None
+        has_contact_button = listing_data['contact_info'].get('has_contact_button', False)
+        listing_data['contact_info'] = {}
+        if has_contact_button and 'contact' in self.steps:
+            listing_data['contact_info']['has_contact_button'] = True
+            self._contact_stage(listing_url, listing_data, on_page=False)
+        return listing_data
+
+    def _contact_stage(self, listing_url: str, listing_data: Dict, on_page: bool) -> Dict:
+        """
+        Contact of a listing: from the seller cache when the seller's phone is known, otherwise revealed
+        now (inline) or left pending for reveal_pending_contacts (deferred). on_page: the listing is the
+        page currently loaded in the browser.
+        """
+        if self.contacts == 'off':
+            return listing_data
+        if self.contact_cache.apply(listing_data):
+            print("  Contact from seller cache")
+            return listing_data
+        if self.contacts == 'deferred':
+            listing_data['contact_info']['contact_pending'] = True
+            return listing_data
+        if not on_page:
+            if not self.is_logged_in:
+                # Haraj shows the login prompt instead of the number to anonymous users
+                listing_data['contact_info']['login_required'] = True
+                return listing_data
+            self.reveal_contact(listing_url, listing_data)
+        else:
+            self._extract_contact_info(listing_data)
+        self.contact_cache.put(listing_data.get('seller_url'), listing_data['contact_info'])
+        return listing_data
+
+    def reveal_contact(self, listing_url: str, listing_data: Dict) -> Dict:
+        """Open a listing in the browser only to click its contact button (the step that needs JavaScript)."""
+        self._sleep(self.rate_controller.time_until_next_request())
+        self._load(listing_url)
+        return self._extract_contact_info(listing_data)
+
+    def reveal_pending_contacts(self, db_path=None, limit: Optional[int] = None) -> int:
+        """
+        Deferred contact stage: reveal contacts of stored listings still pending, one click per seller.
+        The first listing of each unknown seller is opened; the seller's other listings (and sellers
+        already in the cache) are filled without a click. Returns the number of listings updated.
+        """
+        db_path = db_path or self.contact_db
+        cache = self.contact_cache or SellerContactCache(db_path)
+        groups = pending_by_seller(load_all_listings(db_path))
+        print(f"Contact stage: {sum(len(g) for g in groups.values())} listings of {len(groups)} sellers pending")
+        if not self.is_logged_in:
+            print("  Not logged in: Haraj only shows phone numbers to logged-in users, filling from the cache only")
+        updated, clicks = [], 0
+        try:
+            for seller_url, group in groups.items():
+                if not cache.get(seller_url) and self.is_logged_in and (limit is None or clicks < limit):
+                    clicks += 1
+                    print(f"\n[contact {clicks}] {group[0]['url']}")
+                    info = group[0].setdefault('contact_info', {})
+                    info.pop('contact_pending', None)
+                    info.pop('login_required', None)
+                    self.reveal_contact(group[0]['url'], group[0])
+                    if not cache.put(group[0].get('seller_url'), info):
+                        updated.append(group[0])
+                for listing in group:
+                    if cache.apply(listing):
+                        updated.append(listing)
+        except ScrapeCancelled:
+            print("Contact stage stopped: saving contacts revealed so far")
+        finally:
+            upsert_listings(db_path, updated)
+        print(f"Contact stage: {clicks} contact buttons clicked, {len(updated)} listings updated")
+        return len(updated)
+
+    def _session_active(self) -> bool:
+        """True if the loaded page shows the logged-in account menu."""
+        try:
+            return bool(self.driver.find_elements(By.XPATH, LOGGED_IN_XPATH))
+        except Exception:
+            return False
+
+    def _resume_session(self) -> bool:
+        """
+        Reuse the login of a previous run: the Chrome profile may still hold it, otherwise the saved
+        cookies are put back. One or two page loads instead of the UI login; False when it expired.
+        """
+        if self.cookie_jar is None:
+            return False
+        cookies = self.cookie_jar.load()
+        if not cookies:
+            return False
+        self._load(self.base_url)
+        if not self._session_active():
+            for cookie in cookies:
+                try:
+                    self.driver.add_cookie({k: cookie[k] for k in COOKIE_FIELDS if k in cookie})
+                except Exception:
+                    continue
+            self._load(self.base_url)
+            if not self._session_active():
+                print("  Saved login session expired, logging in again")
+                self.cookie_jar.clear()
+                return False
+        self.is_logged_in = True
+        print("  [OK] Reused saved login session")
+        return True
+
     def login(self):
         """Login to Haraj.com.sa if credentials are provided"""
         if not self.username or not self.password:
@@ -401,8 +892,8 @@ class HarajScraperSelenium:
         
         try:
             print("Attempting to login to Haraj.com.sa...")
-            self.driver.get("https://haraj.com.sa")
-            time.sleep(2)
+            self._load("https://haraj.com.sa")
+            self._sleep(2)
             
             # Look for login button/link
             login_selectors = [
@@ -427,7 +918,7 @@ class HarajScraperSelenium:
             
             # Click login button
             login_button.click()
-            time.sleep(2)
+            self._sleep(2)
             
             # Find username/email field
             username_fields = self.driver.find_elements(By.XPATH, 
@@ -441,16 +932,16 @@ class HarajScraperSelenium:
             
             if username_fields and password_fields:
                 username_fields[0].send_keys(self.username)
-                time.sleep(0.5)
+                self._sleep(0.5)
                 password_fields[0].send_keys(self.password)
-                time.sleep(0.5)
+                self._sleep(0.5)
                 
                 # Find and click submit button
                 submit_buttons = self.driver.find_elements(By.XPATH,
                     "//button[@type='submit'] | //button[contains(text(), 'دخول')] | //input[@type='submit']")
                 if submit_buttons:
                     submit_buttons[0].click()
-                    time.sleep(3)
+                    self._sleep(3)
                     
                     # Check if login was successful
                     # Look for user profile or logout button
@@ -460,6 +951,8 @@ class HarajScraperSelenium:
                     if profile_indicators or 'haraj.com.sa' in self.driver.current_url:
                         self.is_logged_in = True
                         print("  [OK] Login successful!")
+                        if self.cookie_jar is not None:
+                            self.cookie_jar.save(self.driver.get_cookies())
                         return True
                     else:
                         print("  [--] Login may have failed. Check credentials.")
@@ -478,9 +971,13 @@ class HarajScraperSelenium:
     def get_page(self, url: str) -> Optional[BeautifulSoup]:
         """Load page with Selenium and return BeautifulSoup. Includes ToS-friendly wait."""
         try:
-            self.driver.get(url)
-            # ToS: 2-4 second wait after page load (human-like, gives DOM time to render)
-            time.sleep(random.uniform(2, 4))
+            self._load(url)
+            # ToS: 2-4 second wait after page load (human-like, gives DOM time to render);
+            # the next listings start loading in background tabs meanwhile
+            settle_until = time.time() + random.uniform(2, 4)
+            if self._upcoming:
+                self._start_prefetches(settle_until)
+            self._sleep(max(0.0, settle_until - time.time()))
             try:
                 WebDriverWait(self.driver, 3).until(
                     EC.presence_of_element_located((By.TAG_NAME, "body"))
@@ -488,7 +985,7 @@ class HarajScraperSelenium:
             except Exception:
                 pass
             page_source = self.driver.page_source
-            return BeautifulSoup(page_source, 'html.parser')
+            return make_soup(page_source, self.parser)
         except Exception as e:
             print(f"Error loading {url}: {e}")
             return None
@@ -520,195 +1017,214 @@ class HarajScraperSelenium:
         if not soup:
             return listing_data
         
+        # Structured data (JSON-LD / app state) first; the DOM and driver lookups below only run
+        # for the fields it does not provide
+        structured = structured_listing_fields(scripts_from_soup(soup), listing_data['listing_id'], self.base_url)
+        apply_structured_fields(listing_data, structured)
+        if structured.get('tags') and not structured.get('category'):
+            listing_data['category'] = _category_from_tags(structured['tags'])
+        
         # Extract title - try multiple methods (strip script/style so no raw script appears)
-        title_elem = soup.find('h1')
-        if title_elem:
-            title_soup = BeautifulSoup(str(title_elem), 'html.parser')
-            root = title_soup.find()
-            if root:
-                _strip_script_and_style(root)
-            listing_data['title'] = _sanitize_text(title_soup.get_text(strip=True), max_length=2000)
-        else:
-            # Try using Selenium to find title
-            try:
-                title_elements = self.driver.find_elements(By.TAG_NAME, "h1")
-                if title_elements:
-                    listing_data['title'] = _sanitize_text(title_elements[0].text.strip(), max_length=2000)
-                else:
-                    # Try data-testid
-                    title_elements = self.driver.find_elements(By.XPATH, "//*[@data-testid='post_title']")
+        if 'title' in self.steps and not listing_data['title']:
+            title_elem = soup.find('h1')
+            if title_elem:
+                title_soup = BeautifulSoup(str(title_elem), soup_features(self.parser))
+                root = title_soup.find()
+                if root:
+                    _strip_script_and_style(root)
+                listing_data['title'] = _sanitize_text(title_soup.get_text(strip=True), max_length=2000)
+            else:
+                # Try using Selenium to find title
+                try:
+                    title_elements = self.driver.find_elements(By.TAG_NAME, "h1")
                     if title_elements:
                         listing_data['title'] = _sanitize_text(title_elements[0].text.strip(), max_length=2000)
-            except Exception:
-                pass
+                    else:
+                        # Try data-testid
+                        title_elements = self.driver.find_elements(By.XPATH, "//*[@data-testid='post_title']")
+                        if title_elements:
+                            listing_data['title'] = _sanitize_text(title_elements[0].text.strip(), max_length=2000)
+                except Exception:
+                    pass
 
         # Extract description/article content - strip script/style so no raw script appears
-        article = soup.find('article')
-        if article:
-            article_soup = BeautifulSoup(str(article), 'html.parser')
-            root = article_soup.find()
-            if root:
-                _strip_script_and_style(root)
-            listing_data['description'] = _sanitize_text(article_soup.get_text(strip=True), max_length=50000)
-        else:
-            # Try using Selenium
-            try:
-                article_elements = self.driver.find_elements(By.XPATH, "//article[@data-testid='post-article']")
-                if article_elements:
-                    listing_data['description'] = _sanitize_text(article_elements[0].text.strip(), max_length=50000)
-                else:
-                    # Try any article tag
-                    article_elements = self.driver.find_elements(By.TAG_NAME, "article")
+        if 'description' in self.steps and not listing_data['description']:
+            article = soup.find('article')
+            if article:
+                article_soup = BeautifulSoup(str(article), soup_features(self.parser))
+                root = article_soup.find()
+                if root:
+                    _strip_script_and_style(root)
+                listing_data['description'] = _sanitize_text(article_soup.get_text(strip=True), max_length=50000)
+            else:
+                # Try using Selenium
+                try:
+                    article_elements = self.driver.find_elements(By.XPATH, "//article[@data-testid='post-article']")
                     if article_elements:
                         listing_data['description'] = _sanitize_text(article_elements[0].text.strip(), max_length=50000)
-            except Exception:
-                pass
+                    else:
+                        # Try any article tag
+                        article_elements = self.driver.find_elements(By.TAG_NAME, "article")
+                        if article_elements:
+                            listing_data['description'] = _sanitize_text(article_elements[0].text.strip(), max_length=50000)
+                except Exception:
+                    pass
         
         # Extract price - multiple methods for Haraj
-        try:
-            # Method 1: data-testid / aria (Haraj may use these)
-            for selector in [
-                "//*[contains(@data-testid, 'price') or @data-testid='post_price']",
-                "//*[@aria-label and (contains(@aria-label, 'ريال') or contains(@aria-label, 'السعر'))]",
-                "//*[contains(@class, 'price') and (contains(., 'ريال') or contains(., 'ر.س'))]",
-                "//*[contains(text(), 'ريال') or contains(text(), 'ر.س')]",
-            ]:
-                price_elems = self.driver.find_elements(By.XPATH, selector)
-                for elem in price_elems:
-                    text = (elem.text or '').strip()
-                    if text and re.search(r'\d+', text) and ('ريال' in text or 'ر.س' in text):
-                        listing_data['price'] = text
+        if 'price' in self.steps and not listing_data['price']:
+            try:
+                # Method 1: data-testid / aria (Haraj may use these)
+                for selector in [
+                    "//*[contains(@data-testid, 'price') or @data-testid='post_price']",
+                    "//*[@aria-label and (contains(@aria-label, 'ريال') or contains(@aria-label, 'السعر'))]",
+                    "//*[contains(@class, 'price') and (contains(., 'ريال') or contains(., 'ر.س'))]",
+                    "//*[contains(text(), 'ريال') or contains(text(), 'ر.س')]",
+                ]:
+                    price_elems = self.driver.find_elements(By.XPATH, selector)
+                    for elem in price_elems:
+                        text = (elem.text or '').strip()
+                        if text and re.search(r'\d+', text) and ('ريال' in text or 'ر.س' in text):
+                            listing_data['price'] = text
+                            break
+                    if listing_data['price']:
                         break
-                if listing_data['price']:
-                    break
-            # Method 2: Soup fallback - regex in page text (must include digits)
-            if not listing_data['price'] and soup:
-                page_text = soup.get_text() if hasattr(soup, 'get_text') else str(soup)
-                price_match = re.search(r'[\d,]+\s*(?:ريال|ر\.س)', page_text)
-                if price_match:
-                    listing_data['price'] = price_match.group(0).strip()
-        except Exception:
-            pass
+                # Method 2: Soup fallback - regex in page text (must include digits)
+                if not listing_data['price'] and soup:
+                    page_text = soup.get_text() if hasattr(soup, 'get_text') else str(soup)
+                    price_match = re.search(r'[\d,]+\s*(?:ريال|ر\.س)', page_text)
+                    if price_match:
+                        listing_data['price'] = price_match.group(0).strip()
+            except Exception:
+                pass
 
         # Extract location/city
-        try:
-            city_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/city/')]")
-            if city_elements:
-                listing_data['city'] = city_elements[0].text.strip()
-                listing_data['location'] = listing_data['city']
-            if not listing_data['city'] and soup:
-                city_link = soup.find('a', href=re.compile(r'/city/'))
-                if city_link:
-                    listing_data['city'] = city_link.get_text(strip=True)
+        if 'city' in self.steps and not listing_data['city']:
+            try:
+                city_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/city/')]")
+                if city_elements:
+                    listing_data['city'] = city_elements[0].text.strip()
                     listing_data['location'] = listing_data['city']
-        except Exception:
-            pass
+                if not listing_data['city'] and soup:
+                    city_link = soup.find('a', href=re.compile(r'/city/'))
+                    if city_link:
+                        listing_data['city'] = city_link.get_text(strip=True)
+                        listing_data['location'] = listing_data['city']
+            except Exception:
+                pass
 
         # Extract posted time / publication date - only short time strings, never JSON-LD
-        try:
-            def set_posted_time(val):
-                v = (val or '').strip()
-                if _valid_posted_time(v):
-                    listing_data['posted_time'] = v
-                    return True
-                listing_data['posted_time'] = ''
-                return False
+        if 'posted_time' in self.steps and not listing_data['posted_time']:
+            try:
+                def set_posted_time(val):
+                    v = (val or '').strip()
+                    if _valid_posted_time(v):
+                        listing_data['posted_time'] = v
+                        return True
+                    listing_data['posted_time'] = ''
+                    return False
 
-            # Method 1: time element (datetime attribute is ideal) - datetime is ISO, keep short
-            time_elems = self.driver.find_elements(By.XPATH, "//time[@datetime]")
-            if time_elems:
-                dt = time_elems[0].get_attribute('datetime')
-                if dt and _valid_posted_time(dt):
-                    listing_data['posted_time'] = dt
-                elif not listing_data['posted_time']:
-                    set_posted_time(time_elems[0].text)
-            if not listing_data['posted_time']:
-                time_elems = self.driver.find_elements(By.XPATH,
-                    "//*[contains(@data-testid, 'time') or contains(@data-testid, 'date')]")
+                # Method 1: time element (datetime attribute is ideal) - datetime is ISO, keep short
+                time_elems = self.driver.find_elements(By.XPATH, "//time[@datetime]")
                 if time_elems:
-                    set_posted_time(time_elems[0].text)
-            if not listing_data['posted_time']:
-                time_elems = self.driver.find_elements(By.XPATH,
-                    "//*[contains(text(), 'الآن') or contains(text(), 'منذ') or contains(text(), 'قبل')]")
-                for elem in time_elems:
-                    text = (elem.text or '').strip()
-                    if text and len(text) < 50 and set_posted_time(text):
-                        break
-            # Method 2: Soup fallback - only if parent is not script (avoid JSON-LD)
-            if not listing_data['posted_time'] and soup:
-                for s in soup.find_all(string=re.compile(r'الآن|منذ|قبل|ago', re.IGNORECASE)):
-                    t = s.strip() if hasattr(s, 'strip') else str(s).strip()
-                    if _valid_posted_time(t):
-                        parent = s.parent if hasattr(s, 'parent') else None
-                        if parent and parent.name and parent.name.lower() == 'script':
-                            continue
-                        listing_data['posted_time'] = t
-                        break
-        except Exception:
-            pass
+                    dt = time_elems[0].get_attribute('datetime')
+                    if dt and _valid_posted_time(dt):
+                        listing_data['posted_time'] = dt
+                    elif not listing_data['posted_time']:
+                        set_posted_time(time_elems[0].text)
+                if not listing_data['posted_time']:
+                    time_elems = self.driver.find_elements(By.XPATH,
+                        "//*[contains(@data-testid, 'time') or contains(@data-testid, 'date')]")
+                    if time_elems:
+                        set_posted_time(time_elems[0].text)
+                if not listing_data['posted_time']:
+                    time_elems = self.driver.find_elements(By.XPATH,
+                        "//*[contains(text(), 'الآن') or contains(text(), 'منذ') or contains(text(), 'قبل')]")
+                    for elem in time_elems:
+                        text = (elem.text or '').strip()
+                        if text and len(text) < 50 and set_posted_time(text):
+                            break
+                # Method 2: Soup fallback - only if parent is not script (avoid JSON-LD)
+                if not listing_data['posted_time'] and soup:
+                    for s in soup.find_all(string=re.compile(r'الآن|منذ|قبل|ago', re.IGNORECASE)):
+                        t = s.strip() if hasattr(s, 'strip') else str(s).strip()
+                        if _valid_posted_time(t):
+                            parent = s.parent if hasattr(s, 'parent') else None
+                            if parent and parent.name and parent.name.lower() == 'script':
+                                continue
+                            listing_data['posted_time'] = t
+                            break
+            except Exception:
+                pass
         
         # Extract seller information
-        try:
-            seller_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/users/')]")
-            if seller_elements:
-                listing_data['seller_name'] = seller_elements[0].text.strip()
-                listing_data['seller_url'] = urljoin(self.base_url, seller_elements[0].get_attribute('href'))
-        except:
-            pass
+        if 'seller' in self.steps and not listing_data['seller_name']:
+            try:
+                seller_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/users/')]")
+                if seller_elements:
+                    listing_data['seller_name'] = seller_elements[0].text.strip()
+                    listing_data['seller_url'] = urljoin(self.base_url, seller_elements[0].get_attribute('href'))
+            except:
+                pass
         
         # Extract category and tags - only from listing content to avoid nav/breadcrumb (e.g. "Car auction")
-        try:
-            tags = []
-            seen = set()
-            # Prefer tags inside main content (article, main, or post container) so we get listing-specific tags
-            content_selectors = [
-                "//article//a[contains(@href, '/tags/')]",
-                "//main//a[contains(@href, '/tags/')]",
-                "//*[contains(@data-testid, 'post') or contains(@class, 'post') or contains(@class, 'listing')]//a[contains(@href, '/tags/')]",
-                "//*[@data-testid='post-article']/..//a[contains(@href, '/tags/')]",  # parent of article
-            ]
-            for selector in content_selectors:
-                tag_elements = self.driver.find_elements(By.XPATH, selector)
-                for elem in tag_elements:
-                    tag_text = (elem.text or '').strip()
-                    if tag_text and tag_text not in seen:
-                        tags.append(tag_text)
-                        seen.add(tag_text)
-            # Fallback: all /tags/ links on page, but then prefer non-"حراج السيارات" for category
-            if not tags:
-                tag_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/tags/')]")
-                for elem in tag_elements:
-                    tag_text = (elem.text or '').strip()
-                    if tag_text and tag_text not in seen:
-                        tags.append(tag_text)
-                        seen.add(tag_text)
-            listing_data['tags'] = tags
-            if tags:
-                # Use first listing-specific tag; skip generic "حراج السيارات" if we have others
-                generic_car = 'حراج السيارات'
-                non_generic = [t for t in tags if t != generic_car]
-                listing_data['category'] = (non_generic[0] if non_generic else tags[0])
-        except Exception:
-            pass
+        if 'tags' in self.steps and not listing_data['tags']:
+            try:
+                tags = []
+                seen = set()
+                # Prefer tags inside main content (article, main, or post container) so we get listing-specific tags
+                content_selectors = [
+                    "//article//a[contains(@href, '/tags/')]",
+                    "//main//a[contains(@href, '/tags/')]",
+                    "//*[contains(@data-testid, 'post') or contains(@class, 'post') or contains(@class, 'listing')]//a[contains(@href, '/tags/')]",
+                    "//*[@data-testid='post-article']/..//a[contains(@href, '/tags/')]",  # parent of article
+                ]
+                for selector in content_selectors:
+                    tag_elements = self.driver.find_elements(By.XPATH, selector)
+                    for elem in tag_elements:
+                        tag_text = (elem.text or '').strip()
+                        if tag_text and tag_text not in seen:
+                            tags.append(tag_text)
+                            seen.add(tag_text)
+                # Fallback: all /tags/ links on page, but then prefer non-"حراج السيارات" for category
+                if not tags:
+                    tag_elements = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/tags/')]")
+                    for elem in tag_elements:
+                        tag_text = (elem.text or '').strip()
+                        if tag_text and tag_text not in seen:
+                            tags.append(tag_text)
+                            seen.add(tag_text)
+                listing_data['tags'] = tags
+                if tags:
+                    listing_data['category'] = _category_from_tags(tags)
+            except Exception:
+                pass
         
         # Extract images - use Selenium to find all images
-        try:
-            img_elements = self.driver.find_elements(By.TAG_NAME, "img")
-            images = []
-            for img in img_elements:
-                src = img.get_attribute('src') or img.get_attribute('data-src') or img.get_attribute('data-lazy-src')
-                if src:
-                    # Filter out icons, logos, and small images
-                    if any(exclude in src.lower() for exclude in ['icon', 'logo', 'badge', 'avatar']):
-                        continue
-                    # Make absolute URL
-                    img_url = urljoin(self.base_url, src)
-                    if img_url not in images:
-                        images.append(img_url)
-            listing_data['images'] = images
-        except Exception as e:
-            print(f"Error extracting images: {e}")
+        if 'images' in self.steps and not listing_data['images']:
+            try:
+                img_elements = self.driver.find_elements(By.TAG_NAME, "img")
+                images = []
+                for img in img_elements:
+                    src = img.get_attribute('src') or img.get_attribute('data-src') or img.get_attribute('data-lazy-src')
+                    if src:
+                        # Filter out icons, logos, and small images
+                        if any(exclude in src.lower() for exclude in ['icon', 'logo', 'badge', 'avatar']):
+                            continue
+                        # Make absolute URL
+                        img_url = urljoin(self.base_url, src)
+                        if img_url not in images:
+                            images.append(img_url)
+                listing_data['images'] = images
+            except Exception as e:
+                print(f"Error extracting images: {e}")
+        
+        if 'contact' in self.steps:
+            self._contact_stage(url, listing_data, on_page=True)
         
+        return trim_listing(listing_data, self.steps)
+    
+    def _extract_contact_info(self, listing_data: Dict) -> Dict:
+        """Click the contact button on the current page and read the revealed phone/WhatsApp/seller name."""
         # Extract contact information by clicking contact button - ULTRA OPTIMIZED
         try:
             # Find contact button - try multiple selectors for better detection
@@ -729,7 +1245,7 @@ class HarajScraperSelenium:
                 try:
                     # Click directly without scrolling (faster)
                     self.driver.execute_script("arguments[0].click();", contact_buttons[0])
-                    time.sleep(0.5)  # Minimal wait for modal to appear
+                    self._sleep(0.5)  # Minimal wait for modal to appear
                     
                     # Check if login prompt appeared instead of contact info
                     login_prompts = self.driver.find_elements(By.XPATH,
@@ -755,7 +1271,7 @@ class HarajScraperSelenium:
                             )
                         )
                     except:
-                        time.sleep(0.3)  # Brief wait if modal detection fails
+                        self._sleep(0.3)  # Brief wait if modal detection fails
                     
                     # Extract seller name and phone from contact modal
                     seller_phone = None
@@ -939,33 +1455,47 @@ class HarajScraperSelenium:
             return None
     
     def scrape_listing(self, listing_url: str) -> Dict:
-        """Scrape a single listing"""
+        """
+        Scrape a single listing. Loading and extraction must finish within listing_timeout seconds;
+        a listing that fails or overruns returns {} (reason in last_error) so the caller can retry it later.
+        """
         # Apply ToS compliance measures every 10 listings
         self._apply_tos_compliance_measures()
+        self.last_error = None
+        # Fresh Chrome (same cookies) when the current one has served too many pages or grown too big
+        if not self._maybe_recycle():
+            self.listing_count += 1
+            return {}
         
         print(f"Scraping: {listing_url}")
-        # With login: ToS 2-5s between listings. Without login: fast 0.15-0.4s (no account risk).
-        if self.use_compliance_delays:
-            delay = random.uniform(2, 5)
-        else:
-            delay = random.uniform(0.15, 0.4)
-        time.sleep(delay)
-        
-        soup = self.get_page(listing_url)
-        if not soup:
+        # Adaptive delay between listings: speeds up while the site responds well, backs off on
+        # 429/503, challenge pages, errors and slow loads (with login never below the 2s ToS minimum).
+        # It runs from the previous page load, so extraction and storage of that page overlap with it.
+        self._sleep(self.rate_controller.time_until_next_request())
+
+        # The deadline starts after the pacing delay and ends before image downloads
+        if self.listing_timeout:
+            self._deadline = time.time() + self.listing_timeout
+            self.hang_supervisor.arm(self.listing_timeout)
+        try:
+            listing_data = self._extract_listing(listing_url)
+        except ListingTimeout:
+            self.last_error = f"timed out after {self.listing_timeout:.0f}s"
+            listing_data = {}
+        finally:
+            self._deadline = None
+            self.hang_supervisor.disarm()
+        if self.hang_supervisor.fired:
+            self.hang_supervisor.fired = False
+            self.last_error = "browser hung"
+            listing_data = {}
+            self._try_recycle('listing hung past its deadline')
+        if not listing_data:
             self.listing_count += 1
-            print(f"  Warning: Failed to load page for {listing_url}")
+            self.last_error = self.last_error or "page failed to load"
+            print(f"  Warning: {listing_url}: {self.last_error}")
             return {}
         
-        listing_data = self.extract_listing_details(soup, listing_url)
-        
-        # Validate that we got at least some data
-        if not listing_data.get('listing_id') and not listing_data.get('title'):
-            print(f"  Warning: No data extracted from {listing_url}")
-            # Try to get at least the URL
-            listing_data['url'] = listing_url
-            listing_data['listing_id'] = self.extract_listing_id(listing_url)
-        
         # Download images if enabled
         if self.download_images and listing_data.get('images'):
             downloaded_images = []
@@ -978,9 +1508,9 @@ class HarajScraperSelenium:
                     })
                 # With login: 0.5-1.5s between image downloads. Without: fast.
                 if self.use_compliance_delays:
-                    time.sleep(random.uniform(0.5, 1.5))
+                    self._sleep(random.uniform(0.5, 1.5))
                 else:
-                    time.sleep(random.uniform(0.05, 0.15))
+                    self._sleep(random.uniform(0.05, 0.15))
             
             listing_data['downloaded_images'] = downloaded_images
         
@@ -989,6 +1519,35 @@ class HarajScraperSelenium:
         
         return listing_data
     
+    def _extract_listing(self, listing_url: str) -> Dict:
+        """
+        Listing fields over HTTP (hybrid engine), from the CDP tab (cdp engine) or from the page rendered
+        through chromedriver; {} if the page did not load.
+        """
+        listing_data = None
+        if self.http is not None:
+            listing_data = self._scrape_listing_http(listing_url)
+        elif self.cdp is not None:
+            listing_data = self._scrape_listing_cdp(listing_url)
+        if listing_data is None:
+            if self.http is not None or self.cdp is not None:
+                print(f"  {'HTTP' if self.http is not None else 'CDP'} page incomplete, rendering in the browser")
+                self._sleep(self.rate_controller.time_until_next_request())
+            soup = self.get_page(listing_url)
+            if not soup:
+                return {}
+            self.cancel_token.raise_if_cancelled()
+            
+            listing_data = self.extract_listing_details(soup, listing_url)
+        
+        # Validate that we got at least some data
+        if not listing_data.get('listing_id') and not listing_data.get('title'):
+            print(f"  Warning: No data extracted from {listing_url}")
+            # Try to get at least the URL
+            listing_data['url'] = listing_url
+            listing_data['listing_id'] = self.extract_listing_id(listing_url)
+        return listing_data
+
     def _extract_listing_links_from_page(self, seen: set) -> List[str]:
         """Extract listing URLs from current page. Haraj format: /1234567890/title-slug/ (8+ digit ID)."""
         page_urls = []
@@ -1032,19 +1591,38 @@ class HarajScraperSelenium:
                 for el in els:
                     if el.is_displayed() and el.is_enabled():
                         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", el)
-                        time.sleep(0.3)
+                        self._sleep(0.3)
                         el.click()
-                        time.sleep(1.2 if self.use_compliance_delays else 0.6)
+                        self._sleep(1.2 if self.use_compliance_delays else 0.6)
                         return True
         except Exception:
             pass
         return False
 
-    def find_listing_urls(self, category_url: str, max_pages: int = 10, target_count: int = None) -> List[str]:
-        """Find listing URLs from category. Scrolls and clicks 'View more' until we have target_count URLs or max_pages."""
+    def find_listing_urls(self, category_url: str, max_pages: int = 10, target_count: int = None,
+                          frontier: Optional[CrawlFrontier] = None) -> List[str]:
+        """
+        Find listing URLs from category. Scrolls and clicks 'View more' until we have target_count URLs or max_pages.
+        With a frontier, discovered URLs are persisted page by page and a job whose discovery already
+        finished returns its stored URLs without touching the site.
+        """
+        if frontier is not None and frontier.is_discovered():
+            listing_urls = frontier.urls()
+            print(f"Resuming job '{frontier.job_name}': {len(listing_urls)} URLs already discovered")
+            return listing_urls[:target_count] if target_count else listing_urls
+
+        listing_urls = self._discover_listing_urls(category_url, max_pages, target_count, frontier)
+        if frontier is not None:
+            frontier.add_urls(listing_urls)
+            frontier.mark_discovered(category_url)
+        return listing_urls
+
+    def _discover_listing_urls(self, category_url: str, max_pages: int, target_count: Optional[int],
+                               frontier: Optional[CrawlFrontier]) -> List[str]:
+        """Crawl category pages for listing URLs (see find_listing_urls)."""
         listing_urls = []
         seen = set()
-        time.sleep(random.uniform(0.8, 1.5))
+        self._sleep(random.uniform(0.8, 1.5))
 
         for page in range(1, max_pages + 1):
             if page == 1:
@@ -1054,11 +1632,11 @@ class HarajScraperSelenium:
 
             print(f"Fetching page {page}...")
             try:
-                self.driver.get(url)
+                self._load(url)
                 if self.use_compliance_delays:
-                    time.sleep(random.uniform(2, 4))
+                    self._sleep(random.uniform(2, 4))
                 else:
-                    time.sleep(random.uniform(1.0, 1.5))
+                    self._sleep(random.uniform(1.0, 1.5))
             except Exception as e:
                 print(f"Error loading page {page}: {e}")
                 break
@@ -1075,12 +1653,12 @@ class HarajScraperSelenium:
             scroll_rounds = max(25, (target_count or 20)) if page == 1 else 5
             for scroll_round in range(scroll_rounds):
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.2 if self.use_compliance_delays else 0.5)
+                self._sleep(1.2 if self.use_compliance_delays else 0.5)
                 # Try to click View more to load more listings
                 if self._click_view_more_if_present():
-                    time.sleep(0.8 if self.use_compliance_delays else 0.4)
+                    self._sleep(0.8 if self.use_compliance_delays else 0.4)
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(0.5 if self.use_compliance_delays else 0.3)
+                self._sleep(0.5 if self.use_compliance_delays else 0.3)
 
                 page_urls = self._extract_listing_links_from_page(seen)
                 listing_urls.extend(page_urls)
@@ -1098,6 +1676,8 @@ class HarajScraperSelenium:
             seen.update(listing_urls)
 
             print(f"Page {page}: total {len(listing_urls)} URLs")
+            if frontier is not None:
+                frontier.add_urls(listing_urls[:target_count] if target_count else listing_urls)
 
             if target_count and len(listing_urls) >= target_count:
                 listing_urls = listing_urls[:target_count]
@@ -1108,10 +1688,10 @@ class HarajScraperSelenium:
                 break
 
             if page == 1 and not listing_urls:
-                time.sleep(2)
+                self._sleep(2)
                 for _ in range(5):
                     self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(1)
+                    self._sleep(1)
                     self._click_view_more_if_present()
                 page_urls = self._extract_listing_links_from_page(seen)
                 listing_urls.extend(page_urls)
@@ -1120,37 +1700,116 @@ class HarajScraperSelenium:
                 if not listing_urls:
                     break
 
-            if self.use_compliance_delays:
-                time.sleep(random.uniform(2, 4))
-            else:
-                time.sleep(random.uniform(0.3, 0.6))
+            self._sleep(self.rate_controller.time_until_next_request())
 
         if target_count and len(listing_urls) > target_count:
             listing_urls = listing_urls[:target_count]
         return listing_urls
     
-    def scrape_category(self, category_url: str, max_listings: int = 50, max_pages: int = 10) -> List[Dict]:
-        """Scrape all listings from a category"""
+    def scrape_category(self, category_url: str, max_listings: int = 50, max_pages: int = 10,
+                        sink: Optional[ListingSink] = None, frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """
+        Scrape all listings from a category.
+        With a sink, each listing is persisted as soon as it is scraped and not kept in memory
+        (the returned list is then empty; see sink.count).
+        With a frontier, the job resumes where a previous (crashed or stopped) run of it stopped.
+        """
         print(f"Scraping category: {category_url}")
-        
-        listing_urls = self.find_listing_urls(category_url, max_pages=max_pages, target_count=max_listings)
-        listing_urls = listing_urls[:max_listings]
-        
-        print(f"Found {len(listing_urls)} listings to scrape")
+        if frontier is not None:
+            return self._scrape_category_frontier(category_url, max_listings, max_pages, sink, frontier)
         
         all_listings = []
-        for idx, url in enumerate(listing_urls, 1):
-            print(f"\n[{idx}/{len(listing_urls)}]")
-            listing_data = self.scrape_listing(url)
-            if listing_data:
-                all_listings.append(listing_data)
-            
-            # Minimal delay between listings for maximum speed
-            if idx < len(listing_urls):
-                time.sleep(random.uniform(0.1, 0.3))  # Ultra fast
+        try:
+            listing_urls = self.find_listing_urls(category_url, max_pages=max_pages, target_count=max_listings)
+            listing_urls = listing_urls[:max_listings]
+
+            print(f"Found {len(listing_urls)} listings to scrape")
+
+            for idx, url in enumerate(listing_urls, 1):
+                print(f"\n[{idx}/{len(listing_urls)}]")
+                self.prefetch(listing_urls[idx:idx + self.prefetch_tabs - 1])
+                listing_data = self.scrape_listing(url)
+                if listing_data:
+                    if sink is not None:
+                        sink.write(listing_data)
+                    else:
+                        all_listings.append(listing_data)
+
+                # Minimal delay between listings for maximum speed
+                if idx < len(listing_urls):
+                    self._sleep(random.uniform(0.1, 0.3))  # Ultra fast
+        except ScrapeCancelled:
+            print("Scraping stopped: returning listings scraped so far")
         
         return all_listings
     
+    def _scrape_category_frontier(self, category_url: str, max_listings: int, max_pages: int,
+                                  sink: Optional[ListingSink], frontier: CrawlFrontier) -> List[Dict]:
+        """
+        scrape_category driven by a durable frontier: claim URL, scrape, mark done/failed.
+        With a sink, URLs are marked done only once their listing has been flushed to storage.
+        """
+        if frontier.is_complete():
+            # Previous run of this job finished: start a fresh crawl
+            frontier.reset()
+        requeued = frontier.recover()
+        if requeued:
+            print(f"Resuming job '{frontier.job_name}': {requeued} URLs requeued")
+        if not frontier.is_discovered():
+            try:
+                self.find_listing_urls(category_url, max_pages=max_pages, target_count=max_listings, frontier=frontier)
+            except ScrapeCancelled:
+                print("Scraping stopped during discovery")
+                return []
+
+        counts = frontier.counts()
+        total = sum(counts.values())
+        print(f"Job '{frontier.job_name}': {counts['pending']} of {total} listings left to scrape")
+
+        all_listings = []
+        if sink is not None:
+            previous_on_flush = sink.on_flush
+
+            def _mark_flushed_done(batch):
+                for L in batch:
+                    if L.get('url'):
+                        frontier.mark_done(L['url'])
+                if previous_on_flush:
+                    previous_on_flush(batch)
+
+            sink.on_flush = _mark_flushed_done
+        try:
+            # Failed URLs are retried after the main pass, with backoff between retry rounds
+            for url, retry_round in claim_with_retries(frontier, self._sleep):
+                if self.cancel_token.cancelled:
+                    break
+                if retry_round:
+                    print(f"\n[retry {retry_round}]")
+                else:
+                    print(f"\n[{total - frontier.counts()['pending']}/{total}]")
+                self.prefetch(frontier.peek_pending(self.prefetch_tabs - 1))
+                try:
+                    listing_data = self.scrape_listing(url)
+                except Exception as e:
+                    frontier.mark_failed(url, str(e))
+                    continue
+                if not listing_data:
+                    frontier.mark_failed(url, self.last_error or 'no data extracted')
+                    continue
+                # Frontier URL and listing url must match for the on_flush bookkeeping
+                listing_data['url'] = url
+                if sink is not None:
+                    sink.write(listing_data)
+                else:
+                    all_listings.append(listing_data)
+                    frontier.mark_done(url)
+                self._sleep(random.uniform(0.1, 0.3))
+        except ScrapeCancelled:
+            # The interrupted URL stays in_progress and is requeued by recover() on the next run
+            print(f"Job '{frontier.job_name}' stopped: progress saved, rerun to resume")
+
+        return all_listings
+
     def save_to_json(self, data: List[Dict], filename: str = "listings.json"):
         """Save scraped data to JSON file"""
         filepath = self.output_dir / filename
@@ -1219,10 +1878,138 @@ class HarajScraperSelenium:
         
         print(f"CSV saved to {filepath}")
     
+    def _configure_driver(self):
+        """Waits and timeouts of a new driver, plus the CDP metrics the watchdog samples."""
+        self.driver.implicitly_wait(3)  # Reduced for speed
+        # page_load_strategy 'none' returns from get() at once; _load enforces the load deadline itself
+        self.driver.set_page_load_timeout(self.page_load_timeout)
+        self.driver.set_script_timeout(SCRIPT_TIMEOUT)
+        try:
+            self.driver.execute_cdp_cmd('Performance.enable', {})
+        except Exception:
+            pass
+
+    def _stop_page(self):
+        try:
+            self.driver.execute_script("window.stop();")
+        except Exception:
+            pass
+
+    def _kill_browser(self):
+        """HangSupervisor callback: kill chromedriver and Chrome so the blocked driver call fails."""
+        pid = self._driver_pid()
+        if pid:
+            kill_process_tree(pid)
+
+    def _driver_pid(self) -> Optional[int]:
+        try:
+            return self.driver.service.process.pid
+        except Exception:
+            return None
+
+    def browser_metrics(self) -> Dict:
+        """Memory watchdog stats: pages since launch, recycles, peak and latest memory sample."""
+        return self.watchdog.stats()
+
+    def _maybe_recycle(self) -> bool:
+        """
+        Restart Chrome between listings when the watchdog says it has grown too much (or a previous
+        restart failed). False if the new browser could not be started.
+        """
+        reason = self._restart_pending or self.watchdog.recycle_reason(self.driver, self._driver_pid())
+        return self._try_recycle(reason) if reason else True
+
+    def _try_recycle(self, reason: str) -> bool:
+        """recycle_driver; a failed relaunch sets last_error and is retried before the next listing."""
+        try:
+            self.recycle_driver(reason)
+        except Exception as e:
+            self._restart_pending = reason
+            self.last_error = f"browser restart failed: {e}"
+            print(f"  [Watchdog] {self.last_error}")
+            return False
+        self._restart_pending = None
+        return True
+
+    def recycle_driver(self, reason: str = 'requested'):
+        """
+        Replace the Chrome instance with a fresh one started with the same options, carrying over all
+        cookies (so the login survives). Memory held by the old browser is released with its processes.
+        """
+        latest = self.watchdog.samples[-1] if self.watchdog.samples else {}
+        print(f"  [Watchdog] Recycling browser: {reason} (last sample: {latest.get('rss_mb')} MB RSS, "
+              f"{latest.get('js_heap_mb')} MB JS heap)")
+        try:
+            cookies = self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        except Exception:
+            cookies = []
+        if not cookies and self.is_logged_in and self.cookie_jar is not None:
+            # Killed browser: fall back to the cookies saved at login
+            cookies = self.cookie_jar.load()
+        cookies = cdp_cookie_params(cookies)
+        self._close_cdp_tab()
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = webdriver.Chrome(service=Service(self._driver_path), options=self._chrome_options)
+        self._forget_tabs()
+        self._configure_driver()
+        if self.engine == 'cdp':
+            self._open_cdp_tab()
+        if cookies:
+            try:
+                self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+            except Exception as e:
+                print(f"  [Watchdog] Could not restore cookies: {e}")
+        self.watchdog.recycled()
+
+    def reset(self, cancel_token: Optional[CancelToken] = None, rate_budget=None, profile: Optional[str] = None,
+              contacts: Optional[str] = None, contact_db=None):
+        """
+        Prepare this (warm) browser for the next job instead of relaunching Chrome: extra tabs closed,
+        a blank page, cookies cleared unless logged in, per-job settings and counters replaced.
+        Raises if Chrome is no longer responding (the caller then starts a new browser).
+        """
+        cdp_target = self.cdp.target_id if self.cdp is not None else None
+        self._close_cdp_tab()
+        # Window handles are CDP target ids: skip the CDP tab that is closing already
+        handles = [h for h in self.driver.window_handles if h != cdp_target]
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self._forget_tabs()
+        self.driver.get('about:blank')
+        if not self.is_logged_in:
+            self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        self.cancel_token = cancel_token or CancelToken()
+        self.rate_budget = rate_budget if rate_budget is not None else shared_budget_from_env()
+        if profile is not None:
+            self.steps = profile_steps(profile)
+            self.profile = profile
+        if contacts is not None:
+            if contacts not in CONTACT_MODES:
+                raise ValueError(f"Unknown contact mode {contacts!r} (choose from {', '.join(CONTACT_MODES)})")
+            self.contacts = contacts
+        if contact_db is not None:
+            self.contact_db = contact_db
+        self.contact_cache = SellerContactCache(self.contact_db) if self.contacts != 'off' else None
+        self.listing_count = 0
+        if self.http is not None:
+            self.http.cancel_token = self.cancel_token
+            self.http.rate_budget = self.rate_budget
+        if self.engine == 'cdp':
+            self._open_cdp_tab()
+        return self
+
     def close(self):
         """Close the browser"""
+        self._close_cdp_tab()
         if self.driver:
             self.driver.quit()
+        if self.profile_slot is not None:
+            self.profile_slot.release()
 
 
 def main():
@@ -1236,30 +2023,104 @@ def main():
     parser.add_argument('--max-pages', type=int, default=10, help='Maximum number of pages to scrape')
     parser.add_argument('--no-images', action='store_true', help='Skip downloading images')
     parser.add_argument('--output-dir', type=str, default='scraped_data', help='Output directory')
+    parser.add_argument('--sink', action='append', choices=sorted(SINK_TYPES),
+                        help='Stream each listing to storage as it is scraped (repeatable: sqlite, jsonl, csv)')
     parser.add_argument('--no-headless', action='store_true', help='Run browser in visible mode')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--engine', choices=ENGINES + ('auto',), default=os.environ.get('HARAJ_ENGINE', DEFAULT_ENGINE),
+                        help='browser: render every page; hybrid: browser for login/contacts, HTTP for pages; '
+                             'cdp: render listing pages over the DevTools websocket instead of chromedriver; '
+                             'auto: HTTP scraper, browser only for page types that need it')
+    parser.add_argument('--contacts', choices=CONTACT_MODES, default=DEFAULT_CONTACT_MODE,
+                        help='inline: reveal phone numbers while scraping; deferred: leave them for --reveal-pending; '
+                             'off: no contacts (inline and deferred fill known sellers from the cache)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='Fields to extract: leads (title, price, city, seller, contact), catalog (no contact), full')
+    parser.add_argument('--prefetch-tabs', type=int, default=PREFETCH_TABS,
+                        help='Tabs to pipeline listing loads over: the next N-1 listings load while one is extracted')
+    parser.add_argument('--fresh-session', action='store_true',
+                        help='Start from a cold Chrome profile and ignore the saved login')
+    parser.add_argument('--reveal-pending', action='store_true',
+                        help='Reveal the contacts of listings stored in OUTPUT_DIR/listings.db that are still pending')
+    parser.add_argument('--job', type=str,
+                        help='Named job: persist discovered URLs and resume where a previous run stopped')
     
     args = parser.parse_args()
+
+    # First Ctrl+C stops gracefully (listings scraped so far are saved), a second one aborts
+    cancel_token = CancelToken()
+
+    def _handle_sigint(signum, frame):
+        if cancel_token.cancelled:
+            raise KeyboardInterrupt
+        print("\nStopping... (press Ctrl+C again to abort)")
+        cancel_token.cancel()
+
+    signal.signal(signal.SIGINT, _handle_sigint)
     
     # Initialize scraper
-    scraper = HarajScraperSelenium(
-        output_dir=args.output_dir,
-        download_images=not args.no_images,
-        headless=not args.no_headless
-    )
+    if args.engine == 'auto':
+        from haraj_scraper_auto import HarajScraperAuto
+        scraper = HarajScraperAuto(
+            output_dir=args.output_dir,
+            download_images=not args.no_images,
+            headless=not args.no_headless,
+            cancel_token=cancel_token,
+            parser=args.parser,
+            contacts=args.contacts,
+            profile=args.profile,
+            prefetch_tabs=args.prefetch_tabs
+        )
+    else:
+        scraper = HarajScraperSelenium(
+            output_dir=args.output_dir,
+            download_images=not args.no_images,
+            headless=not args.no_headless,
+            cancel_token=cancel_token,
+            parser=args.parser,
+            engine=args.engine,
+            contacts=args.contacts,
+            profile=args.profile,
+            persist_session=not args.fresh_session,
+            prefetch_tabs=args.prefetch_tabs
+        )
     
     try:
-        if args.url:
-            listing_data = scraper.scrape_listing(args.url)
+        if args.reveal_pending:
+            scraper.reveal_pending_contacts()
+        
+        elif args.url:
+            try:
+                listing_data = scraper.scrape_listing(args.url)
+            except ScrapeCancelled:
+                listing_data = None
             if listing_data:
                 scraper.save_to_json([listing_data], "single_listing.json")
                 scraper.save_to_csv([listing_data], "single_listing.csv")
                 print("\nScraping completed!")
         
         elif args.category:
+            frontier = CrawlFrontier(Path(args.output_dir) / "listings.db", args.job) if args.job else None
+            if frontier is not None and not args.sink:
+                # A resumable job needs its results on disk as they are produced
+                args.sink = ['sqlite']
+            if args.sink:
+                with open_sinks(args.sink, args.output_dir) as sink:
+                    scraper.scrape_category(
+                        args.category,
+                        max_listings=args.max_listings,
+                        max_pages=args.max_pages,
+                        sink=sink,
+                        frontier=frontier
+                    )
+                print(f"\nStreamed {sink.count} listings to {', '.join(args.sink)} in {args.output_dir}")
+                return
+            
             listings = scraper.scrape_category(
                 args.category,
                 max_listings=args.max_listings,
-                max_pages=args.max_pages
+                max_pages=args.max_pages,
+                frontier=frontier
             )
             
             if listings:
@@ -0,0 +1,70 @@
+"""
+HTML parser backends shared by the scrapers.
+    lxml        - lxml tree queried directly with XPath (fastest; used by the requests scraper's extractor)
+    bs4-lxml    - BeautifulSoup on top of the lxml parser
+    html.parser - BeautifulSoup with the pure-Python parser (the original behaviour, slowest)
+Raw response bytes are handed to the parser with the encoding declared, instead of being decoded
+to str first, so the text is decoded once, in C.
+"""
+
+import os
+from typing import List, Union
+
+from bs4 import BeautifulSoup
+import lxml.html
+
+PARSER_BACKENDS = ('lxml', 'bs4-lxml', 'html.parser')
+DEFAULT_PARSER = os.environ.get('HARAJ_PARSER', 'lxml')
+PAGE_ENCODING = 'utf-8'
+
+# Elements whose text BeautifulSoup.get_text() leaves out
+_NON_TEXT_TAGS = ('script', 'style', 'template')
+_HTML_PARSER = lxml.html.HTMLParser(encoding=PAGE_ENCODING)
+
+
+def check_backend(backend: str) -> str:
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r} (choose from {', '.join(PARSER_BACKENDS)})")
+    return backend
+
+
+def soup_features(backend: str) -> str:
+    """BeautifulSoup tree builder for a backend (the lxml backend uses lxml under BeautifulSoup too)."""
+    return 'html.parser' if check_backend(backend) == 'html.parser' else 'lxml'
+
+
+def make_soup(html: Union[bytes, str], backend: str = DEFAULT_PARSER) -> BeautifulSoup:
+    """BeautifulSoup for raw page bytes (encoding declared, no sniffing) or an already decoded str."""
+    if isinstance(html, bytes):
+        return BeautifulSoup(html, soup_features(backend), from_encoding=PAGE_ENCODING)
+    return BeautifulSoup(html, soup_features(backend))
+
+
+def make_tree(html: Union[bytes, str]):
+    """lxml document for raw page bytes; None for an empty page."""
+    if not html or not html.strip():
+        return None
+    if isinstance(html, str):
+        html = html.encode(PAGE_ENCODING)
+    return lxml.html.document_fromstring(html, parser=_HTML_PARSER)
+
+
+def node_text(elem) -> str:
+    """Same as BeautifulSoup's elem.get_text(strip=True): stripped text pieces joined without separator."""
+    pieces = elem.xpath('.//text()[not(parent::script or parent::style or parent::template)]')
+    return ''.join(piece.strip() for piece in pieces if piece.strip())
+
+
+def all_strings(tree) -> List[str]:
+    """Every text node and comment in document order, like the strings soup.find(string=...) searches."""
+    return [
+        node if isinstance(node, str) else (node.text or '')
+        for node in tree.xpath('//text() | //comment()')
+    ]
+
+
+def page_text(tree) -> str:
+    """Same as BeautifulSoup's soup.get_text(): all text except script/style/template and comments."""
+    return ''.join(tree.xpath(
+        '//text()[not(parent::script or parent::style or parent::template)]'
+    ))
@@ -0,0 +1,76 @@
+"""
+HTTP side of the hybrid engine.
+The browser logs in and loads the site once; its cookies and the auth headers seen on the site's own
+XHR/fetch calls (Chrome performance log = CDP Network events) are copied into a pooled requests
+session, which then fetches listing pages without rendering them.
+"""
+
+import json
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Request headers that carry a session/auth token on the site's API calls
+TOKEN_HEADERS = ('authorization', 'x-access-token', 'x-auth-token', 'x-csrf-token', 'x-xsrf-token', 'token')
+
+
+def pooled_session(user_agent: str, pool_size: int = 8) -> requests.Session:
+    """requests session keeping up to pool_size keep-alive connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': user_agent,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'ar,en-US;q=0.7,en;q=0.3',
+    })
+    return session
+
+
+def copy_browser_cookies(driver, session: requests.Session) -> int:
+    """Copy the browser's cookies for the current site into session; returns how many were copied."""
+    cookies = driver.get_cookies()
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return len(cookies)
+
+
+def capture_api_calls(driver, host: str) -> List[Dict]:
+    """
+    XHR/fetch requests the page made to host (or its subdomains) since the last call, from Chrome's
+    performance log (needs the goog:loggingPrefs performance capability). Each: url, method, headers.
+    """
+    try:
+        entries = driver.get_log('performance')
+    except Exception:
+        return []
+    calls = []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        if message.get('method') != 'Network.requestWillBeSent':
+            continue
+        params = message.get('params', {})
+        if params.get('type') not in ('XHR', 'Fetch'):
+            continue
+        request = params.get('request', {})
+        url = request.get('url', '')
+        netloc = urlparse(url).netloc
+        if netloc == host or netloc.endswith('.' + host):
+            calls.append({'url': url, 'method': request.get('method', 'GET'), 'headers': request.get('headers', {})})
+    return calls
+
+
+def token_headers(calls: List[Dict]) -> Dict[str, str]:
+    """Auth/token headers sent on the captured API calls (the latest value wins)."""
+    headers = {}
+    for call in calls:
+        for name, value in call['headers'].items():
+            if name.lower() in TOKEN_HEADERS and value:
+                headers[name] = value
+    return headers
@@ -0,0 +1,496 @@
+"""
+SQLite-backed scrape job queue.
+Jobs, their progress and results live in the listings DB, so every gunicorn worker (and any
+separate scraping process) sees the same status, and several jobs can run at once up to a
+global concurrency limit.
+"""
+
+import json
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from listing_store import connect
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Columns a running job may update through JobStatus / JobQueue.update
+_STATUS_FIELDS = ('progress', 'total', 'saved', 'current_listing', 'error')
+
+
+def init_jobs_db(db_path):
+    """Create the scrape_jobs table if it does not exist."""
+    conn = connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_jobs (
+                job_id TEXT PRIMARY KEY,
+                job_name TEXT,
+                category_url TEXT,
+                max_listings INTEGER,
+                options TEXT DEFAULT '{}',
+                state TEXT NOT NULL DEFAULT 'queued',
+                progress INTEGER DEFAULT 0,
+                total INTEGER DEFAULT 0,
+                saved INTEGER DEFAULT 0,
+                current_listing TEXT DEFAULT '',
+                error TEXT,
+                cancel_requested INTEGER DEFAULT 0,
+                worker_id TEXT,
+                created_at TEXT DEFAULT (datetime('now')),
+                started_at TEXT,
+                finished_at TEXT,
+                heartbeat_at TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_state ON scrape_jobs (state, created_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_workers (
+                worker_id TEXT PRIMARY KEY,
+                host TEXT,
+                pid INTEGER,
+                running_jobs INTEGER DEFAULT 0,
+                max_jobs INTEGER DEFAULT 1,
+                started_at TEXT DEFAULT (datetime('now')),
+                heartbeat_at TEXT DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT,
+                event TEXT NOT NULL,
+                data TEXT,
+                created_at TEXT DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_events_job ON scrape_events (job_id, event_id)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def default_worker_id() -> str:
+    """host:pid:thread identifier recorded on claimed jobs."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class JobQueue:
+    """Persistent FIFO of scrape jobs with per-job status and cooperative cancellation."""
+
+    def __init__(self, db_path, max_concurrency: int = 1):
+        self.db_path = db_path
+        self.max_concurrency = max(1, int(max_concurrency))
+        init_jobs_db(db_path)
+
+    def _row_to_job(self, cur, row) -> Dict:
+        return {d[0]: row[i] for i, d in enumerate(cur.description)}
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        conn = connect(self.db_path)
+        try:
+            cur = conn.execute(sql, params)
+            return [self._row_to_job(cur, row) for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def _update(self, sql: str, params=()) -> int:
+        conn = connect(self.db_path)
+        try:
+            cur = conn.execute(sql, params)
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def _write_job(self, sql: str, params, job_ids, event: str = 'job') -> int:
+        """Run an UPDATE and, in the same transaction, publish the new status of job_ids as `event`."""
+        conn = connect(self.db_path)
+        try:
+            cur = conn.execute(sql, params)
+            if cur.rowcount:
+                for job_id in job_ids:
+                    self._publish_status(conn, job_id, event)
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def _publish_status(self, conn, job_id: str, event: str):
+        cur = conn.execute("SELECT * FROM scrape_jobs WHERE job_id = ?", (job_id,))
+        row = cur.fetchone()
+        if row:
+            data = job_to_status(self._row_to_job(cur, row))
+            conn.execute("INSERT INTO scrape_events (job_id, event, data) VALUES (?, ?, ?)",
+                         (job_id, event, json.dumps(data, ensure_ascii=False)))
+
+    def enqueue(self, category_url: str, max_listings: int, job_name: Optional[str] = None,
+                options: str = '{}', unique: bool = False) -> Optional[Dict]:
+        """
+        Add a job in state queued and return it. unique: return None instead if a job with this
+        job_name is already queued or running (checked and inserted in one transaction).
+        """
+        job_id = uuid.uuid4().hex[:12]
+        conn = connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if unique and conn.execute(
+                    "SELECT 1 FROM scrape_jobs WHERE job_name = ? AND state IN (?, ?) LIMIT 1",
+                    (job_name, *ACTIVE_STATES)).fetchone():
+                conn.commit()
+                return None
+            conn.execute(
+                "INSERT INTO scrape_jobs (job_id, job_name, category_url, max_listings, options, total, current_listing) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'Queued')",
+                (job_id, job_name, category_url, int(max_listings), options, int(max_listings))
+            )
+            self._publish_status(conn, job_id, 'job')
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM scrape_jobs WHERE job_id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def list_jobs(self, limit: int = 20, states: Optional[tuple] = None) -> List[Dict]:
+        """Most recent jobs first, optionally filtered by state."""
+        if states:
+            marks = ','.join('?' * len(states))
+            return self._query(
+                f"SELECT * FROM scrape_jobs WHERE state IN ({marks}) ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                (*states, limit)
+            )
+        return self._query("SELECT * FROM scrape_jobs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,))
+
+    def jobs_with_prefix(self, prefix: str) -> List[Dict]:
+        """All jobs whose job_name starts with prefix (e.g. the partitions of a fan-out crawl), oldest first."""
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._query(
+            "SELECT * FROM scrape_jobs WHERE job_name LIKE ? ESCAPE '\\' ORDER BY created_at, rowid", (pattern,)
+        )
+
+    def active_job_for(self, job_name: str) -> Optional[Dict]:
+        """Queued or running job with this name, if any."""
+        rows = self._query(
+            "SELECT * FROM scrape_jobs WHERE job_name = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+            (job_name, *ACTIVE_STATES)
+        )
+        return rows[0] if rows else None
+
+    def claim_next(self, worker_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Atomically move the oldest queued job to running, unless max_concurrency jobs are already
+        running (across all processes). Jobs whose job_name is already running wait, since they would
+        share its crawl frontier. Returns the claimed job or None.
+        """
+        worker_id = worker_id or default_worker_id()
+        conn = connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            running = conn.execute("SELECT COUNT(*) FROM scrape_jobs WHERE state = ?", (RUNNING,)).fetchone()[0]
+            if running >= self.max_concurrency:
+                conn.commit()
+                return None
+            row = conn.execute(
+                "SELECT job_id FROM scrape_jobs WHERE state = ? AND cancel_requested = 0 "
+                "AND (job_name IS NULL OR job_name NOT IN "
+                "(SELECT job_name FROM scrape_jobs WHERE state = ? AND job_name IS NOT NULL)) "
+                "ORDER BY created_at, rowid LIMIT 1", (QUEUED, RUNNING)
+            ).fetchone()
+            if not row:
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE scrape_jobs SET state = ?, worker_id = ?, started_at = datetime('now'), "
+                "heartbeat_at = datetime('now'), current_listing = 'Starting...' WHERE job_id = ?",
+                (RUNNING, worker_id, row[0])
+            )
+            self._publish_status(conn, row[0], 'job')
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(row[0])
+
+    def update(self, job_id: str, **fields):
+        """Update progress fields of a job (published as a progress event) and refresh its heartbeat."""
+        fields = {k: v for k, v in fields.items() if k in _STATUS_FIELDS}
+        assignments = ''.join(f"{k} = ?, " for k in fields)
+        self._write_job(
+            f"UPDATE scrape_jobs SET {assignments}heartbeat_at = datetime('now') WHERE job_id = ?",
+            (*fields.values(), job_id), [job_id] if fields else [], 'progress'
+        )
+
+    def heartbeat(self, job_id: str):
+        self.update(job_id)
+
+    def finish(self, job_id: str, state: str, error: Optional[str] = None):
+        """Move a job to a terminal state (completed / failed / cancelled)."""
+        self._write_job(
+            "UPDATE scrape_jobs SET state = ?, error = COALESCE(?, error), finished_at = datetime('now'), "
+            "heartbeat_at = datetime('now') WHERE job_id = ?",
+            (state, error, job_id), [job_id]
+        )
+
+    def request_cancel(self, job_id: Optional[str] = None) -> int:
+        """Ask one job (or all active jobs) to stop. Queued jobs are cancelled immediately."""
+        where, params = ("job_id = ? AND ", (job_id,)) if job_id else ("", ())
+        queued = [j['job_id'] for j in self._query(
+            f"SELECT job_id FROM scrape_jobs WHERE {where}state = ?", (*params, QUEUED)
+        )]
+        n = self._update(
+            f"UPDATE scrape_jobs SET cancel_requested = 1 WHERE {where}state IN (?, ?)", (*params, *ACTIVE_STATES)
+        )
+        self._write_job(
+            f"UPDATE scrape_jobs SET state = ?, finished_at = datetime('now'), current_listing = 'Cancelled' "
+            f"WHERE {where}state = ?", (CANCELLED, *params, QUEUED), queued
+        )
+        return n
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        rows = self._query("SELECT cancel_requested FROM scrape_jobs WHERE job_id = ?", (job_id,))
+        return bool(rows and rows[0]['cancel_requested'])
+
+    def requeue(self, job_id: str, reason: str = 'Requeued'):
+        """Put a running job back in the queue (e.g. its worker is shutting down); it resumes via its frontier."""
+        self._write_job(
+            "UPDATE scrape_jobs SET state = ?, worker_id = NULL, current_listing = ? WHERE job_id = ? AND state = ?",
+            (QUEUED, reason, job_id, RUNNING), [job_id]
+        )
+
+    def publish(self, job_id: Optional[str], event: str, data: Dict) -> int:
+        """Append an event (e.g. a scraped listing or a new lead) to the job's event stream. Returns its id."""
+        conn = connect(self.db_path)
+        try:
+            cur = conn.execute("INSERT INTO scrape_events (job_id, event, data) VALUES (?, ?, ?)",
+                               (job_id, event, json.dumps(data, ensure_ascii=False)))
+            conn.commit()
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def events_since(self, last_event_id: int = 0, job_id: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        """Events after last_event_id (oldest first), optionally for one job only; `data` is decoded."""
+        if job_id:
+            rows = self._query(
+                "SELECT * FROM scrape_events WHERE event_id > ? AND job_id = ? ORDER BY event_id LIMIT ?",
+                (int(last_event_id), job_id, limit)
+            )
+        else:
+            rows = self._query(
+                "SELECT * FROM scrape_events WHERE event_id > ? ORDER BY event_id LIMIT ?", (int(last_event_id), limit)
+            )
+        for row in rows:
+            row['data'] = json.loads(row['data'] or '{}')
+        return rows
+
+    def last_event_id(self) -> int:
+        return self._query("SELECT COALESCE(MAX(event_id), 0) AS n FROM scrape_events")[0]['n']
+
+    def prune_events(self, keep_seconds: int = 3600) -> int:
+        """Drop events older than keep_seconds (clients resuming from before that get a fresh snapshot)."""
+        return self._update(
+            "DELETE FROM scrape_events WHERE created_at < datetime('now', ?)", (f'-{int(keep_seconds)} seconds',)
+        )
+
+    def worker_heartbeat(self, worker_id: str, running_jobs: int, max_jobs: int):
+        """Register or refresh a scraping worker process."""
+        self._update(
+            "INSERT INTO scrape_workers (worker_id, host, pid, running_jobs, max_jobs) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET running_jobs = excluded.running_jobs, "
+            "max_jobs = excluded.max_jobs, heartbeat_at = datetime('now')",
+            (worker_id, socket.gethostname(), os.getpid(), running_jobs, max_jobs)
+        )
+
+    def remove_worker(self, worker_id: str):
+        self._update("DELETE FROM scrape_workers WHERE worker_id = ?", (worker_id,))
+
+    def live_workers(self, timeout_seconds: int = 60) -> List[Dict]:
+        """Worker processes that sent a heartbeat within timeout_seconds."""
+        return self._query(
+            "SELECT * FROM scrape_workers WHERE heartbeat_at >= datetime('now', ?) ORDER BY started_at",
+            (f'-{int(timeout_seconds)} seconds',)
+        )
+
+    def requeue_stale(self, timeout_seconds: int = 300) -> int:
+        """
+        Running jobs whose worker stopped sending heartbeats (process killed or recycled) go back
+        to queued; their crawl frontier lets the next worker resume them. A 'job' event is published
+        for each.
+        """
+        conn = connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            stale = [row[0] for row in conn.execute(
+                "SELECT job_id FROM scrape_jobs WHERE state = ? AND heartbeat_at < datetime('now', ?)",
+                (RUNNING, f'-{int(timeout_seconds)} seconds')
+            ).fetchall()]
+            for job_id in stale:
+                conn.execute(
+                    "UPDATE scrape_jobs SET state = ?, worker_id = NULL, current_listing = 'Requeued after worker loss' "
+                    "WHERE job_id = ?", (QUEUED, job_id)
+                )
+                self._publish_status(conn, job_id, 'job')
+            conn.commit()
+        finally:
+            conn.close()
+        return len(stale)
+
+
+class JobStatus(dict):
+    """
+    Status dict for one job that writes every change through to the queue, so the existing
+    `status['progress'] = ...` style of run_scraper updates shared state visible to all processes.
+    """
+
+    def __init__(self, queue: JobQueue, job_id: str, stop_event: Optional[threading.Event] = None, **initial):
+        super().__init__(initial)
+        self.queue = queue
+        self.job_id = job_id
+        # Set by the owning worker on shutdown: stop like a cancel, but the job is requeued
+        self.stop_event = stop_event or threading.Event()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key in _STATUS_FIELDS:
+            self.queue.update(self.job_id, **{key: value})
+
+    def cancel_requested(self) -> bool:
+        return self.stop_event.is_set() or self.queue.is_cancel_requested(self.job_id)
+
+    def publish(self, event: str, data: Dict):
+        """Push an event to clients following this job (see /api/scraping-events)."""
+        self.queue.publish(self.job_id, event, data)
+
+
+def job_to_status(job: Optional[Dict]) -> Dict:
+    """API representation of a job (keeps the old scraping_status keys)."""
+    if not job:
+        return {'is_running': False, 'progress': 0, 'total': 0, 'current_listing': '', 'saved': 0, 'error': None}
+    return {
+        'job_id': job['job_id'],
+        'job_name': job['job_name'],
+        'category_url': job['category_url'],
+        'state': job['state'],
+        'is_running': job['state'] in ACTIVE_STATES,
+        'progress': job['progress'] or 0,
+        'total': job['total'] or 0,
+        'saved': job['saved'] or 0,
+        'current_listing': job['current_listing'] or '',
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
+
+
+class JobDispatcher:
+    """
+    Background thread that claims queued jobs and runs each in its own thread via
+    `runner(job, shutdown_event)`. The global concurrency limit is enforced by JobQueue.claim_next,
+    so several dispatchers (gunicorn workers or scrape_worker.py processes) never exceed it together;
+    `max_local` additionally caps the jobs run by this process.
+    """
+
+    def __init__(self, queue: JobQueue, runner: Callable[[Dict, threading.Event], None],
+                 poll_interval: float = 2.0, stale_timeout: int = 300, max_local: Optional[int] = None,
+                 worker_id: Optional[str] = None):
+        self.queue = queue
+        self.runner = runner
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.max_local = max_local
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.shutdown = threading.Event()
+        self._running = {}
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                self._wake.set()
+                return
+            self.shutdown.clear()
+            self._thread = threading.Thread(target=self._loop, name='scrape-dispatcher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check the queue now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def running_jobs(self) -> List[str]:
+        with self._lock:
+            return list(self._running)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming jobs, ask running jobs to stop (they are requeued) and wait for them."""
+        self.shutdown.set()
+        self._wake.set()
+        with self._lock:
+            threads = list(self._running.values())
+        for t in threads:
+            t.join(timeout)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run_job(self, job: Dict):
+        # Heartbeat even during long phases without status writes (e.g. URL discovery)
+        done = threading.Event()
+
+        def _beat():
+            while not done.wait(30):
+                try:
+                    self.queue.heartbeat(job['job_id'])
+                except Exception:
+                    pass
+
+        threading.Thread(target=_beat, name=f"heartbeat-{job['job_id']}", daemon=True).start()
+        try:
+            self.runner(job, self.shutdown)
+        except Exception as e:
+            print(f"Job {job['job_id']} crashed: {e}")
+            self.queue.finish(job['job_id'], FAILED, str(e)[:1000])
+        finally:
+            done.set()
+            with self._lock:
+                self._running.pop(job['job_id'], None)
+            self._wake.set()
+
+    def _has_capacity(self) -> bool:
+        with self._lock:
+            return self.max_local is None or len(self._running) < self.max_local
+
+    def _loop(self):
+        while not self.shutdown.is_set():
+            try:
+                self.queue.requeue_stale(self.stale_timeout)
+                self.queue.prune_events()
+                while self._has_capacity() and not self.shutdown.is_set():
+                    job = self.queue.claim_next(self.worker_id)
+                    if not job:
+                        break
+                    t = threading.Thread(target=self._run_job, args=(job,), name=f"scrape-{job['job_id']}",
+                                         daemon=True)
+                    with self._lock:
+                        self._running[job['job_id']] = t
+                    t.start()
+                self.queue.worker_heartbeat(self.worker_id, len(self.running_jobs()), self.max_local or 0)
+            except Exception as e:
+                print(f"Job dispatcher error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+        try:
+            self.queue.remove_worker(self.worker_id)
+        except Exception:
+            pass
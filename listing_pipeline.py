@@ -0,0 +1,166 @@
+"""
+Staged listing pipeline: fetch -> parse -> enrich -> store.
+Stages run concurrently and are connected by bounded queues (a slow stage makes the earlier ones
+wait instead of piling up pages in memory). Fetching stays on a thread, HTML parsing and field
+extraction run in a ProcessPoolExecutor so parse throughput scales with cores, and a single writer
+(the calling thread) persists results in fetch order.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from cancellation import CancelToken, ScrapeCancelled
+
+_DONE = object()
+
+
+def _completed(fn, *args) -> Future:
+    """Run fn inline and wrap its outcome in a Future (parse_workers=0)."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class ListingPipeline:
+    """
+    fetch(url) -> bytes or None      (thread; rate limiting / politeness live here)
+    parse(html, url) -> dict         (process pool; must be a picklable top-level function)
+    enrich(listing) -> dict          (thread; e.g. image downloads)
+    store(listing)                   (calling thread; the single writer)
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[bytes]], parse: Callable[[bytes, str], Dict],
+                 store: Callable[[Dict], None], enrich: Optional[Callable[[Dict], Dict]] = None,
+                 parse_workers: int = 2, queue_size: int = 8, cancel_token: Optional[CancelToken] = None):
+        self.fetch = fetch
+        self.parse = parse
+        self.store = store
+        self.enrich = enrich
+        self.parse_workers = max(0, int(parse_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.cancel_token = cancel_token or CancelToken()
+        self.stats = {'fetched': 0, 'fetch_failed': 0, 'parse_failed': 0, 'stored': 0}
+        self._errors = []
+
+    def _put(self, q: queue.Queue, item):
+        """Blocking put (backpressure) that gives up when the run is being torn down after an error."""
+        while True:
+            try:
+                q.put(item, timeout=0.25)
+                return
+            except queue.Full:
+                if self._errors:
+                    raise ScrapeCancelled()
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that ends the stage when the run is being torn down after an error."""
+        while True:
+            try:
+                return q.get(timeout=0.25)
+            except queue.Empty:
+                if self._errors:
+                    return _DONE
+
+    def _finish(self, out: queue.Queue):
+        try:
+            self._put(out, _DONE)
+        except ScrapeCancelled:
+            pass
+
+    def _fetch_stage(self, urls: Iterable[str], out: queue.Queue):
+        try:
+            for url in urls:
+                if self.cancel_token.cancelled or self._errors:
+                    break
+                html = self.fetch(url)
+                if html is None:
+                    self.stats['fetch_failed'] += 1
+                    continue
+                self.stats['fetched'] += 1
+                self._put(out, (url, html))
+        except ScrapeCancelled:
+            pass
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._finish(out)
+
+    def _parse_stage(self, inq: queue.Queue, out: queue.Queue, pool):
+        try:
+            while True:
+                item = self._get(inq)
+                if item is _DONE:
+                    break
+                url, html = item
+                future = pool.submit(self.parse, html, url) if pool else _completed(self.parse, html, url)
+                # Bounded queue of futures = bounded number of pages parsed ahead of the writer
+                self._put(out, (url, future))
+        except ScrapeCancelled:
+            pass
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._finish(out)
+
+    def _enrich_stage(self, inq: queue.Queue, out: queue.Queue):
+        try:
+            while True:
+                item = self._get(inq)
+                if item is _DONE:
+                    break
+                url, future = item
+                try:
+                    listing = future.result()
+                except Exception as e:
+                    print(f"  Parse failed for {url}: {e}")
+                    self.stats['parse_failed'] += 1
+                    continue
+                if self.enrich is not None:
+                    listing = self.enrich(listing)
+                self._put(out, listing)
+        except ScrapeCancelled:
+            pass
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._finish(out)
+
+    def run(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Process all urls; returns stage counters. Stops early (keeping what was stored) on cancel."""
+        fetched = queue.Queue(self.queue_size)
+        parsed = queue.Queue(self.queue_size)
+        enriched = queue.Queue(self.queue_size)
+        pool = ProcessPoolExecutor(max_workers=self.parse_workers) if self.parse_workers else None
+        threads = [
+            threading.Thread(target=self._fetch_stage, args=(urls, fetched), name='pipeline-fetch', daemon=True),
+            threading.Thread(target=self._parse_stage, args=(fetched, parsed, pool), name='pipeline-parse',
+                             daemon=True),
+            threading.Thread(target=self._enrich_stage, args=(parsed, enriched), name='pipeline-enrich',
+                             daemon=True),
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                listing = self._get(enriched)
+                if listing is _DONE:
+                    break
+                self.store(listing)
+                self.stats['stored'] += 1
+        except BaseException as e:
+            self._errors.append(e)
+            raise
+        finally:
+            for t in threads:
+                t.join()
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
@@ -0,0 +1,483 @@
+"""
+SQLite listing store for scraped Haraj leads.
+The DB is the single source of truth; JSON/CSV files are derived snapshots
+that are regenerated only when the DB has changed since the last export.
+Streaming sinks persist listings one by one while a scrape is still running.
+"""
+
+import abc
+import csv
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+CSV_FIELDNAMES = [
+    'listing_id', 'title', 'description', 'price', 'city', 'location',
+    'posted_time', 'seller_name', 'seller_url', 'category',
+    'url', 'image_count', 'tags', 'phone_number', 'whatsapp_number', 'email'
+]
+
+
+def connect(db_path) -> sqlite3.Connection:
+    """Open the listings DB (waits on locks held by other processes instead of failing)."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    return sqlite3.connect(str(db_path), timeout=30)
+
+
+def init_db(db_path):
+    """Create the listings and store_meta tables if they do not exist."""
+    conn = connect(db_path)
+    try:
+        # WAL lets the dashboard read while a scrape is streaming writes into the DB
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                listing_id TEXT PRIMARY KEY,
+                url TEXT,
+                data TEXT NOT NULL,
+                updated_at TEXT DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def listing_pk(listing: Dict) -> str:
+    """Primary key for a listing: its listing_id, or a key derived from the URL."""
+    lid = (str(listing.get('listing_id') or '')).strip()
+    if lid:
+        return lid
+    url = (listing.get('url') or '').strip()
+    return 'url_' + re.sub(r'[^\w\-.]', '_', url[:120])
+
+
+def _bump_version(conn: sqlite3.Connection):
+    conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('listings_version', '0')")
+    conn.execute(
+        "UPDATE store_meta SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT) WHERE key = 'listings_version'"
+    )
+
+
+def _upsert_rows(conn: sqlite3.Connection, listings: Iterable[Dict]) -> int:
+    count = 0
+    for L in listings:
+        url = (L.get('url') or '').strip()[:2000]
+        # Updated in place (not INSERT OR REPLACE), so a re-scraped listing keeps its rowid and position
+        conn.execute(
+            "INSERT INTO listings (listing_id, url, data, updated_at) VALUES (?, ?, ?, datetime('now')) "
+            "ON CONFLICT(listing_id) DO UPDATE SET url = excluded.url, data = excluded.data, "
+            "updated_at = excluded.updated_at",
+            (listing_pk(L), url or None, json.dumps(L, ensure_ascii=False))
+        )
+        count += 1
+    if count:
+        _bump_version(conn)
+    return count
+
+
+def upsert_listings(db_path, listings: Iterable[Dict]) -> int:
+    """Insert or replace the given listings only (the delta). Returns number of rows written."""
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        count = _upsert_rows(conn, listings)
+        conn.commit()
+    finally:
+        conn.close()
+    return count
+
+
+def load_all_listings(db_path) -> List[Dict]:
+    """Load all listings from the DB in insertion order. Returns empty list on any error."""
+    if not Path(db_path).exists():
+        return []
+    try:
+        conn = connect(db_path)
+        try:
+            rows = conn.execute("SELECT data FROM listings ORDER BY rowid ASC").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return []
+    listings = []
+    for row in rows:
+        try:
+            listings.append(json.loads(row[0]))
+        except (json.JSONDecodeError, TypeError):
+            continue
+    return listings
+
+
+def known_listing_keys(db_path) -> Tuple[Set[str], Set[str]]:
+    """Return (listing ids, normalized urls) already stored, without loading listing data."""
+    ids, urls = set(), set()
+    if not Path(db_path).exists():
+        return ids, urls
+    try:
+        conn = connect(db_path)
+        try:
+            for pk, url in conn.execute("SELECT listing_id, url FROM listings"):
+                if pk:
+                    ids.add(str(pk))
+                if url:
+                    urls.add(url.strip().rstrip('/'))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+    return ids, urls
+
+
+def count_listings(db_path) -> int:
+    """Number of stored listings (0 if the DB does not exist yet)."""
+    if not Path(db_path).exists():
+        return 0
+    try:
+        conn = connect(db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return 0
+
+
+def get_meta(db_path, key: str, default: str = '') -> str:
+    """Read a value from store_meta."""
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row and row[0] is not None else default
+
+
+def set_meta(db_path, key: str, value: str):
+    """Write a value to store_meta."""
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, str(value)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def listings_version(db_path) -> int:
+    """Monotonic counter bumped on every write to the listings table."""
+    try:
+        return int(get_meta(db_path, 'listings_version', '0'))
+    except ValueError:
+        return 0
+
+
+def listing_csv_row(listing: Dict) -> Dict:
+    """Flatten a listing (including contact info) into a CSV row for CSV_FIELDNAMES."""
+    contact_info = listing.get('contact_info', {}) or {}
+    phone_numbers = contact_info.get('phone_numbers', [])
+    phone_number = ', '.join(phone_numbers) if phone_numbers else ''
+
+    # Extract WhatsApp number from link (e.g. wa.me/966501234567 or whatsapp://send?phone=966501234567)
+    whatsapp_number = ''
+    whatsapp_link = contact_info.get('whatsapp_link', '')
+    if whatsapp_link:
+        whatsapp_match = re.search(r'(?:wa\.me/|whatsapp.*phone=)(\d+)', whatsapp_link)
+        if whatsapp_match:
+            whatsapp_number = whatsapp_match.group(1)
+            # Remove country code if present
+            if whatsapp_number.startswith('966') and len(whatsapp_number) > 9:
+                whatsapp_number = whatsapp_number[3:]
+
+    emails = contact_info.get('emails', [])
+    email = ', '.join(emails) if emails else ''
+
+    return {
+        'listing_id': listing.get('listing_id', ''),
+        'title': listing.get('title', ''),
+        'description': listing.get('description', ''),
+        'price': listing.get('price', ''),
+        'city': listing.get('city', ''),
+        'location': listing.get('location', ''),
+        'posted_time': listing.get('posted_time', ''),
+        'seller_name': listing.get('seller_name', ''),
+        'seller_url': listing.get('seller_url', ''),
+        'category': listing.get('category', ''),
+        'url': listing.get('url', ''),
+        'image_count': len(listing.get('images', [])),
+        'tags': ', '.join(listing.get('tags', [])),
+        'phone_number': phone_number,
+        'whatsapp_number': whatsapp_number,
+        'email': email
+    }
+
+
+@contextmanager
+def _atomic_file(path: Path, **open_kwargs):
+    """
+    Text file written to a temp file of its own next to path, then moved over path. Unique temp names
+    keep concurrent writers (other processes exporting too) from writing into or replacing each other's file.
+    """
+    f = tempfile.NamedTemporaryFile('w', dir=str(path.parent), prefix=path.name + '.', suffix='.tmp',
+                                    delete=False, **open_kwargs)
+    try:
+        with f:
+            yield f
+        os.replace(f.name, str(path))
+    except BaseException:
+        try:
+            os.unlink(f.name)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_snapshot(listings: List[Dict], path):
+    """Write listings to a JSON file atomically (readers never see a half-written file)."""
+    path = Path(path)
+    with _atomic_file(path, encoding='utf-8') as f:
+        json.dump(listings, f, ensure_ascii=False, indent=2)
+
+
+def write_csv_snapshot(listings: List[Dict], path):
+    """Write listings to a CSV file (UTF-8 with BOM for Excel) atomically."""
+    path = Path(path)
+    with _atomic_file(path, newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+        for listing in listings:
+            writer.writerow(listing_csv_row(listing))
+
+
+class SnapshotExporter:
+    """Regenerates JSON/CSV snapshots from the DB on demand or on a schedule, only when stale."""
+
+    def __init__(self, db_path, json_path, csv_path, loader: Optional[Callable[[], List[Dict]]] = None):
+        self.db_path = Path(db_path)
+        self.json_path = Path(json_path)
+        self.csv_path = Path(csv_path)
+        self.loader = loader or (lambda: load_all_listings(self.db_path))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _meta_key(self, path: Path) -> str:
+        return f'snapshot_version:{path.name}'
+
+    def is_stale(self, path: Path) -> bool:
+        """True if the snapshot file is missing or was built from an older DB version."""
+        if not path.exists():
+            return True
+        return get_meta(self.db_path, self._meta_key(path), '') != str(listings_version(self.db_path))
+
+    def export(self, force: bool = False) -> bool:
+        """Rebuild stale snapshots. Returns True if any file was written."""
+        with self._lock:
+            targets = [p for p in (self.json_path, self.csv_path) if force or self.is_stale(p)]
+            if not targets:
+                return False
+            # Read the version before loading: a concurrent write makes the snapshot stale again
+            version = listings_version(self.db_path)
+            listings = self.loader()
+            self.json_path.parent.mkdir(parents=True, exist_ok=True)
+            for path in targets:
+                if path == self.csv_path:
+                    write_csv_snapshot(listings, path)
+                else:
+                    write_json_snapshot(listings, path)
+                set_meta(self.db_path, self._meta_key(path), str(version))
+            return True
+
+    def start(self, interval: float):
+        """Start a daemon thread that refreshes stale snapshots every `interval` seconds."""
+        if interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.export()
+                except Exception as e:
+                    print(f"Snapshot export failed: {e}")
+
+        self._thread = threading.Thread(target=_loop, name='snapshot-exporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class ListingSink(abc.ABC):
+    """
+    Receives listings one at a time as they are scraped (subclasses implement _write_batch).
+    Writes are buffered and flushed every `batch_size` listings or `flush_interval` seconds,
+    and on close, so an interrupted run keeps everything scraped up to that point.
+    `on_flush(batch)`, if set, is called after a batch has been persisted.
+    """
+
+    def __init__(self, batch_size: int = 10, flush_interval: float = 5.0):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.on_flush: Optional[Callable[[List[Dict]], None]] = None
+        self._buffer: List[Dict] = []
+        self._last_flush = time.monotonic()
+
+    def write(self, listing: Dict):
+        """Buffer one listing; flushes when the batch is full or the interval elapsed."""
+        if not listing:
+            return
+        self._buffer.append(listing)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Persist buffered listings."""
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._write_batch(batch)
+            if self.on_flush:
+                self.on_flush(batch)
+        self._last_flush = time.monotonic()
+
+    @abc.abstractmethod
+    def _write_batch(self, listings: List[Dict]):
+        """Persist one batch of listings."""
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SQLiteListingSink(ListingSink):
+    """Upserts listings into the listings DB, one transaction per batch."""
+
+    def __init__(self, db_path, batch_size: int = 10, flush_interval: float = 5.0):
+        super().__init__(batch_size, flush_interval)
+        self.db_path = Path(db_path)
+        init_db(self.db_path)
+        self._conn = connect(self.db_path)
+
+    def _write_batch(self, listings: List[Dict]):
+        with self._conn:
+            _upsert_rows(self._conn, listings)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._conn.close()
+
+
+class JSONLListingSink(ListingSink):
+    """Appends one JSON object per line."""
+
+    def __init__(self, path, batch_size: int = 10, flush_interval: float = 5.0):
+        super().__init__(batch_size, flush_interval)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _write_batch(self, listings: List[Dict]):
+        for L in listings:
+            self._file.write(json.dumps(L, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._file.close()
+
+
+class CSVListingSink(ListingSink):
+    """Appends CSV rows (CSV_FIELDNAMES); the header is written only for a new/empty file."""
+
+    def __init__(self, path, batch_size: int = 10, flush_interval: float = 5.0):
+        super().__init__(batch_size, flush_interval)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+        # utf-8-sig only emits the BOM at position 0, so appending to an existing file stays clean
+        self._file = open(self.path, 'a', newline='', encoding='utf-8-sig')
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDNAMES)
+        if is_new:
+            self._writer.writeheader()
+
+    def _write_batch(self, listings: List[Dict]):
+        for L in listings:
+            self._writer.writerow(listing_csv_row(L))
+        self._file.flush()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._file.close()
+
+
+class MultiSink(ListingSink):
+    """Forwards every listing to several sinks; a batch counts as flushed once every sink flushed it."""
+
+    def __init__(self, sinks: List[ListingSink]):
+        sinks = list(sinks)
+        super().__init__(batch_size=max(s.batch_size for s in sinks),
+                         flush_interval=min(s.flush_interval for s in sinks))
+        self.sinks = sinks
+
+    def write(self, listing: Dict):
+        if not listing:
+            return
+        for sink in self.sinks:
+            sink.write(listing)
+        super().write(listing)
+
+    def _write_batch(self, listings: List[Dict]):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for sink in self.sinks:
+                sink.close()
+
+
+SINK_TYPES = {
+    'sqlite': (SQLiteListingSink, 'listings.db'),
+    'jsonl': (JSONLListingSink, 'listings.jsonl'),
+    'csv': (CSVListingSink, 'listings.csv'),
+}
+
+
+def open_sinks(kinds: List[str], output_dir, batch_size: int = 10) -> ListingSink:
+    """Create a sink writing to `output_dir` for each kind in SINK_TYPES ('sqlite', 'jsonl', 'csv')."""
+    sinks = []
+    for kind in kinds:
+        sink_cls, filename = SINK_TYPES[kind]
+        sinks.append(sink_cls(Path(output_dir) / filename, batch_size=batch_size))
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
@@ -0,0 +1,178 @@
+"""
+Request pacing for the Haraj scrapers.
+SharedRateBudget: token bucket kept in a SQLite file, shared by every scraper process and thread on the
+host, so fanning a crawl out over several browsers does not multiply the load on haraj.com.sa.
+AdaptiveRateController: per-scraper AIMD delay that follows how the site is actually responding.
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from listing_store import connect
+
+
+class SharedRateBudget:
+    """
+    Token bucket whose state lives in a SQLite file, so all scraper processes and threads on the host
+    draw from one global budget (BEGIN IMMEDIATE serialises the refill-and-take step).
+    """
+
+    def __init__(self, db_path, rate_per_minute: float, burst: int = 1, name: str = 'haraj.com.sa'):
+        self.db_path = db_path
+        self.name = name
+        self.rate_per_second = max(0.001, float(rate_per_minute) / 60.0)
+        self.burst = max(1, int(burst))
+        conn = connect(db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _try_take(self) -> float:
+        """Take a token if available. Returns 0 on success, else seconds until the next token."""
+        conn = connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens = float(self.burst) if row is None else min(
+                self.burst, row[0] + max(0.0, now - row[1]) * self.rate_per_second
+            )
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate_per_second
+            conn.execute(
+                "INSERT INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (self.name, tokens, now)
+            )
+            conn.commit()
+            return wait
+        finally:
+            conn.close()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a request may be made. Returns False if timeout expired first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return True
+            if deadline is not None:
+                now = time.monotonic()
+                if now >= deadline:
+                    return False
+                wait = min(wait, deadline - now)
+            # Short naps: other processes may take the next token first
+            time.sleep(min(wait, 0.5))
+
+
+def shared_budget_from_env(default_burst: int = 1):
+    """
+    Host-wide budget from HARAJ_RATE_PER_MINUTE (requests per minute for all scrapers together,
+    unset/0 = no global limit), kept in HARAJ_RATE_DB (default: haraj_rate_budget.db in the temp dir).
+    Burst from HARAJ_RATE_BURST, else default_burst.
+    """
+    try:
+        rate = float(os.environ.get('HARAJ_RATE_PER_MINUTE', '0') or 0)
+    except ValueError:
+        rate = 0
+    if rate <= 0:
+        return None
+    db_path = os.environ.get('HARAJ_RATE_DB') or str(Path(tempfile.gettempdir()) / 'haraj_rate_budget.db')
+    try:
+        burst = int(os.environ.get('HARAJ_RATE_BURST', '') or default_burst)
+    except ValueError:
+        burst = default_burst
+    return SharedRateBudget(db_path, rate, burst=burst)
+
+
+# Text that marks a bot-check / block page instead of real content
+CHALLENGE_MARKERS = (
+    'captcha', 'cf-chl', 'challenge-platform', 'just a moment', 'attention required',
+    'access denied', 'too many requests', 'unusual traffic',
+)
+
+
+def looks_like_challenge(text: str) -> bool:
+    """True if page text/title looks like a bot check or rate-limit page."""
+    sample = (text or '')[:5000].lower()
+    return any(marker in sample for marker in CHALLENGE_MARKERS)
+
+
+class AdaptiveRateController:
+    """
+    AIMD pacing from how the site responds: every healthy response raises the request rate by a
+    fixed step, stress (HTTP 429/503, challenge pages, errors, slow responses) cuts it by a factor.
+    The delay between requests stays within [min_delay, max_delay]; Retry-After is honoured.
+
+    The delay runs from the start of the previous request (request_started / time_until_next_request),
+    so parsing and storing a page overlaps with the politeness wait instead of adding to it.
+    """
+
+    def __init__(self, min_delay: float, max_delay: float, initial_delay: Optional[float] = None,
+                 latency_target: float = 5.0, backoff: float = 0.5, soft_backoff: float = 0.8,
+                 steps_to_max: int = 20, jitter: float = 0.2):
+        self.min_rate = 1.0 / max(max_delay, 1e-3)
+        self.max_rate = 1.0 / max(min_delay, 1e-3)
+        self.rate = 1.0 / (initial_delay or (min_delay + max_delay) / 2)
+        self.rate = min(self.max_rate, max(self.min_rate, self.rate))
+        self.increase = (self.max_rate - self.min_rate) / max(1, steps_to_max)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.soft_backoff = soft_backoff
+        self.jitter = jitter
+        self.responses = 0
+        self.stress_events = 0
+        self._hold_until = 0.0
+        self._last_request = None
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> float:
+        return 1.0 / self.rate
+
+    def request_started(self):
+        """Mark the start of a request: the next one is scheduled one delay after this point."""
+        with self._lock:
+            self._last_request = time.monotonic()
+
+    def time_until_next_request(self) -> float:
+        """Seconds still to wait before the next request (0 if work since the last one used up the delay)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_request is None:
+                return max(0.0, self._hold_until - now)
+            delay = self.delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+            return max(0.0, self._last_request + delay - now, self._hold_until - now)
+
+    def record(self, latency: Optional[float] = None, status: Optional[int] = None, error: bool = False,
+               challenge: bool = False, retry_after: Optional[float] = None):
+        """Feed the outcome of one request into the controller."""
+        with self._lock:
+            self.responses += 1
+            if status in (429, 503) or challenge:
+                self.rate = max(self.min_rate, self.rate * self.backoff)
+                self.stress_events += 1
+                hold = retry_after if retry_after else self.delay
+                self._hold_until = max(self._hold_until, time.monotonic() + hold)
+            elif error or (status is not None and status >= 500) or (latency or 0) > self.latency_target:
+                self.rate = max(self.min_rate, self.rate * self.soft_backoff)
+                self.stress_events += 1
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'delay': round(self.delay, 3), 'responses': self.responses, 'stress_events': self.stress_events}
@@ -0,0 +1,61 @@
+"""
+Standalone scraping worker.
+Claims jobs from the shared SQLite job queue and runs the Selenium scraper in its own process,
+so Chrome never competes with the web workers and survives gunicorn worker restarts.
+Progress and heartbeats go to the same DB the dashboard reads.
+
+Usage (set HARAJ_SCRAPE_MODE=worker on the web process so it only queues jobs):
+    python scrape_worker.py
+    python scrape_worker.py --concurrency 2
+"""
+
+import argparse
+import io
+import os
+import signal
+import sys
+import time
+
+from job_queue import JobDispatcher
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def main():
+    """Run the worker until SIGTERM/SIGINT; running jobs are requeued on shutdown."""
+    # The job runner, DB paths and credentials are shared with the dashboard
+    from dashboard import job_queue, _run_queued_job, browser_pool, warm_browsers, LISTINGS_DB
+
+    parser = argparse.ArgumentParser(description='Haraj scrape worker')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('HARAJ_WORKER_CONCURRENCY', '1') or 1),
+                        help='Max jobs (Chrome instances) this process runs at once')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue checks')
+    args = parser.parse_args()
+
+    dispatcher = JobDispatcher(job_queue, _run_queued_job, poll_interval=args.poll_interval,
+                               max_local=max(1, args.concurrency))
+
+    def _handle_signal(signum, frame):
+        print(f"\nWorker {dispatcher.worker_id}: received signal {signum}, stopping (running jobs will be requeued)...")
+        dispatcher.shutdown.set()
+        dispatcher.wake()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    print("=" * 70)
+    print(f"Haraj scrape worker {dispatcher.worker_id}")
+    print(f"Queue: {LISTINGS_DB}  |  concurrency: {dispatcher.max_local}  |  warm browsers: {browser_pool.max_idle}")
+    print("=" * 70)
+    warm_browsers()
+    dispatcher.start()
+    while not dispatcher.shutdown.is_set():
+        time.sleep(0.5)
+    dispatcher.stop(timeout=60)
+    browser_pool.close_all()
+    print("Worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
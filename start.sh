@@ -1,4 +1,15 @@
 #!/bin/sh
 # Expand PORT so Railway (and others) pass a real port number to gunicorn
 PORT="${PORT:-5000}"
-exec gunicorn dashboard:app --bind "0.0.0.0:${PORT}" --workers 2 --timeout 120
+# HARAJ_SCRAPE_MODE=worker: run Chrome scrapes in a separate worker process, not inside gunicorn
+# (restarted if it exits: queued jobs only run while a worker is up; it reads HARAJ_WORKER_CONCURRENCY itself)
+if [ "${HARAJ_SCRAPE_MODE}" = "worker" ]; then
+  (
+    while true; do
+      python scrape_worker.py
+      echo "scrape_worker.py exited with status $?, restarting in 5s" >&2
+      sleep 5
+    done
+  ) &
+fi
+exec gunicorn dashboard:app --bind "0.0.0.0:${PORT}" --workers 2 --threads 8 --timeout 120
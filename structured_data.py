@@ -0,0 +1,253 @@
+"""
+Structured data embedded in Haraj listing pages.
+Pages carry JSON-LD blocks (<script type="application/ld+json">) and the app's own state blob
+(__NEXT_DATA__ or a `window.__SOMETHING__ = {...}` assignment). Reading one JSON object is cheaper and
+more stable than DOM heuristics, so the extractors take every field found here and fall back to the
+DOM only for the fields that are missing.
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urljoin
+
+BASE_URL = "https://haraj.com.sa"
+
+# (type attribute, id attribute, text) of a <script> element
+Script = Tuple[str, str, str]
+
+STATE_SCRIPT_IDS = ('__NEXT_DATA__', '__NUXT_DATA__', '__APOLLO_STATE__')
+STATE_ASSIGNMENT = re.compile(r'window\.(__[A-Za-z_]+__)\s*=\s*')
+LISTING_LD_TYPES = ('Product', 'Offer', 'Vehicle', 'Car', 'Accommodation', 'Residence', 'Article',
+                    'BlogPosting', 'CreativeWork', 'Thing')
+
+# Post object keys in the app state (Haraj's post schema first, generic names after)
+STATE_KEYS = {
+    'title': ('title', 'name'),
+    'description': ('bodyTEXT', 'body', 'description', 'content'),
+    'city': ('city', 'geoCity', 'cityName'),
+    'price': ('price', 'formattedPrice'),
+    'posted_time': ('postDate', 'createdAt', 'datePosted', 'date'),
+    'seller_name': ('authorUsername', 'authorName', 'username'),
+    'tags': ('tags',),
+    'images': ('imagesList', 'images', 'thumbURL'),
+}
+
+
+def script_from_tag(tag) -> Script:
+    """A BeautifulSoup <script> tag as (type, id, text)."""
+    return (tag.get('type') or '').lower(), tag.get('id') or '', tag.string or ''
+
+
+def scripts_from_soup(soup) -> List[Script]:
+    """Script elements of a BeautifulSoup page."""
+    return [script_from_tag(tag) for tag in soup.find_all('script')]
+
+
+def scripts_from_tree(tree) -> List[Script]:
+    """Script elements of an lxml page."""
+    return [((s.get('type') or '').lower(), s.get('id') or '', s.text or '') for s in tree.iter('script')]
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_scripts(scripts: List[Script]) -> Tuple[List[Dict], List[Any]]:
+    """Split page scripts into JSON-LD items (@graph flattened) and app state blobs."""
+    json_ld, states = [], []
+    for script_type, script_id, text in scripts:
+        text = (text or '').strip()
+        if not text:
+            continue
+        if script_type == 'application/ld+json':
+            data = _loads(text)
+            for item in data if isinstance(data, list) else [data]:
+                if isinstance(item, dict):
+                    json_ld.extend(g for g in item.get('@graph', [item]) if isinstance(g, dict))
+        elif script_id in STATE_SCRIPT_IDS:
+            data = _loads(text)
+            if data is not None:
+                states.append(data)
+        elif 'window.__' in text:
+            for match in STATE_ASSIGNMENT.finditer(text):
+                try:
+                    data, _ = json.JSONDecoder().raw_decode(text, match.end())
+                except ValueError:
+                    continue
+                states.append(data)
+    return json_ld, states
+
+
+def _text(value) -> str:
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value).strip()
+    if isinstance(value, dict):
+        return _text(value.get('name') or value.get('formattedPrice') or value.get('@value'))
+    return ''
+
+
+def _format_price(amount, currency: str = '') -> str:
+    """Riyal amounts in the form the DOM shows them ('85,000 ريال'), other currencies as given."""
+    if amount in (None, ''):
+        return ''
+    if isinstance(amount, str):
+        try:
+            amount = float(amount.replace(',', ''))
+        except ValueError:
+            return amount.strip()
+    if not isinstance(amount, (int, float)) or isinstance(amount, bool) or amount <= 0:
+        return ''
+    number = f"{amount:,.0f}" if float(amount).is_integer() else f"{amount:,.2f}"
+    return f"{number} {'ريال' if currency.upper() in ('', 'SAR') else currency}"
+
+
+def _format_time(value) -> str:
+    """ISO 8601 for epoch seconds/milliseconds; short strings as they are."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+        if value > 1e11:
+            value /= 1000.0
+        return datetime.fromtimestamp(value, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    text = _text(value)
+    return text if len(text) <= 80 else ''
+
+
+def _image_urls(value, base_url: str) -> List[str]:
+    urls = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            item = item.get('url') or item.get('contentUrl') or item.get('src')
+        if isinstance(item, str) and item.strip():
+            urls.append(urljoin(base_url, item.strip()))
+    return list(dict.fromkeys(urls))
+
+
+def _ld_types(item: Dict) -> List[str]:
+    types = item.get('@type') or []
+    return types if isinstance(types, list) else [types]
+
+
+def fields_from_json_ld(items: List[Dict], base_url: str = BASE_URL) -> Dict:
+    """Listing fields from JSON-LD: the main item (Product/Offer/...) plus BreadcrumbList tags."""
+    fields = {}
+    main = next((i for i in items if any(t in LISTING_LD_TYPES for t in _ld_types(i))
+                 and (i.get('name') or i.get('headline'))), None)
+    if main is not None:
+        fields['title'] = _text(main.get('name') or main.get('headline'))
+        fields['description'] = _text(main.get('description') or main.get('articleBody'))
+        offers = main.get('offers') or (main if 'Offer' in _ld_types(main) else {})
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        if isinstance(offers, dict):
+            fields['price'] = _format_price(offers.get('price'), _text(offers.get('priceCurrency')))
+        fields['posted_time'] = _format_time(main.get('datePosted') or main.get('datePublished')
+                                             or main.get('dateCreated'))
+        seller = ((offers.get('seller') if isinstance(offers, dict) else None)
+                  or main.get('seller') or main.get('author'))
+        if isinstance(seller, list):
+            seller = seller[0] if seller else None
+        if isinstance(seller, dict):
+            fields['seller_name'] = _text(seller.get('name') or seller.get('alternateName'))
+            if seller.get('url'):
+                fields['seller_url'] = urljoin(base_url, _text(seller.get('url')))
+        address = main.get('address') or (offers.get('availableAtOrFrom') if isinstance(offers, dict) else None)
+        if isinstance(address, dict):
+            address = address.get('address', address)
+        if isinstance(address, dict):
+            fields['city'] = _text(address.get('addressLocality') or address.get('addressRegion'))
+        fields['category'] = _text(main.get('category'))
+        keywords = main.get('keywords')
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        if isinstance(keywords, list):
+            fields['tags'] = [t for t in (_text(k) for k in keywords) if t]
+        fields['images'] = _image_urls(main.get('image'), base_url)
+    if not fields.get('tags'):
+        for item in items:
+            if 'BreadcrumbList' in _ld_types(item):
+                crumbs = [c for c in item.get('itemListElement') or [] if isinstance(c, dict)]
+                crumbs.sort(key=lambda c: c.get('position') or 0)
+                tags = []
+                for crumb in crumbs:
+                    item = crumb.get('item') or {}
+                    item_url = (item.get('@id') or item.get('url') or '') if isinstance(item, dict) else str(item)
+                    name = _text(crumb.get('name') or (item.get('name') if isinstance(item, dict) else ''))
+                    if '/tags/' in item_url and name:
+                        tags.append(name)
+                fields['tags'] = tags
+    return {k: v for k, v in fields.items() if v}
+
+
+def _find_post(state, listing_id: str, depth: int = 0) -> Optional[Dict]:
+    """The object in an app state blob describing this listing (matched by its id, never a related post)."""
+    if depth > 12:
+        return None
+    if isinstance(state, dict):
+        post_id = state.get('id', state.get('postId'))
+        if post_id is not None and str(post_id) == listing_id and ('title' in state or 'bodyTEXT' in state):
+            return state
+        children = state.values()
+    elif isinstance(state, list):
+        children = state
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = _find_post(child, listing_id, depth + 1)
+            if found is not None:
+                return found
+    return None
+
+
+def fields_from_state(states: List[Any], listing_id: Optional[str], base_url: str = BASE_URL) -> Dict:
+    """Listing fields from the app's state blob (the post object whose id is listing_id)."""
+    if not listing_id:
+        return {}
+    post = next((p for p in (_find_post(s, listing_id) for s in states) if p is not None), None)
+    if post is None:
+        return {}
+
+    def first(field):
+        return next((post[k] for k in STATE_KEYS[field] if post.get(k) not in (None, '', [], {})), None)
+
+    fields = {
+        'title': _text(first('title')),
+        'description': _text(first('description')),
+        'city': _text(first('city')),
+        'posted_time': _format_time(first('posted_time')),
+        'seller_name': _text(first('seller_name')),
+        'images': _image_urls(first('images'), base_url),
+    }
+    price = first('price')
+    fields['price'] = _text(price) if isinstance(price, (str, dict)) else _format_price(price)
+    author = post.get('author') or post.get('user')
+    if isinstance(author, dict) and not fields['seller_name']:
+        fields['seller_name'] = _text(author.get('username') or author.get('name'))
+    if fields['seller_name']:
+        fields['seller_url'] = urljoin(base_url, '/users/' + quote(fields['seller_name']))
+    tags = first('tags')
+    if isinstance(tags, list):
+        fields['tags'] = [t for t in (_text(tag) for tag in tags) if t]
+    return {k: v for k, v in fields.items() if v}
+
+
+def structured_listing_fields(scripts: List[Script], listing_id: Optional[str], base_url: str = BASE_URL) -> Dict:
+    """Fields found in the page's structured data: JSON-LD first, the app state fills what it lacks."""
+    json_ld, states = parse_scripts(scripts)
+    fields = fields_from_state(states, listing_id, base_url)
+    fields.update(fields_from_json_ld(json_ld, base_url))
+    return fields
+
+
+def apply_structured_fields(listing_data: Dict, fields: Dict) -> Dict:
+    """Overlay structured fields on listing data (location follows city, category defaults to the first tag)."""
+    listing_data.update(fields)
+    if fields.get('city'):
+        listing_data['location'] = fields['city']
+    if fields.get('tags') and not fields.get('category'):
+        listing_data['category'] = fields['tags'][0]
+    return listing_data
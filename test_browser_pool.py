@@ -0,0 +1,74 @@
+"""Test that scrape jobs reuse warm browsers instead of starting new ones"""
+import sys
+import io
+
+from browser_pool import BrowserPool
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+class _Scraper:
+    """Records launches, resets and closes the pool does on a browser"""
+    launches = 0
+
+    def __init__(self, **options):
+        _Scraper.launches += 1
+        self.options = options
+        self.resets = []
+        self.closed = False
+        self.broken = False
+
+    def reset(self, **job):
+        if self.broken:
+            raise RuntimeError('chrome not reachable')
+        self.resets.append(job)
+
+    def close(self):
+        self.closed = True
+
+
+def test_release_keeps_browser_warm_for_same_launch_options():
+    _Scraper.launches = 0
+    pool = BrowserPool(max_idle=1, factory=_Scraper)
+    first = pool.acquire(profile='leads', headless=True, username='a')
+    assert first.options == {'profile': 'leads', 'headless': True, 'username': 'a'}
+    pool.release(first)
+    assert not first.closed
+
+    # Same launch options: reset, no new launch; other options: a new browser
+    again = pool.acquire(profile='full', contacts='deferred', headless=True, username='a')
+    assert again is first and _Scraper.launches == 1
+    assert again.resets[-1]['profile'] == 'full' and again.resets[-1]['contacts'] == 'deferred'
+    other = pool.acquire(headless=True, username='b')
+    assert other is not first and _Scraper.launches == 2
+
+    # Only max_idle browsers are kept; broken warm browsers are discarded
+    pool.release(first)
+    pool.release(other)
+    assert other.closed and not first.closed
+    first.broken = True
+    replacement = pool.acquire(headless=True, username='a')
+    assert replacement is not first and first.closed and _Scraper.launches == 3
+    pool.release(replacement)
+    pool.close_all()
+    assert replacement.closed
+    print("OK: browser pool reuse")
+
+
+def test_warm_starts_browsers_ahead_of_jobs():
+    _Scraper.launches = 0
+    pool = BrowserPool(max_idle=2, factory=_Scraper)
+    pool.warm(headless=True).join(timeout=5)
+    assert _Scraper.launches == 2
+    browser = pool.acquire(headless=True)
+    assert _Scraper.launches == 2 and len(browser.resets) == 1
+    assert BrowserPool(max_idle=0, factory=_Scraper).warm(headless=True).join(timeout=5) is None
+    assert _Scraper.launches == 2
+    print("OK: warm browsers")
+
+
+if __name__ == "__main__":
+    test_release_keeps_browser_warm_for_same_launch_options()
+    test_warm_starts_browsers_ahead_of_jobs()
+    print("\nAll browser pool tests passed!")
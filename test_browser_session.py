@@ -0,0 +1,101 @@
+"""Test the saved login cookies and Chrome profile slots reused across runs"""
+import sys
+import io
+import os
+import tempfile
+import threading
+import time
+
+from browser_session import (DRIVER_PATH_FILE, CookieJar, cached_driver_path, cdp_cookie_params, claim_profile,
+                             forget_driver_path, remember_driver_path)
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def test_cookie_jar_drops_expired_cookies():
+    with tempfile.TemporaryDirectory() as tmp:
+        jar = CookieJar(tmp, 'user@example.com')
+        assert jar.load() == []
+        jar.save([{'name': 'sid', 'value': 'a', 'expiry': int(time.time()) + 3600},
+                  {'name': 'old', 'value': 'b', 'expiry': int(time.time()) - 10},
+                  {'name': 'session_only', 'value': 'c'}])
+        assert [c['name'] for c in CookieJar(tmp, 'user@example.com').load()] == ['sid', 'session_only']
+        assert CookieJar(tmp, 'other').load() == []
+        if sys.platform != 'win32':
+            assert os.stat(jar.path).st_mode & 0o077 == 0
+        jar.clear()
+        assert jar.load() == []
+
+        # Browsers of one account saving at once: the jar stays valid JSON, no temp files are left
+        jars = [CookieJar(tmp, 'user@example.com') for _ in range(4)]
+        threads = [threading.Thread(target=lambda j=j, n=n: [j.save([{'name': f'c{n}', 'value': 'x' * 5000}] * 20)
+                                                             for _ in range(25)])
+                   for n, j in enumerate(jars)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(jar.load()) == 20 and os.listdir(tmp) == [jar.path.name]
+    print("OK: cookie jar")
+
+
+def test_cookie_params_for_set_cookies():
+    """CDP and WebDriver cookies become Network.setCookies params without read-only fields"""
+    cdp_cookie = {'name': 'sid', 'value': 'a', 'domain': '.haraj.com.sa', 'path': '/', 'expires': 1900000000.5,
+                  'size': 4, 'httpOnly': True, 'secure': True, 'session': False, 'sameSite': 'Lax',
+                  'priority': 'Medium', 'sameParty': False, 'sourceScheme': 'Secure', 'partitionKey': 'x'}
+    session_cookie = {'name': 'tmp', 'value': 'b', 'domain': 'haraj.com.sa', 'path': '/', 'expires': -1,
+                      'session': True, 'size': 4}
+    webdriver_cookie = {'name': 'jar', 'value': 'c', 'domain': '.haraj.com.sa', 'path': '/', 'expiry': 1900000000,
+                        'secure': False, 'httpOnly': False}
+    assert cdp_cookie_params([cdp_cookie, session_cookie, webdriver_cookie]) == [
+        {'name': 'sid', 'value': 'a', 'domain': '.haraj.com.sa', 'path': '/', 'secure': True, 'httpOnly': True,
+         'sameSite': 'Lax', 'expires': 1900000000.5},
+        {'name': 'tmp', 'value': 'b', 'domain': 'haraj.com.sa', 'path': '/'},
+        {'name': 'jar', 'value': 'c', 'domain': '.haraj.com.sa', 'path': '/', 'secure': False, 'httpOnly': False,
+         'expires': 1900000000},
+    ]
+    print("OK: setCookies params")
+
+
+def test_profile_slots_are_exclusive():
+    """A slot in use is skipped; released slots are reused and stale Chrome locks removed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = claim_profile(tmp, max_slots=2)
+        (first.path / 'SingletonLock').write_text('stale')
+        second = claim_profile(tmp, max_slots=2)
+        assert first.path != second.path
+        assert claim_profile(tmp, max_slots=2) is None
+        first.release()
+        again = claim_profile(tmp, max_slots=2)
+        assert again.path == first.path and not (again.path / 'SingletonLock').exists()
+        assert again.chrome_arguments()[0] == f'--user-data-dir={again.path}'
+        again.release()
+        second.release()
+    print("OK: profile slots")
+
+
+def test_driver_path_cache_is_private():
+    """The remembered chromedriver lives in the session dir, owner-only; a file others can write is ignored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assert cached_driver_path(tmp) is None
+        remember_driver_path(tmp, sys.executable)
+        assert cached_driver_path(tmp) == sys.executable
+        assert os.listdir(tmp) == [DRIVER_PATH_FILE]
+        if sys.platform != 'win32':
+            cache = os.path.join(tmp, DRIVER_PATH_FILE)
+            assert os.stat(cache).st_mode & 0o077 == 0
+            os.chmod(cache, 0o666)
+            assert cached_driver_path(tmp) is None
+        forget_driver_path(tmp)
+        assert cached_driver_path(tmp) is None
+    print("OK: chromedriver path cache")
+
+
+if __name__ == "__main__":
+    test_cookie_jar_drops_expired_cookies()
+    test_cookie_params_for_set_cookies()
+    test_profile_slots_are_exclusive()
+    test_driver_path_cache_is_private()
+    print("\nAll browser session tests passed!")
@@ -0,0 +1,78 @@
+"""Test the memory watchdog that decides when to recycle the Selenium driver"""
+import sys
+import io
+import os
+import time
+
+from browser_watchdog import HangSupervisor, MemoryWatchdog, process_tree_rss
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+class _Driver:
+    """execute_cdp_cmd with a fixed Performance.getMetrics result"""
+
+    def __init__(self, heap_mb):
+        self.heap_mb = heap_mb
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == 'Performance.getMetrics'
+        size = self.heap_mb * 1048576
+        return {'metrics': [{'name': 'JSHeapUsedSize', 'value': size / 2},
+                            {'name': 'JSHeapTotalSize', 'value': size},
+                            {'name': 'Nodes', 'value': 1500}]}
+
+
+def test_recycle_after_pages_and_above_memory():
+    watchdog = MemoryWatchdog(recycle_after_pages=25, recycle_above_mb=300, sample_every=10)
+    driver = _Driver(heap_mb=100)
+    reasons = []
+    for _ in range(25):
+        watchdog.page_loaded()
+        reasons.append(watchdog.recycle_reason(driver))
+    assert reasons[:24] == [None] * 24 and '25 pages' in reasons[24]
+    assert len(watchdog.samples) == 2 and watchdog.samples[-1]['nodes'] == 1500
+
+    watchdog.recycled()
+    driver.heap_mb = 400
+    for _ in range(9):
+        watchdog.page_loaded()
+        assert watchdog.recycle_reason(driver) is None
+    watchdog.page_loaded()
+    assert 'limit 300 MB' in watchdog.recycle_reason(driver)
+    stats = watchdog.stats()
+    assert stats['recycles'] == 1 and stats['pages'] == 35 and stats['peak_mb'] == 400
+    print("OK: recycle decisions")
+
+
+def test_process_tree_rss():
+    rss = process_tree_rss(os.getpid())
+    if sys.platform.startswith('linux'):
+        assert rss and rss > 1024 * 1024
+    assert process_tree_rss(0) is None
+    print("OK: process tree RSS")
+
+
+def test_hang_supervisor():
+    """on_hang runs only for a listing still armed past deadline + grace"""
+    hung = []
+    supervisor = HangSupervisor(lambda: hung.append(True), grace=0.05)
+    supervisor.arm(0.05)
+    supervisor.disarm()
+    time.sleep(0.2)
+    assert not hung and not supervisor.fired
+    supervisor.arm(0.05)
+    time.sleep(0.3)
+    assert hung == [True] and supervisor.fired and supervisor.hangs == 1
+    supervisor.arm(5)
+    assert not supervisor.fired
+    supervisor.disarm()
+    print("OK: hang supervisor")
+
+
+if __name__ == "__main__":
+    test_recycle_after_pages_and_above_memory()
+    test_process_tree_rss()
+    test_hang_supervisor()
+    print("\nAll browser watchdog tests passed!")
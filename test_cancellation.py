@@ -0,0 +1,47 @@
+"""Test cooperative cancellation of scrapes"""
+import sys
+import io
+import threading
+import time
+
+from cancellation import CancelToken, ScrapeCancelled
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def test_sleep_is_interrupted():
+    """A long compliance-style sleep ends promptly once the token is cancelled"""
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    start = time.time()
+    try:
+        token.sleep(30)
+        assert False, "sleep was not interrupted"
+    except ScrapeCancelled:
+        pass
+    assert time.time() - start < 1
+    print("OK: interruptible sleep")
+
+
+def test_watch_cancels_from_flag():
+    """watch() turns an external stop flag (e.g. the job row in the DB) into a cancel"""
+    stop = {'requested': False}
+    token = CancelToken().watch(lambda: stop['requested'], interval=0.05)
+    token.sleep(0.1)
+    stop['requested'] = True
+    assert token.wait(1)
+    token.close()
+    try:
+        token.raise_if_cancelled()
+        assert False, "token not cancelled"
+    except ScrapeCancelled:
+        pass
+    assert not isinstance(ScrapeCancelled(), Exception)  # not swallowed by `except Exception`
+    print("OK: watched cancel flag")
+
+
+if __name__ == "__main__":
+    test_sleep_is_interrupted()
+    test_watch_cancels_from_flag()
+    print("\nAll cancellation tests passed!")
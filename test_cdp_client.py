@@ -0,0 +1,99 @@
+"""Test the direct CDP client: reply matching, event buffering, navigation and script errors"""
+import sys
+import io
+import json
+
+import websocket
+
+from cancellation import CancelToken, ScrapeCancelled
+from cdp_client import CdpError, CdpTab
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+class _Socket:
+    """Websocket that answers each command with the messages scripted for its method"""
+
+    def __init__(self, script):
+        self.script = script
+        self.sent = []
+        self.inbox = []
+
+    def settimeout(self, timeout):
+        pass
+
+    def send(self, data):
+        command = json.loads(data)
+        self.sent.append(command['method'])
+        for message in self.script.get(command['method'], [{}]):
+            message = dict(message)
+            if 'method' not in message:
+                message['id'] = command['id']
+            self.inbox.append(json.dumps(message))
+
+    def recv(self):
+        if not self.inbox:
+            raise websocket.WebSocketTimeoutException()
+        return self.inbox.pop(0)
+
+    def close(self):
+        pass
+
+
+def _event(method, **params):
+    return {'method': method, 'params': params}
+
+
+def test_navigate_waits_for_load_event():
+    """Events arriving before the reply are buffered; the document response comes from Network events"""
+    socket = _Socket({
+        'Page.navigate': [
+            _event('Network.requestWillBeSent', type='Document', request={'url': 'https://haraj.com.sa/1/x/'}),
+            _event('Network.responseReceived', type='Document', frameId='F1',
+                   response={'url': 'https://haraj.com.sa/1/x/', 'status': 200}),
+            {'result': {'frameId': 'F1'}},
+            _event('Network.requestWillBeSent', type='XHR',
+                   request={'url': 'https://graphql.haraj.com.sa/', 'method': 'POST', 'headers': {'token': 't'}}),
+            _event('Page.loadEventFired', timestamp=1.0),
+        ],
+        'Runtime.evaluate': [{'result': {'result': {'type': 'string', 'value': '<html></html>'}}}],
+    })
+    tab = CdpTab(socket)
+    assert tab.navigate('https://haraj.com.sa/1/x/', timeout=1) == {'url': 'https://haraj.com.sa/1/x/', 'status': 200}
+    assert tab.requests_made() == [{'url': 'https://graphql.haraj.com.sa/', 'method': 'POST', 'headers': {'token': 't'}}]
+    assert tab.html() == '<html></html>'
+    assert socket.sent == ['Page.navigate', 'Runtime.evaluate']
+    print("OK: navigate and load event")
+
+
+def test_timeouts_and_errors():
+    tab = CdpTab(_Socket({
+        'Page.navigate': [{'result': {'frameId': 'F1'}}],
+        'Runtime.evaluate': [{'result': {'exceptionDetails': {'text': 'Uncaught',
+                                                              'exception': {'description': 'ReferenceError: x'}}}}],
+        'Network.getAllCookies': [{'error': {'code': -32000, 'message': 'Target closed'}}],
+    }))
+    assert tab.navigate('https://haraj.com.sa/2/x/', timeout=0.3) is None
+    for call in (lambda: tab.evaluate('x'), tab.cookies):
+        try:
+            call()
+            assert False, 'expected CdpError'
+        except CdpError as e:
+            assert 'ReferenceError' in str(e) or 'Target closed' in str(e)
+
+    token = CancelToken()
+    tab = CdpTab(_Socket({'Page.navigate': [{'result': {'frameId': 'F1'}}]}), cancel_token=token)
+    token.cancel()
+    try:
+        tab.navigate('https://haraj.com.sa/3/x/', timeout=5)
+        assert False, 'expected ScrapeCancelled'
+    except ScrapeCancelled:
+        assert tab.ws.sent[-1] == 'Page.stopLoading'
+    print("OK: timeouts, script errors and cancel")
+
+
+if __name__ == "__main__":
+    test_navigate_waits_for_load_event()
+    test_timeouts_and_errors()
+    print("\nAll CDP client tests passed!")
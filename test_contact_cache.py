@@ -0,0 +1,49 @@
+"""Test the seller contact cache behind the deferred contact-reveal stage"""
+import sys
+import io
+import tempfile
+from pathlib import Path
+
+from contact_cache import SellerContactCache, needs_contact, pending_by_seller
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+SELLER = 'https://haraj.com.sa/users/abu_saad'
+
+
+def test_cache_fills_other_listings_of_a_seller():
+    """A revealed phone is kept per seller_url and reused without a click; contacts without a phone are not kept"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SellerContactCache(Path(tmp) / 'listings.db')
+        assert not cache.put(SELLER, {'has_contact_button': True, 'login_required': True})
+        assert cache.put(SELLER, {'has_contact_button': True, 'phone_numbers': ['501234567'],
+                                  'seller_phone': '501234567', 'seller_name': 'listing specific'})
+
+        listing = {'url': 'https://haraj.com.sa/2/x/', 'seller_url': SELLER,
+                   'contact_info': {'contact_pending': True}}
+        assert SellerContactCache(Path(tmp) / 'listings.db').apply(listing)
+        assert listing['contact_info']['phone_numbers'] == ['501234567']
+        assert 'contact_pending' not in listing['contact_info'] and 'seller_name' not in listing['contact_info']
+        assert not needs_contact(listing)
+        assert not cache.apply({'seller_url': 'https://haraj.com.sa/users/other', 'contact_info': {}})
+    print("OK: seller contact cache")
+
+
+def test_pending_listings_grouped_by_seller():
+    listings = [
+        {'url': 'u1', 'seller_url': SELLER, 'contact_info': {'contact_pending': True}},
+        {'url': 'u2', 'seller_url': SELLER, 'contact_info': {'has_contact_button': True, 'login_required': True}},
+        {'url': 'u3', 'seller_url': SELLER, 'contact_info': {'phone_numbers': ['501234567']}},
+        {'url': 'u4', 'contact_info': {'contact_pending': True}},
+        {'url': 'u5', 'seller_url': SELLER, 'contact_info': {}},
+    ]
+    groups = pending_by_seller(listings)
+    assert [[L['url'] for L in g] for g in groups.values()] == [['u1', 'u2'], ['u4']]
+    print("OK: pending listings grouped by seller")
+
+
+if __name__ == "__main__":
+    test_cache_fills_other_listings_of_a_seller()
+    test_pending_listings_grouped_by_seller()
+    print("\nAll contact cache tests passed!")
@@ -0,0 +1,99 @@
+"""Test the durable crawl frontier (resume after crash)"""
+import sys
+import io
+import tempfile
+from pathlib import Path
+
+from crawl_frontier import CrawlFrontier, claim_with_retries
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+URLS = [f"https://haraj.com.sa/{11170000 + i}/title/" for i in range(5)]
+
+
+def test_resume_after_crash():
+    """A new frontier instance for the same job picks up pending and in-flight URLs only"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        frontier = CrawlFrontier(db, "cars")
+        assert frontier.add_urls(URLS) == 5
+        assert frontier.add_urls(URLS[:2]) == 0
+        frontier.mark_discovered("https://haraj.com.sa/tags/cars")
+
+        frontier.mark_done(frontier.claim_next())
+        frontier.mark_done(frontier.claim_next())
+        crashed_url = frontier.claim_next()  # process dies while scraping this one
+
+        resumed = CrawlFrontier(db, "cars")
+        assert resumed.is_discovered()
+        assert resumed.recover() == 1
+        assert resumed.claim_next() == crashed_url
+        assert resumed.counts() == {'pending': 2, 'in_progress': 1, 'done': 2, 'failed': 0}
+        # Prefetch peeks at the next pending URLs without claiming them
+        assert resumed.peek_pending(5) == URLS[3:] and resumed.peek_pending(0) == []
+        assert resumed.claim_next() == URLS[3]
+        print("OK: resume after crash")
+
+
+def test_failed_urls_retry_until_max_attempts():
+    """Failed URLs are requeued on recover until they used up max_attempts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        frontier = CrawlFrontier(Path(tmp) / "listings.db", "retry", max_attempts=2)
+        frontier.add_urls(URLS[:1])
+        frontier.mark_discovered()
+        for _ in range(2):
+            url = frontier.claim_next()
+            frontier.mark_failed(url, "timeout")
+            frontier.recover()
+        assert frontier.claim_next() is None
+        assert frontier.is_complete()
+        frontier.reset()
+        assert not frontier.is_discovered() and frontier.urls() == []
+        print("OK: retry and reset")
+
+
+def test_end_of_job_retry_rounds():
+    """Failed URLs wait for the end of the main pass, then come back in rounds with doubling backoff"""
+    with tempfile.TemporaryDirectory() as tmp:
+        frontier = CrawlFrontier(Path(tmp) / "listings.db", "rounds", max_attempts=3)
+        frontier.add_urls(URLS[:3])
+        waits, order = [], []
+        for url, retry_round in claim_with_retries(frontier, waits.append, backoff=5):
+            order.append((url, retry_round))
+            if url == URLS[0] or (url == URLS[1] and retry_round == 0):
+                frontier.mark_failed(url, "timed out after 45s")
+            else:
+                frontier.mark_done(url)
+        assert order == [(URLS[0], 0), (URLS[1], 0), (URLS[2], 0), (URLS[0], 1), (URLS[1], 1), (URLS[0], 2)]
+        assert waits == [5, 10]
+        assert frontier.counts() == {'pending': 0, 'in_progress': 0, 'done': 2, 'failed': 1}
+        assert frontier.requeue_failed() == 0
+        print("OK: end-of-job retry rounds")
+
+
+def test_fanout_partitions_dedup():
+    """A URL claimed by one partition of a fan-out crawl is skipped by its sibling partitions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        cars = CrawlFrontier(db, "fanout:g1/cars", dedup_prefix="fanout:g1/")
+        riyadh = CrawlFrontier(db, "fanout:g1/city-riyadh", dedup_prefix="fanout:g1/")
+        other = CrawlFrontier(db, "fanout:g2/cars", dedup_prefix="fanout:g2/")
+        for frontier in (cars, riyadh, other):
+            frontier.add_urls(URLS[:3])
+
+        assert cars.claim_next() == URLS[0]
+        assert riyadh.claim_next() == URLS[1]
+        assert cars.claim_next() == URLS[2] and cars.skipped == 1
+        assert riyadh.claim_next() is None and riyadh.skipped == 2
+        assert other.claim_next() == URLS[0]
+        print("OK: fan-out dedup")
+
+
+if __name__ == "__main__":
+    test_resume_after_crash()
+    test_failed_urls_retry_until_max_attempts()
+    test_end_of_job_retry_rounds()
+    test_fanout_partitions_dedup()
+    print("\nAll crawl frontier tests passed!")
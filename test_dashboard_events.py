@@ -0,0 +1,76 @@
+"""Test the dashboard's live events: lead payloads, the SSE stream and fan-out partitions"""
+import sys
+import io
+import json
+import tempfile
+from pathlib import Path
+
+import dashboard
+from job_queue import JobQueue, JobStatus, COMPLETED
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def _events(body: str):
+    """(event, data) pairs of an SSE response body."""
+    events = []
+    for block in body.split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_lead_summary_phone():
+    """The lead's phone comes from the scrapers' phone_numbers list, seller_phone as fallback"""
+    listing = {'listing_id': '1', 'title': 'x', 'url': 'https://haraj.com.sa/1/x/',
+               'contact_info': {'phone_numbers': ['0500000000', '0555555555'], 'seller_phone': '0511111111'}}
+    assert dashboard._lead_summary(listing)['phone_number'] == '0500000000, 0555555555'
+    listing['contact_info'] = {'seller_phone': '0511111111'}
+    assert dashboard._lead_summary(listing)['phone_number'] == '0511111111'
+    assert dashboard._lead_summary({'listing_id': '2'})['phone_number'] is None
+    print("OK: lead phone number")
+
+
+def test_lead_event_stream():
+    """A lead published for a flushed listing reaches the job's SSE stream, which ends with the job"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / 'listings.db')
+        job = queue.enqueue('https://haraj.com.sa/tags/x', 5, job_name='leads')
+        saved_queue, saved_mode = dashboard.job_queue, dashboard.SCRAPE_MODE
+        dashboard.job_queue, dashboard.SCRAPE_MODE = queue, 'worker'
+        try:
+            with dashboard.app.test_client() as client:
+                status = JobStatus(queue, job['job_id'])
+                dashboard._publish(status, 'lead', dashboard._lead_summary(
+                    {'listing_id': '7', 'url': 'https://haraj.com.sa/7/x/', 'contact_info': {'phone_numbers': ['0500000000']}}))
+                queue.finish(job['job_id'], COMPLETED)
+                response = client.get(f"/api/scraping-events?job_id={job['job_id']}&last_event_id=0")
+                events = _events(response.get_data(as_text=True))
+        finally:
+            dashboard.job_queue, dashboard.SCRAPE_MODE = saved_queue, saved_mode
+        leads = [data for event, data in events if event == 'lead']
+        assert leads == [{'listing_id': '7', 'title': None, 'price': None, 'city': None,
+                          'url': 'https://haraj.com.sa/7/x/', 'phone_number': '0500000000', 'job_id': job['job_id']}]
+        assert events[-1][0] == 'job' and events[-1][1]['state'] == COMPLETED
+    print("OK: lead event stream")
+
+
+def test_plan_fanout():
+    """One partition per category URL (shared tags merged) plus one per city"""
+    partitions = dashboard.plan_fanout(cities=['الرياض'])
+    urls = [p['url'] for p in partitions]
+    assert len(urls) == len(set(urls))
+    assert partitions[-1] == {'partition': 'city-الرياض', 'url': 'https://haraj.com.sa/city/%D8%A7%D9%84%D8%B1%D9%8A%D8%A7%D8%B6'}
+    assert dashboard.plan_fanout(cities=['الرياض'], include_categories=False) == partitions[-1:]
+    first = partitions[0]['partition']
+    assert [p['partition'] for p in dashboard.plan_fanout([first])] == [first]
+    print("OK: fan-out partitions")
+
+
+if __name__ == "__main__":
+    test_lead_summary_phone()
+    test_lead_event_stream()
+    test_plan_fanout()
+    print("\nAll dashboard event tests passed!")
@@ -0,0 +1,43 @@
+"""Test field-selective extraction profiles"""
+import sys
+import io
+from pathlib import Path
+
+from extraction_profiles import PROFILES, profile_steps
+from haraj_scraper import parse_listing_html
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+PAGE = Path(__file__).parent / 'test_pages' / 'listing_4.html'
+URL = 'https://haraj.com.sa/11173528712/title/'
+
+
+def test_profiles_leave_skipped_fields_empty():
+    """leads keeps title/price/seller/contact and empties images, tags and posted time; keys stay for exports"""
+    full = parse_listing_html(PAGE.read_bytes(), URL, 'lxml', profile_steps('full'))
+    leads = parse_listing_html(PAGE.read_bytes(), URL, 'lxml', profile_steps('leads'))
+    catalog = parse_listing_html(PAGE.read_bytes(), URL, 'html.parser', profile_steps('catalog'))
+    assert set(leads) == set(full)
+    for field in ('title', 'price', 'city', 'seller_url', 'contact_info'):
+        assert leads[field] == full[field]
+    assert leads['images'] == [] and leads['tags'] == [] and leads['category'] == ''
+    assert leads['posted_time'] == '' and leads['description'] == ''
+    assert catalog['contact_info'] == {} and catalog['images'] == full['images']
+    print("OK: extraction profiles")
+
+
+def test_unknown_profile():
+    assert set(PROFILES) == {'leads', 'catalog', 'full'}
+    try:
+        profile_steps('everything')
+    except ValueError:
+        print("OK: unknown profile rejected")
+    else:
+        raise AssertionError("unknown profile accepted")
+
+
+if __name__ == "__main__":
+    test_profiles_leave_skipped_fields_empty()
+    test_unknown_profile()
+    print("\nAll extraction profile tests passed!")
@@ -0,0 +1,107 @@
+"""Test the per-pattern HTTP/browser choice of the auto engine"""
+import sys
+import io
+import tempfile
+from pathlib import Path
+
+from haraj_scraper_auto import BROWSER, ESCALATE_AFTER, HTTP, REPROBE_EVERY, EngineChoices, HarajScraperAuto, url_pattern
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+PAGE = Path(__file__).parent / 'test_pages' / 'listing_4.html'
+
+
+class _Browser:
+    """Stands in for the Selenium scraper: records the listings it was asked for"""
+
+    def __init__(self):
+        self.scraped = []
+
+    def scrape_listing(self, url):
+        self.scraped.append(url)
+        return {'url': url, 'title': 'rendered'}
+
+    def close(self):
+        self.closed = True
+
+
+def test_url_patterns():
+    assert url_pattern('https://haraj.com.sa/') == 'home'
+    assert url_pattern('https://haraj.com.sa/11173528712/title/') == 'listing'
+    assert url_pattern('https://haraj.com.sa/tags/%D8%AD%D8%B1%D8%A7%D8%AC/2') == 'tags/حراج'
+    assert url_pattern('https://haraj.com.sa/users/abu_saad') == 'users'
+    print("OK: URL patterns")
+
+
+def test_escalation_and_reprobe():
+    """Repeated HTTP misses move a pattern to the browser; every REPROBE_EVERY browser pages HTTP is tried again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        choices = EngineChoices(Path(tmp) / 'listings.db')
+        for _ in range(ESCALATE_AFTER - 1):
+            choices.record('tags/a', HTTP, False)
+        assert choices.engine_for('tags/a') == HTTP
+        choices.record('tags/a', HTTP, False)
+        assert choices.engine_for('tags/a') == BROWSER
+
+        for _ in range(REPROBE_EVERY - 1):
+            choices.record('tags/a', BROWSER, True)
+        assert choices.engine_for('tags/a') == HTTP
+        choices.record('tags/a', HTTP, True)
+        assert choices.engine_for('tags/a') == HTTP
+        assert EngineChoices(Path(tmp) / 'listings.db').summary() == {'tags/a': HTTP}
+    print("OK: escalation and re-probe")
+
+
+def test_auto_scraper_falls_back_per_listing():
+    """Complete pages stay on HTTP; a page without a title is rendered in the browser"""
+    pages = {'https://haraj.com.sa/11173528712/title/': PAGE.read_bytes(),
+             'https://haraj.com.sa/1/empty/': b'<html><body></body></html>'}
+    with tempfile.TemporaryDirectory() as tmp:
+        auto = HarajScraperAuto(output_dir=tmp, download_images=False, contacts='off')
+        auto.http.fetch_listing = pages.get
+        auto._browser = _Browser()
+
+        listing = auto.scrape_listing('https://haraj.com.sa/11173528712/title/')
+        assert listing['title'] == 'لاندكروزر 2016 فل كامل' and 'raw_html' not in listing
+        assert auto.scrape_listing('https://haraj.com.sa/1/empty/')['title'] == 'rendered'
+        assert auto._browser.scraped == ['https://haraj.com.sa/1/empty/']
+        assert auto.engine_counts == {HTTP: 1, BROWSER: 1}
+        assert auto.choices.engine_for('listing') == HTTP
+
+        # Fetch failures (network errors, 429s, challenges) fall back but do not move the pattern to the browser
+        for _ in range(ESCALATE_AFTER + 1):
+            assert auto.scrape_listing('https://haraj.com.sa/2/blocked/')['title'] == 'rendered'
+        assert auto.choices.engine_for('listing') == HTTP
+        auto.close()
+        assert auto._browser.closed
+    print("OK: per-listing fallback to the browser")
+
+
+def test_contact_stage_over_http():
+    """HTTP results with a contact button: cached seller contact, contact_pending (deferred) or the browser (inline)"""
+    url = 'https://haraj.com.sa/11173528712/title/'
+    with tempfile.TemporaryDirectory() as tmp:
+        for contacts in ('deferred', 'inline'):
+            auto = HarajScraperAuto(output_dir=tmp, download_images=False, contacts=contacts, profile='leads')
+            auto.http.fetch_listing = {url: PAGE.read_bytes()}.get
+            auto._browser = _Browser()
+            listing = auto.scrape_listing(url)
+            if contacts == 'deferred':
+                assert listing['contact_info']['contact_pending'] and auto._browser.scraped == []
+            else:
+                assert listing['title'] == 'rendered' and auto._browser.scraped == [url]
+
+        auto.contact_cache.put('https://haraj.com.sa/users/abu_saad', {'phone_numbers': ['0500000000']})
+        listing = auto.scrape_listing(url)
+        assert listing['contact_info']['phone_numbers'] == ['0500000000']
+        assert 'contact_pending' not in listing['contact_info'] and auto._browser.scraped == [url]
+    print("OK: contact stage over HTTP")
+
+
+if __name__ == "__main__":
+    test_url_patterns()
+    test_escalation_and_reprobe()
+    test_auto_scraper_falls_back_per_listing()
+    test_contact_stage_over_http()
+    print("\nAll auto engine tests passed!")
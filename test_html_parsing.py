@@ -0,0 +1,71 @@
+"""Test that the HTML parser backends extract the same listing data"""
+import sys
+import io
+import glob
+from pathlib import Path
+
+from haraj_scraper import parse_listing_html
+from html_parsing import PARSER_BACKENDS, make_soup, make_tree, page_text
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+PAGES = sorted(glob.glob(str(Path(__file__).parent / 'test_pages' / '*.html')))
+URL = 'https://haraj.com.sa/11173528712/title/'
+
+
+def test_backends_agree_on_saved_pages():
+    """lxml (XPath), bs4-lxml and html.parser give identical fields for every fixture page"""
+    assert PAGES
+    for path in PAGES:
+        html = Path(path).read_bytes()
+        results = {}
+        for backend in PARSER_BACKENDS:
+            listing = parse_listing_html(html, URL, backend)
+            assert listing['raw_html']
+            listing.pop('raw_html')
+            results[backend] = listing
+        assert results['lxml']['title'] and results['lxml']['images']
+        assert results['lxml'] == results['bs4-lxml'] == results['html.parser'], path
+    print(f"OK: {len(PAGES)} pages extract the same with {', '.join(PARSER_BACKENDS)}")
+
+
+def test_bytes_in_and_page_text():
+    """Raw UTF-8 bytes decode without sniffing; page text skips script/style like BeautifulSoup"""
+    html = ('<html><head><style>p{}</style><script>var x = "0550000000";</script></head>'
+            '<body><p>مرحبا <b>بك</b></p><!-- 0551111111 --></body></html>').encode('utf-8')
+    assert page_text(make_tree(html)) == make_soup(html, 'html.parser').get_text() == 'مرحبا بك'
+    assert make_tree(b'') is None
+    assert parse_listing_html(b'', URL, 'lxml')['title'] == ''
+    print("OK: bytes-in parsing")
+
+
+def test_single_pass_extractor_edge_cases():
+    """Nested matches, hidden strings and repeated elements give the same fields as the XPath extractor"""
+    html = (
+        '<html><head><title>منذ يومين</title><script>var p = "999 ريال";</script></head><body>'
+        '<!-- تواصل عبر 0500000000 --><h1>عنوان <b>الاعلان</b><script>x()</script></h1><h1>ثاني</h1>'
+        '<article>وصف <a href="/tags/سيارات">سيارات</a><article>داخلي 0551234567</article></article>'
+        '<a href="/city/جدة/tags/مدن"> جدة </a><a href="/users/a"><i>أ</i></a><a href="/users/b">ب</a>'
+        '<a href="/tags/"></a>'
+        '<img src="/x/LOGO.png"><img src="" data-src="/p/1.jpg"><img data-lazy-src="/p/1.jpg"><img>'
+        '<p>20 ر.س</p><p>السعر 15 ريال</p></body></html>'
+    ).encode('utf-8')
+    for backend in ('bs4-lxml', 'html.parser'):
+        soup_fields = parse_listing_html(html, URL, backend)
+        xpath_fields = parse_listing_html(html, URL, 'lxml')
+        soup_fields.pop('raw_html')
+        xpath_fields.pop('raw_html')
+        assert soup_fields == xpath_fields, backend
+    assert xpath_fields['price'] == 'var p = "999 ريال";'
+    assert xpath_fields['tags'] == ['سيارات', 'جدة']
+    assert xpath_fields['images'] == ['https://haraj.com.sa/p/1.jpg']
+    assert (xpath_fields['title'], xpath_fields['seller_name']) == ('عنوانالاعلان', 'أ')
+    print("OK: single-pass extractor edge cases")
+
+
+if __name__ == "__main__":
+    test_backends_agree_on_saved_pages()
+    test_bytes_in_and_page_text()
+    test_single_pass_extractor_edge_cases()
+    print("\nAll HTML parsing tests passed!")
@@ -0,0 +1,56 @@
+"""Test the browser-to-HTTP session bootstrap of the hybrid engine"""
+import sys
+import io
+import json
+
+from http_session import capture_api_calls, copy_browser_cookies, pooled_session, token_headers
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+class _BrowserLog:
+    """The two WebDriver calls the bootstrap uses, with recorded data"""
+
+    def __init__(self, cookies, events):
+        self.cookies = cookies
+        self.events = events
+
+    def get_cookies(self):
+        return self.cookies
+
+    def get_log(self, kind):
+        assert kind == 'performance'
+        return [{'message': json.dumps({'message': event})} for event in self.events]
+
+
+def _request(url, kind='XHR', headers=None):
+    return {'method': 'Network.requestWillBeSent',
+            'params': {'type': kind, 'request': {'url': url, 'method': 'POST', 'headers': headers or {}}}}
+
+
+def test_bootstrap_copies_cookies_and_tokens():
+    """Cookies go into the pooled session; only the site's XHR/fetch calls and their auth headers are kept"""
+    browser = _BrowserLog(
+        cookies=[{'name': 'sid', 'value': 'abc', 'domain': '.haraj.com.sa', 'path': '/'}],
+        events=[
+            _request('https://graphql.haraj.com.sa/?queryName=posts', headers={'Authorization': 'Bearer t1'}),
+            _request('https://haraj.com.sa/11173528712/x/', kind='Document'),
+            _request('https://www.google-analytics.com/collect', headers={'Authorization': 'other'}),
+            {'method': 'Network.responseReceived', 'params': {}},
+        ],
+    )
+    session = pooled_session('test-agent')
+    assert copy_browser_cookies(browser, session) == 1
+    assert session.cookies.get('sid', domain='.haraj.com.sa') == 'abc'
+    assert session.get_adapter('https://haraj.com.sa')._pool_maxsize == 8
+
+    calls = capture_api_calls(browser, 'haraj.com.sa')
+    assert [c['url'] for c in calls] == ['https://graphql.haraj.com.sa/?queryName=posts']
+    assert token_headers(calls) == {'Authorization': 'Bearer t1'}
+    print("OK: hybrid session bootstrap")
+
+
+if __name__ == "__main__":
+    test_bootstrap_copies_cookies_and_tokens()
+    print("\nAll HTTP session tests passed!")
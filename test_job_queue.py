@@ -0,0 +1,146 @@
+"""Test the SQLite scrape job queue"""
+import sys
+import io
+import tempfile
+from pathlib import Path
+
+from job_queue import JobQueue, JobStatus, job_to_status, QUEUED, RUNNING, CANCELLED
+from listing_store import connect
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def test_claim_respects_global_concurrency():
+    """Two queue handles on the same DB (two processes) never run more than max_concurrency jobs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        worker_a, worker_b = JobQueue(db, max_concurrency=2), JobQueue(db, max_concurrency=2)
+        ids = [worker_a.enqueue(f"https://haraj.com.sa/tags/{i}", 10)['job_id'] for i in range(3)]
+
+        assert worker_a.claim_next('a')['job_id'] == ids[0]
+        assert worker_b.claim_next('b')['job_id'] == ids[1]
+        assert worker_b.claim_next('b') is None
+        assert worker_b.get(ids[2])['state'] == QUEUED
+        print("OK: concurrency limit")
+
+
+def test_status_is_shared_and_cancellable():
+    """Progress written through JobStatus is visible to another handle; cancel reaches the runner"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        queue = JobQueue(db)
+        job = queue.enqueue("https://haraj.com.sa/tags/cars", 10, job_name="cars")
+        queued = queue.enqueue("https://haraj.com.sa/tags/food", 10, job_name="food")
+        queue.claim_next()
+
+        status = JobStatus(queue, job['job_id'])
+        status['progress'] = 3
+        status['current_listing'] = 'Scraping listing 3/10...'
+        seen = job_to_status(JobQueue(db).get(job['job_id']))
+        assert seen['progress'] == 3 and seen['is_running'] and seen['state'] == RUNNING
+
+        assert not status.cancel_requested()
+        queue.request_cancel()
+        assert status.cancel_requested()
+        assert queue.get(queued['job_id'])['state'] == CANCELLED
+        print("OK: shared status and cancel")
+
+
+def test_stale_running_job_is_requeued():
+    """A running job without heartbeats (dead worker) goes back to the queue"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        queue = JobQueue(db)
+        job = queue.enqueue("https://haraj.com.sa/tags/cars", 10)
+        queue.claim_next()
+        conn = connect(db)
+        conn.execute("UPDATE scrape_jobs SET heartbeat_at = datetime('now', '-1 hour')")
+        conn.commit()
+        conn.close()
+        assert queue.requeue_stale(300) == 1
+        assert queue.get(job['job_id'])['state'] == QUEUED
+        last = queue.events_since(0, job['job_id'])[-1]
+        assert last['event'] == 'job' and last['data']['current_listing'] == 'Requeued after worker loss'
+        print("OK: stale job requeued")
+
+
+def test_one_active_job_per_name():
+    """A second job with an active name is refused, and a queued duplicate waits while its name runs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        queue = JobQueue(db, max_concurrency=3)
+        first = queue.enqueue("https://haraj.com.sa/tags/cars", 10, job_name="cars", unique=True)
+        assert JobQueue(db).enqueue("https://haraj.com.sa/tags/cars", 10, job_name="cars", unique=True) is None
+        duplicate = queue.enqueue("https://haraj.com.sa/tags/cars", 10, job_name="cars")
+        other = queue.enqueue("https://haraj.com.sa/tags/food", 10, job_name="food")
+
+        assert queue.claim_next('a')['job_id'] == first['job_id']
+        assert queue.claim_next('b')['job_id'] == other['job_id']
+        assert queue.claim_next('c') is None
+        queue.finish(first['job_id'], 'completed')
+        assert queue.claim_next('c')['job_id'] == duplicate['job_id']
+        print("OK: one active job per name")
+
+
+def test_jobs_with_prefix():
+    """All partitions of a fan-out are found however many other jobs the queue holds; LIKE wildcards are literal"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "listings.db")
+        parts = [queue.enqueue(f"https://haraj.com.sa/tags/{i}", 5, job_name=f"fanout:ab12/{i}") for i in range(3)]
+        for i in range(30):
+            queue.enqueue("https://haraj.com.sa/tags/x", 5, job_name=f"other{i}")
+        queue.enqueue("https://haraj.com.sa/tags/y", 5, job_name="fanout:abX2/0")
+        assert [j['job_id'] for j in queue.jobs_with_prefix("fanout:ab12/")] == [j['job_id'] for j in parts]
+        assert queue.jobs_with_prefix("fanout:ab_2/") == []
+        print("OK: jobs by name prefix")
+
+
+def test_worker_shutdown_requeues_job():
+    """A worker stopping mid-job puts it back in the queue for another worker to resume"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        queue = JobQueue(db)
+        job = queue.enqueue("https://haraj.com.sa/tags/cars", 10)
+        queue.claim_next('worker-a')
+        queue.worker_heartbeat('worker-a', running_jobs=1, max_jobs=1)
+        assert [w['worker_id'] for w in queue.live_workers()] == ['worker-a']
+
+        queue.requeue(job['job_id'], 'Requeued: worker shutting down')
+        queue.remove_worker('worker-a')
+        assert queue.get(job['job_id'])['state'] == QUEUED
+        assert queue.live_workers() == []
+        assert JobQueue(db).claim_next('worker-b')['worker_id'] == 'worker-b'
+        print("OK: worker shutdown requeue")
+
+
+def test_events_resume_after_last_id():
+    """Status changes and published events form an ordered stream a client can resume from"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        queue = JobQueue(db)
+        job = queue.enqueue("https://haraj.com.sa/tags/cars", 10)
+        queue.claim_next()
+        status = JobStatus(queue, job['job_id'])
+        status['progress'] = 1
+        seen = queue.events_since(0, job['job_id'])
+        assert [e['event'] for e in seen] == ['job', 'job', 'progress']
+        assert seen[-1]['data']['progress'] == 1
+
+        status.publish('lead', {'listing_id': '111', 'title': 'Camry'})
+        queue.finish(job['job_id'], 'completed')
+        resumed = JobQueue(db).events_since(seen[-1]['event_id'], job['job_id'])
+        assert [e['event'] for e in resumed] == ['lead', 'job']
+        assert resumed[0]['data']['title'] == 'Camry' and not resumed[1]['data']['is_running']
+        print("OK: event stream resume")
+
+
+if __name__ == "__main__":
+    test_claim_respects_global_concurrency()
+    test_status_is_shared_and_cancellable()
+    test_stale_running_job_is_requeued()
+    test_one_active_job_per_name()
+    test_jobs_with_prefix()
+    test_worker_shutdown_requeues_job()
+    test_events_resume_after_last_id()
+    print("\nAll job queue tests passed!")
@@ -0,0 +1,74 @@
+"""Test the staged fetch/parse/enrich/store listing pipeline"""
+import sys
+import io
+import time
+
+from bs4 import BeautifulSoup
+
+from cancellation import CancelToken
+from haraj_scraper import extract_listing_details, parse_listing_html
+from listing_pipeline import ListingPipeline
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def _page(lid):
+    return (
+        '<html><head><title>Listing %s</title></head><body>'
+        '<h1>سيارة %s</h1><div class="description">وصف الإعلان 0501234567</div>'
+        '<a href="/users/seller%s">seller%s</a></body></html>' % (lid, lid, lid, lid)
+    ).encode('utf-8')
+
+
+def _url(lid):
+    return f'https://haraj.com.sa/{lid}/title/'
+
+
+def test_pipeline_parses_in_processes_and_stores_in_order():
+    """Parsing in worker processes gives the same listings as inline parsing, stored in fetch order"""
+    ids = [str(11000000 + i) for i in range(12)]
+    stored = []
+    pipeline = ListingPipeline(
+        fetch=lambda url: None if url.endswith('11000005/title/') else _page(url.split('/')[3]),
+        parse=parse_listing_html,
+        enrich=lambda listing: dict(listing, enriched=True),
+        store=stored.append,
+        parse_workers=2,
+        queue_size=2
+    )
+    stats = pipeline.run([_url(lid) for lid in ids])
+    assert stats == {'fetched': 11, 'fetch_failed': 1, 'parse_failed': 0, 'stored': 11}
+    assert [listing['listing_id'] for listing in stored] == [lid for lid in ids if lid != '11000005']
+    assert all(listing['enriched'] for listing in stored)
+
+    expected = extract_listing_details(BeautifulSoup(_page(ids[0]), 'html.parser', from_encoding='utf-8'), _url(ids[0]))
+    assert dict(stored[0], enriched=None) == dict(expected, enriched=None)
+    for backend in ('lxml', 'html.parser'):
+        assert 'raw_html' not in parse_listing_html(_page(ids[0]), _url(ids[0]), backend, keep_raw_html=False)
+    print("OK: pipeline output matches inline parsing")
+
+
+def test_pipeline_stops_on_cancel():
+    """Cancelling stops fetching; listings already fetched are still stored"""
+    token = CancelToken()
+    stored = []
+
+    def fetch(url):
+        time.sleep(0.05)
+        if len(stored) >= 3:
+            token.cancel()
+        return _page(url.split('/')[3])
+
+    pipeline = ListingPipeline(fetch=fetch, parse=parse_listing_html, store=stored.append,
+                               parse_workers=0, cancel_token=token)
+    stats = pipeline.run([_url(str(12000000 + i)) for i in range(50)])
+    assert 3 <= stats['stored'] < 50
+    assert stats['stored'] == stats['fetched'] == len(stored)
+    print("OK: pipeline stops on cancel")
+
+
+if __name__ == "__main__":
+    test_pipeline_parses_in_processes_and_stores_in_order()
+    test_pipeline_stops_on_cancel()
+    print("\nAll listing pipeline tests passed!")
@@ -0,0 +1,118 @@
+"""Test the SQLite listing store and derived JSON/CSV snapshots"""
+import sys
+import io
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+import listing_store
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def _listing(lid, **extra):
+    data = {'listing_id': lid, 'url': f'https://haraj.com.sa/{lid}/title/', 'title': f'Listing {lid}'}
+    data.update(extra)
+    return data
+
+
+def test_upsert_writes_only_delta():
+    """Upserting new listings keeps earlier rows and bumps the version once per write"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        assert listing_store.upsert_listings(db, [_listing('11111111'), _listing('22222222')]) == 2
+        v1 = listing_store.listings_version(db)
+        assert listing_store.upsert_listings(db, [_listing('33333333')]) == 1
+        assert listing_store.listings_version(db) == v1 + 1
+        assert listing_store.count_listings(db) == 3
+
+        ids, urls = listing_store.known_listing_keys(db)
+        assert ids == {'11111111', '22222222', '33333333'}
+        assert 'https://haraj.com.sa/33333333/title' in urls
+
+        # Re-scraping a listing updates it in place, in its first-seen position
+        listing_store.upsert_listings(db, [_listing('11111111', title='Re-scraped')])
+        listings = listing_store.load_all_listings(db)
+        assert [L['listing_id'] for L in listings] == ['11111111', '22222222', '33333333']
+        assert listings[0]['title'] == 'Re-scraped'
+        print("OK: delta upsert")
+
+
+def test_snapshots_regenerate_only_when_stale():
+    """Snapshots are written on first export, skipped when fresh and rebuilt after a DB write"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "listings.db"
+        exporter = listing_store.SnapshotExporter(db, Path(tmp) / "saved.json", Path(tmp) / "saved.csv")
+        listing_store.upsert_listings(db, [_listing('11111111', contact_info={'phone_numbers': ['0501234567']})])
+
+        assert exporter.export() is True
+        assert exporter.export() is False
+        with open(Path(tmp) / "saved.json", encoding='utf-8') as f:
+            assert [L['listing_id'] for L in json.load(f)] == ['11111111']
+        with open(Path(tmp) / "saved.csv", encoding='utf-8-sig') as f:
+            assert '0501234567' in f.read()
+
+        listing_store.upsert_listings(db, [_listing('22222222')])
+        assert exporter.export() is True
+        with open(Path(tmp) / "saved.json", encoding='utf-8') as f:
+            assert len(json.load(f)) == 2
+        print("OK: lazy snapshots")
+
+
+def test_concurrent_snapshot_writers():
+    """Writers exporting at once (other processes) each use their own temp file; no leftovers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        listings = [_listing(str(11111111 + i)) for i in range(200)]
+        writers = [threading.Thread(target=fn, args=(listings, Path(tmp) / name))
+                   for _ in range(4)
+                   for fn, name in ((listing_store.write_json_snapshot, 'saved.json'),
+                                    (listing_store.write_csv_snapshot, 'saved.csv'))]
+        for t in writers:
+            t.start()
+        for t in writers:
+            t.join()
+        with open(Path(tmp) / "saved.json", encoding='utf-8') as f:
+            assert len(json.load(f)) == 200
+        assert sorted(p.name for p in Path(tmp).iterdir()) == ['saved.csv', 'saved.json']
+        print("OK: concurrent snapshot writers")
+
+
+def test_streaming_sinks_persist_batches():
+    """Sinks commit full batches while running and flush the remainder on close"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = listing_store.open_sinks(['sqlite', 'jsonl', 'csv'], tmp, batch_size=2)
+        sink.write(_listing('11111111'))
+        sink.write(_listing('22222222'))
+        sink.write(_listing('33333333'))
+        # First batch is visible before the run ends
+        assert listing_store.count_listings(Path(tmp) / "listings.db") == 2
+        sink.close()
+        assert sink.count == 3
+        assert listing_store.count_listings(Path(tmp) / "listings.db") == 3
+        with open(Path(tmp) / "listings.jsonl", encoding='utf-8') as f:
+            assert len(f.readlines()) == 3
+
+        # Appending to an existing CSV must not repeat the header
+        with listing_store.CSVListingSink(Path(tmp) / "listings.csv") as csv_sink:
+            csv_sink.write(_listing('44444444'))
+        with open(Path(tmp) / "listings.csv", encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 5 and lines[0].startswith('listing_id,')
+
+    # A sink without _write_batch fails when it is created, not at its first flush
+    try:
+        type('IncompleteSink', (listing_store.ListingSink,), {})()
+        assert False, 'expected TypeError'
+    except TypeError:
+        pass
+    print("OK: streaming sinks")
+
+
+if __name__ == "__main__":
+    test_upsert_writes_only_delta()
+    test_snapshots_regenerate_only_when_stale()
+    test_concurrent_snapshot_writers()
+    test_streaming_sinks_persist_batches()
+    print("\nAll listing store tests passed!")
@@ -0,0 +1,107 @@
+"""Test request pacing (shared budget and adaptive AIMD controller)"""
+import sys
+import io
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from rate_limit import AdaptiveRateController, SharedRateBudget, looks_like_challenge, shared_budget_from_env
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def test_aimd_speeds_up_and_backs_off():
+    """Healthy responses shorten the delay additively; 429 and challenge pages cut the rate in half"""
+    controller = AdaptiveRateController(min_delay=1, max_delay=20, initial_delay=4, jitter=0)
+    for _ in range(100):
+        controller.record(latency=0.5, status=200)
+    assert abs(controller.delay - 1) < 1e-9  # capped at the configured ceiling
+
+    controller.record(latency=0.5, status=429)
+    assert abs(controller.delay - 2) < 1e-9
+    controller.record(latency=0.5, status=200, challenge=True)
+    assert abs(controller.delay - 4) < 1e-9
+    controller.record(latency=30, status=200)  # slow response: soft backoff
+    assert abs(controller.delay - 5) < 1e-9
+    for _ in range(100):
+        controller.record(status=503)
+    assert abs(controller.delay - 20) < 1e-9  # never slower than max_delay
+    print("OK: AIMD pacing")
+
+
+def test_retry_after_is_honoured():
+    controller = AdaptiveRateController(min_delay=0.1, max_delay=1, initial_delay=0.1, jitter=0)
+    controller.record(status=429, retry_after=5)
+    assert controller.time_until_next_request() > 4
+    print("OK: Retry-After")
+
+
+def test_work_overlaps_with_delay():
+    """Time spent parsing/storing after a request counts towards the delay before the next one"""
+    controller = AdaptiveRateController(min_delay=0.5, max_delay=5, initial_delay=0.5, jitter=0)
+    assert controller.time_until_next_request() == 0
+    controller.request_started()
+    time.sleep(0.3)  # extraction + storage of the page just fetched
+    assert 0.1 < controller.time_until_next_request() <= 0.2
+    time.sleep(0.25)
+    assert controller.time_until_next_request() == 0
+    print("OK: work overlaps with delay")
+
+
+def test_challenge_detection():
+    assert looks_like_challenge("<title>Just a moment...</title>")
+    assert not looks_like_challenge("<title>هيلكس غمارتين</title>")
+    print("OK: challenge detection")
+
+
+def test_budget_from_env():
+    """Bad HARAJ_RATE_* values fall back to the defaults instead of failing the import of the app"""
+    saved = {k: os.environ.get(k) for k in ('HARAJ_RATE_PER_MINUTE', 'HARAJ_RATE_BURST', 'HARAJ_RATE_DB')}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ.update(HARAJ_RATE_PER_MINUTE='60', HARAJ_RATE_BURST='two',
+                              HARAJ_RATE_DB=str(Path(tmp) / 'rate.db'))
+            assert shared_budget_from_env(default_burst=3).burst == 3
+            os.environ['HARAJ_RATE_BURST'] = '2'
+            assert shared_budget_from_env(default_burst=3).burst == 2
+            os.environ['HARAJ_RATE_PER_MINUTE'] = 'fast'
+            assert shared_budget_from_env() is None
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    print("OK: budget from environment")
+
+
+def test_shared_budget_across_processes():
+    """Three processes drawing from one SQLite bucket together stay within the global rate"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "rate.db"
+        SharedRateBudget(db, rate_per_minute=1200)  # 20/s
+        code = (
+            "import sys; sys.path.insert(0, %r)\n"
+            "from rate_limit import SharedRateBudget\n"
+            "b = SharedRateBudget(%r, rate_per_minute=1200)\n"
+            "[b.acquire() for _ in range(10)]\n"
+        ) % (str(Path(__file__).parent), str(db))
+        start = time.time()
+        procs = [subprocess.Popen([sys.executable, '-c', code]) for _ in range(3)]
+        assert all(p.wait(timeout=60) == 0 for p in procs)
+        # 30 tokens at 20/s with a burst of 1 need at least ~1.45s, whichever process takes them
+        assert time.time() - start >= 1.4
+        print("OK: shared budget across processes")
+
+
+if __name__ == "__main__":
+    test_aimd_speeds_up_and_backs_off()
+    test_retry_after_is_honoured()
+    test_work_overlaps_with_delay()
+    test_challenge_detection()
+    test_budget_from_env()
+    test_shared_budget_across_processes()
+    print("\nAll rate limit tests passed!")
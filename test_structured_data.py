@@ -0,0 +1,50 @@
+"""Test the JSON-LD / embedded app state fast path for listing extraction"""
+import sys
+import io
+from pathlib import Path
+
+from haraj_scraper import parse_listing_html
+from structured_data import parse_scripts, fields_from_state, structured_listing_fields
+
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+PAGE = Path(__file__).parent / 'test_pages' / 'listing_4.html'
+URL = 'https://haraj.com.sa/11173528712/title/'
+
+
+def test_structured_fields_override_dom():
+    """JSON-LD wins, the app state fills what JSON-LD lacks (city), the DOM only the rest"""
+    for backend in ('lxml', 'html.parser'):
+        listing = parse_listing_html(PAGE.read_bytes(), URL, backend)
+        assert listing['title'] == 'لاندكروزر 2016 فل كامل'
+        assert listing['price'] == '145,000 ريال'
+        assert listing['posted_time'] == '2026-01-18T05:39:54.000Z'
+        assert listing['seller_url'] == 'https://haraj.com.sa/users/abu_saad'
+        assert (listing['city'], listing['location']) == ('مكة', 'مكة')
+        assert listing['tags'] == ['حراج السيارات', 'تويوتا', 'لاندكروزر']
+        assert listing['images'][1].endswith('/ld_2.jpg')
+        assert listing['contact_info'] == {'has_contact_button': True}
+    print("OK: structured data overrides DOM heuristics")
+
+
+def test_state_matches_only_this_listing():
+    """The state blob is searched for the post with this listing's id; related posts are ignored"""
+    scripts = [('', '', 'window.__STATE__ = {"feed": [{"id": 2, "title": "other", "city": "جدة"}, '
+                        '{"postId": "1", "title": "mine", "postDate": 1768714794000, "price": 950, '
+                        '"author": {"username": "seller one"}}]};')]
+    _, states = parse_scripts(scripts)
+    fields = fields_from_state(states, '1')
+    assert fields['title'] == 'mine' and 'city' not in fields
+    assert fields['posted_time'] == '2026-01-18T05:39:54Z'
+    assert fields['price'] == '950 ريال'
+    assert fields['seller_url'] == 'https://haraj.com.sa/users/seller%20one'
+    assert fields_from_state(states, '3') == {}
+    assert structured_listing_fields([('application/ld+json', '', '{not json')], '1') == {}
+    print("OK: app state lookup by listing id")
+
+
+if __name__ == "__main__":
+    test_structured_fields_override_dom()
+    test_state_matches_only_this_listing()
+    print("\nAll structured data tests passed!")